@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -33,7 +34,7 @@ ALLOWED_HOSTS = []
 
 INSTALLED_APPS = [
     'corsheaders',
-    'django.contrib.admin',
+    'django.contrib.admin.apps.SimpleAdminConfig',  # admin.autodiscover() en backend/urls_admin.py
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'cuentas.middlewares.MetricasMiddleware',  # Latencia y consultas por vista (/api/metrics/)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -55,6 +57,11 @@ MIDDLEWARE = [
     'cuentas.middlewares.ActualizarFacturasMiddleware',  # Middleware para actualizar facturas vencidas
 ]
 
+# Métricas por vista en formato Prometheus
+METRICAS_HABILITADAS = True
+# Token que debe enviar Prometheus a /api/metrics/ (Authorization: Bearer ...); vacío lo deshabilita
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # Tu frontend
 ]
@@ -66,8 +73,25 @@ CORS_ALLOW_ALL_ORIGINS = True
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=7),  # Cambia la duración aquí
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7), # Cambia la duración aquí
+    # Usuario armado con los datos del token (JWTSinEstadoAuthentication), con valores
+    # por defecto para los tokens emitidos antes de agregar rol, email y permisos
+    'TOKEN_USER_CLASS': 'cuentas.autenticacion.UsuarioToken',
 }
 
+# Backend de envío de notificaciones (comando despachar_notificaciones)
+NOTIFICACIONES_BACKEND = 'cuentas.notificaciones.BackendConsola'
+NOTIFICACIONES_ARCHIVO = BASE_DIR / 'notificaciones.ndjson'  # Usado por BackendArchivo
+
+# Las facturas pagadas emitidas hace más de estos meses se mueven al archivo (comando archivar_facturas)
+FACTURAS_ARCHIVO_MESES = 24
+
+# Registro de cambios (/api/async/cambios/): días que se conservan (comando purgar_cambios),
+# segundos que se espera un hueco en la secuencia antes de saltarlo y segundos que se sigue
+# revisando después (debe superar la transacción más larga que registre cambios)
+CAMBIOS_RETENCION_DIAS = 7
+CAMBIOS_MARGEN_SEGUNDOS = 10
+CAMBIOS_REVISION_SEGUNDOS = 3600
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -92,24 +116,50 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'gestion_cuentas',
-        'USER': 'postgres',
-        'PASSWORD': 'postgressql',
-        'HOST': 'localhost',
-        'PORT': '5432',
+# Los valores por defecto son los de desarrollo; en despliegue se configuran con variables de entorno.
+# DB_CONN_MAX_AGE mantiene la conexión abierta entre solicitudes (0 = una por solicitud) y
+# CONN_HEALTH_CHECKS la verifica antes de reutilizarla. Para pooling entre procesos usar PgBouncer.
+def _base_de_datos(prefijo, por_defecto):
+    return {
+        'ENGINE': os.environ.get(f'{prefijo}_ENGINE', por_defecto.get('ENGINE', 'django.db.backends.postgresql')),
+        'NAME': os.environ.get(f'{prefijo}_NAME', por_defecto.get('NAME', 'gestion_cuentas')),
+        'USER': os.environ.get(f'{prefijo}_USER', por_defecto.get('USER', 'postgres')),
+        'PASSWORD': os.environ.get(f'{prefijo}_PASSWORD', por_defecto.get('PASSWORD', 'postgressql')),
+        'HOST': os.environ.get(f'{prefijo}_HOST', por_defecto.get('HOST', 'localhost')),
+        'PORT': os.environ.get(f'{prefijo}_PORT', por_defecto.get('PORT', '5432')),
+        'CONN_MAX_AGE': int(os.environ.get(f'{prefijo}_CONN_MAX_AGE', por_defecto.get('CONN_MAX_AGE', 60))),
+        'CONN_HEALTH_CHECKS': True,
     }
+
+
+DATABASES = {
+    'default': _base_de_datos('DB', {}),
 }
 
+# Réplica de lectura opcional (p. ej. DB_REPLICA_HOST=replica.interna): los GET de los
+# ViewSets y del dashboard se leen de ella (cuentas/replica.py). Los valores que no se
+# indiquen se toman del primario. Para probar en local sin PostgreSQL:
+#   DB_ENGINE=django.db.backends.sqlite3 DB_NAME=db.sqlite3 DB_REPLICA_NAME=db.sqlite3
+if any(clave.startswith('DB_REPLICA_') for clave in os.environ):
+    DATABASES['replica'] = _base_de_datos('DB_REPLICA', DATABASES['default'])
+    # En las pruebas la réplica apunta a la misma BD que el primario
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICA = 'replica'
+
+DATABASE_ROUTERS = ['cuentas.replica.RouterReplica']
+# Segundos que se evita la réplica después de un error de conexión
+REPLICA_REINTENTO_SEGUNDOS = 30
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # Construye el usuario desde el token (sin consultar la BD en cada solicitud)
+        'cuentas.autenticacion.JWTSinEstadoAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Paginación por cursor para no devolver tablas completas
+    'DEFAULT_PAGINATION_CLASS': 'cuentas.paginacion.CursorPaginacion',
 }
 
 AUTH_USER_MODEL = 'cuentas.Usuario'
@@ -1,10 +1,10 @@
 # backend/urls.
 
-from django.contrib import admin
-from django.urls import path, include
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from django.urls import URLResolver, path, include
+from django.urls.resolvers import RoutePattern
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    # El admin se carga en su primera solicitud (backend/urls_admin.py), no al arrancar el worker
+    URLResolver(RoutePattern('admin/'), 'backend.urls_admin', app_name='admin', namespace='admin'),
     path('api/', include('cuentas.urls')),  # Incluye las rutas de cuentas
 ]
@@ -0,0 +1,11 @@
+# backend/urls_admin.py
+#
+# URLs del admin. Con SimpleAdminConfig los admin.py de las apps no se
+# importan en django.setup(); se registran aquí, la primera vez que se
+# resuelve o se invierte una URL del admin.
+
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
@@ -1,3 +1,21 @@
 from django.contrib import admin
+from .models import Factura, Notificacion
 
 # Register your models here.
+
+@admin.register(Factura)
+class FacturaAdmin(admin.ModelAdmin):
+    list_display = ['numero_factura', 'tipo', 'cliente', 'proveedor', 'fecha_vencimiento', 'monto_total', 'saldo_pendiente', 'estado']
+    list_filter = ['tipo', 'estado']
+    # El saldo solo cambia al registrar pagos (cuentas/pagos.py)
+    readonly_fields = ['saldo_pendiente']
+    list_select_related = ['cliente', 'proveedor']
+    raw_id_fields = ['cliente', 'proveedor']
+
+
+@admin.register(Notificacion)
+class NotificacionAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'fecha_envio', 'enviada']
+    # Notificacion.__str__ usa factura.numero_factura
+    list_select_related = ['factura']
+    raw_id_fields = ['factura']
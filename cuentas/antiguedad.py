@@ -0,0 +1,75 @@
+# cuentas/antiguedad.py
+
+from datetime import timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+from .models import Factura, AntiguedadSaldo
+
+TAMANO_LOTE = 2000
+TRAMOS = ['por_vencer', 'dias_0_30', 'dias_31_60', 'dias_61_90', 'dias_90_mas']
+CONTRAPARTES = {'Cobrar': 'cliente', 'Pagar': 'proveedor'}
+
+
+def _filtros_tramos(corte):
+    # Días de atraso = corte - fecha_vencimiento, expresados como rangos de fechas
+    # para que la BD compare contra el índice en vez de calcular diferencias por fila
+    return {
+        'por_vencer': Q(fecha_vencimiento__gt=corte),
+        'dias_0_30': Q(fecha_vencimiento__lte=corte, fecha_vencimiento__gte=corte - timedelta(days=30)),
+        'dias_31_60': Q(fecha_vencimiento__lt=corte - timedelta(days=30), fecha_vencimiento__gte=corte - timedelta(days=60)),
+        'dias_61_90': Q(fecha_vencimiento__lt=corte - timedelta(days=60), fecha_vencimiento__gte=corte - timedelta(days=90)),
+        'dias_90_mas': Q(fecha_vencimiento__lt=corte - timedelta(days=90)),
+    }
+
+
+def antiguedad_por_contraparte(tipo, corte=None):
+    """
+    Saldos abiertos (saldo_pendiente de las Pendiente/Vencida) por cliente o proveedor repartidos en
+    tramos de días de atraso, calculados con una sola consulta agrupada.
+    Devuelve un queryset de diccionarios ordenado por total descendente.
+    """
+    corte = corte or timezone.localdate()
+    contraparte = CONTRAPARTES[tipo]
+    tramos = {
+        nombre: Sum('saldo_pendiente', filter=filtro, default=Decimal(0))
+        for nombre, filtro in _filtros_tramos(corte).items()
+    }
+    return (
+        Factura.objects
+        .filter(tipo=tipo, estado__in=['Pendiente', 'Vencida'])
+        .values(contraparte_id=F(f'{contraparte}_id'), contraparte=F(f'{contraparte}__nombre'))
+        .annotate(**tramos, total=Sum('saldo_pendiente'))
+        .order_by('-total', 'contraparte_id')
+    )
+
+
+def antiguedad_guardada(tipo):
+    # Última foto generada para el tipo, con la misma forma que antiguedad_por_contraparte
+    ultima = AntiguedadSaldo.objects.filter(tipo=tipo).order_by('-fecha_corte').values_list('fecha_corte', flat=True).first()
+    saldos = (
+        AntiguedadSaldo.objects
+        .filter(tipo=tipo, fecha_corte=ultima)
+        .values('contraparte_id', 'contraparte', *TRAMOS, 'total')
+        .order_by('-total', 'contraparte_id')
+    )
+    return ultima, saldos
+
+
+def generar_antiguedad(tipo, corte=None):
+    # Reemplaza la foto del día de corte con el resultado de la consulta agrupada
+    corte = corte or timezone.localdate()
+    creadas = 0
+    with transaction.atomic():
+        AntiguedadSaldo.objects.filter(tipo=tipo, fecha_corte=corte).delete()
+        lote = []
+        for fila in antiguedad_por_contraparte(tipo, corte).iterator(chunk_size=TAMANO_LOTE):
+            lote.append(AntiguedadSaldo(fecha_corte=corte, tipo=tipo, **fila))
+            if len(lote) == TAMANO_LOTE:
+                AntiguedadSaldo.objects.bulk_create(lote)
+                creadas += len(lote)
+                lote = []
+        AntiguedadSaldo.objects.bulk_create(lote)
+        creadas += len(lote)
+    return creadas
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CuentasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'cuentas'
+
+    def ready(self):
+        # Registra las señales que mantienen el resumen mensual de facturas
+        from . import signals  # noqa: F401
@@ -0,0 +1,122 @@
+# cuentas/archivo.py
+#
+# Archivo de facturas: las pagadas emitidas antes del horizonte configurado
+# (FACTURAS_ARCHIVO_MESES) se mueven a FacturaArchivada, así la tabla de
+# facturas, sus índices y los agregados solo recorren los datos vigentes.
+# El resumen mensual conserva sus totales marcados como archivados.
+
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import Factura, FacturaArchivada, Notificacion, Pago
+from .resumen import agrupar_por_mes, archivar_grupos
+from . import cambios
+
+TAMANO_LOTE = 2000
+CAMPOS = (
+    'id', 'numero_factura', 'tipo', 'cliente_id', 'proveedor_id', 'fecha_emision', 'fecha_vencimiento',
+    'monto_total', 'saldo_pendiente', 'estado',
+)
+CAMPOS_NOTIFICACION = ('tipo', 'mensaje', 'fecha_envio', 'enviada')
+CAMPOS_PAGO = ('monto', 'fecha', 'referencia', 'registrado_en')
+
+
+def horizonte(hoy=None, meses=None):
+    # Primer día del mes a partir del cual las facturas se mantienen en la tabla principal
+    hoy = hoy or timezone.localdate()
+    meses = getattr(settings, 'FACTURAS_ARCHIVO_MESES', 24) if meses is None else meses
+    total = hoy.year * 12 + hoy.month - 1 - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def archivar(hasta, tamano=TAMANO_LOTE):
+    """
+    Mueve por lotes las facturas pagadas emitidas antes de `hasta` al archivo,
+    junto con sus notificaciones y pagos. Cada lote es una transacción; devuelve el total.
+    """
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Factura.objects.select_for_update(skip_locked=True)
+                .filter(estado='Pagada', fecha_emision__lt=hasta)
+                .order_by('id')
+                .values_list('id', flat=True)[:tamano]
+            )
+            if not ids:
+                return total
+            facturas = Factura.objects.filter(pk__in=ids)
+            grupos = agrupar_por_mes(facturas)
+
+            notificaciones = _por_factura(Notificacion, ids, CAMPOS_NOTIFICACION)
+            pagos = _por_factura(Pago, ids, CAMPOS_PAGO)
+
+            FacturaArchivada.objects.bulk_create(
+                FacturaArchivada(
+                    **valores, notificaciones=_a_json(notificaciones[valores['id']]),
+                    pagos=_a_json(pagos[valores['id']]),
+                )
+                for valores in facturas.values(*CAMPOS)
+            )
+            # Borrado directo, sin señales: el resumen se mueve por grupos, las
+            # facturas pagadas no cuentan en los saldos por contraparte y los
+            # cambios se anotan aquí
+            ids_notificaciones = list(
+                Notificacion.objects.filter(factura_id__in=ids).values_list('id', flat=True)
+            )
+            cambios.registrar(Notificacion, ids_notificaciones, 'eliminar')
+            cambios.registrar(Factura, ids, 'eliminar')
+            Notificacion.objects.filter(factura_id__in=ids)._raw_delete(Notificacion.objects.db)
+            Pago.objects.filter(factura_id__in=ids)._raw_delete(Pago.objects.db)
+            facturas._raw_delete(facturas.db)
+            archivar_grupos(grupos)
+            total += len(ids)
+
+
+def restaurar(ids):
+    # Devuelve facturas archivadas (y sus notificaciones y pagos) a la tabla principal
+    with transaction.atomic():
+        ids = list(FacturaArchivada.objects.select_for_update().filter(pk__in=ids).values_list('pk', flat=True))
+        archivadas = FacturaArchivada.objects.filter(pk__in=ids)
+        grupos = agrupar_por_mes(archivadas)
+        filas = list(archivadas.values(*CAMPOS, 'notificaciones', 'pagos'))
+        Factura.objects.bulk_create(
+            Factura(**{campo: valores[campo] for campo in CAMPOS}) for valores in filas
+        )
+        # fecha_envio es auto_now_add: las notificaciones restauradas toman la fecha actual
+        notificaciones = Notificacion.objects.bulk_create(
+            Notificacion(factura_id=valores['id'], **notificacion)
+            for valores in filas for notificacion in valores['notificaciones']
+        )
+        cambios.registrar(Factura, ids, 'crear')
+        cambios.registrar(Notificacion, [notificacion.pk for notificacion in notificaciones], 'crear')
+        # registrado_en también es auto_now_add
+        Pago.objects.bulk_create(
+            Pago(factura_id=valores['id'], **{campo: pago[campo] for campo in ('monto', 'fecha', 'referencia')})
+            for valores in filas for pago in valores['pagos']
+        )
+        archivadas.delete()
+        archivar_grupos(grupos, archivada=False)
+    return len(filas)
+
+
+def _por_factura(modelo, ids, campos):
+    # Filas relacionadas de las facturas `ids`, agrupadas por factura
+    filas = defaultdict(list)
+    for fila in modelo.objects.filter(factura_id__in=ids).order_by('id').values('factura_id', *campos):
+        filas[fila.pop('factura_id')].append(fila)
+    return filas
+
+
+def _a_json(filas):
+    # Fechas, fechas con hora y montos como texto para el JSONField
+    for fila in filas:
+        for campo, valor in fila.items():
+            if isinstance(valor, Decimal):
+                fila[campo] = str(valor)
+            elif isinstance(valor, date):
+                fila[campo] = valor.isoformat()
+    return filas
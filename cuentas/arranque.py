@@ -0,0 +1,142 @@
+# cuentas/arranque.py
+#
+# Perfil de arranque de un worker: cada medición corre en un proceso nuevo
+# (python -X importtime) que ejecuta django.setup() y atiende una primera
+# solicitud con el WSGIHandler, como un worker recién creado. Se resume el
+# tiempo de importación por módulo y por paquete, el tiempo hasta la primera
+# respuesta y la memoria (RSS máximo y, con tracemalloc, por paquete).
+
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from django.conf import settings
+
+LINEA_IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+SCRIPT = r'''
+import io, json, resource, sys, time
+inicio = time.perf_counter()
+if MEMORIA:
+    import tracemalloc
+    tracemalloc.start()
+import django
+django.setup()
+configurado = time.perf_counter()
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+hosts = [host for host in settings.ALLOWED_HOSTS if host and '*' not in host and not host.startswith('.')]
+host = hosts[0] if hosts else 'localhost'
+estados = []
+respuesta = WSGIHandler()({
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': URL, 'QUERY_STRING': '', 'SERVER_NAME': host,
+    'SERVER_PORT': '80', 'HTTP_HOST': host, 'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http',
+}, lambda estado, cabeceras, error=None: estados.append(estado))
+b''.join(respuesta)
+respuesta.close()
+fin = time.perf_counter()
+
+resultado = {
+    'setup_ms': (configurado - inicio) * 1000,
+    'primera_solicitud_ms': (fin - inicio) * 1000,
+    'estado': estados[0] if estados else None,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'modulos': len(sys.modules),
+}
+if MEMORIA:
+    por_archivo = tracemalloc.take_snapshot().statistics('filename')
+    resultado['memoria'] = [(estadistica.traceback[0].filename, estadistica.size) for estadistica in por_archivo]
+print(json.dumps(resultado))
+'''
+
+
+def _ejecutar(url, memoria=False):
+    # Un proceso nuevo por medición: ningún módulo llega importado de antes
+    entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE, 'PYTHONDONTWRITEBYTECODE': ''}
+    script = f'URL = {url!r}\nMEMORIA = {memoria!r}\n' + SCRIPT
+    opciones = [] if memoria else ['-X', 'importtime']
+    proceso = subprocess.run(
+        [sys.executable, *opciones, '-c', script], capture_output=True, text=True, env=entorno,
+        cwd=settings.BASE_DIR, check=False,
+    )
+    if proceso.returncode:
+        raise RuntimeError(proceso.stderr.strip().splitlines()[-1] if proceso.stderr.strip() else "Error al medir")
+    return json.loads(proceso.stdout.strip().splitlines()[-1]), proceso.stderr
+
+
+def leer_importtime(texto):
+    # Filas (modulo, propio_us, acumulado_us) de la salida de -X importtime
+    filas = []
+    for linea in texto.splitlines():
+        coincidencia = LINEA_IMPORTTIME.match(linea)
+        if coincidencia:
+            filas.append((coincidencia[4], int(coincidencia[1]), int(coincidencia[2])))
+    return filas
+
+
+def paquete_de_archivo(ruta):
+    # Paquete de primer nivel de un archivo: el del proyecto, el de site-packages o 'stdlib'
+    ruta = os.path.abspath(ruta)
+    for base in [str(settings.BASE_DIR)] + [camino for camino in sys.path if 'site-packages' in camino]:
+        if ruta.startswith(base + os.sep):
+            return ruta[len(base) + 1:].split(os.sep)[0].removesuffix('.py')
+    return 'stdlib' if ruta.startswith(sys.prefix) or ruta.startswith(sys.base_prefix) else 'otros'
+
+
+def perfil_arranque(url='/api/facturas/', repeticiones=3, top=20, memoria=True):
+    """
+    Mide `repeticiones` arranques y devuelve las medianas, los módulos más
+    lentos de importar (del primer arranque) y, con `memoria`, lo asignado
+    por paquete durante el arranque según tracemalloc.
+    """
+    mediciones = []
+    importaciones = None
+    for _ in range(repeticiones):
+        medicion, stderr = _ejecutar(url)
+        mediciones.append(medicion)
+        importaciones = importaciones or leer_importtime(stderr)
+
+    por_paquete = defaultdict(int)
+    for modulo, propio, _ in importaciones:
+        por_paquete[modulo.split('.')[0]] += propio
+    resultado = {
+        'url': url,
+        'estado': mediciones[0]['estado'],
+        'setup_ms': round(statistics.median(medicion['setup_ms'] for medicion in mediciones), 1),
+        'primera_solicitud_ms': round(statistics.median(medicion['primera_solicitud_ms'] for medicion in mediciones), 1),
+        'rss_mb': round(statistics.median(medicion['rss_kb'] for medicion in mediciones) / 1024, 1),
+        'modulos': mediciones[0]['modulos'],
+        'importacion_ms': round(sum(propio for _, propio, _ in importaciones) / 1000, 1),
+        'paquetes_ms': {
+            paquete: round(total / 1000, 1)
+            for paquete, total in sorted(por_paquete.items(), key=lambda item: -item[1])[:top]
+        },
+        'modulos_ms': [
+            {'modulo': modulo, 'propio_ms': round(propio / 1000, 2), 'acumulado_ms': round(acumulado / 1000, 2)}
+            for modulo, propio, acumulado in sorted(importaciones, key=lambda fila: -fila[2])[:top]
+        ],
+    }
+    if memoria:
+        medicion, _ = _ejecutar(url, memoria=True)
+        por_paquete = defaultdict(int)
+        for archivo, tamano in medicion['memoria']:
+            por_paquete[paquete_de_archivo(archivo)] += tamano
+        resultado['memoria_kb'] = {
+            paquete: round(total / 1024)
+            for paquete, total in sorted(por_paquete.items(), key=lambda item: -item[1])[:top]
+        }
+    return resultado
+
+
+def comparar(anterior, actual):
+    # Cambio porcentual de las medidas generales entre dos perfiles
+    lineas = []
+    for clave in ('setup_ms', 'primera_solicitud_ms', 'rss_mb', 'importacion_ms', 'modulos'):
+        if anterior.get(clave):
+            lineas.append(f"{clave}: {anterior[clave]} -> {actual[clave]} "
+                          f"({(actual[clave] - anterior[clave]) / anterior[clave] * 100:+.1f}%)")
+    return lineas
@@ -0,0 +1,91 @@
+# cuentas/autenticacion.py
+
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from .models import Usuario
+
+DURACION_CACHE_VERSION = 60
+
+
+class UsuarioToken(TokenUser):
+    """
+    Usuario construido solo con los datos del token (id, username, email, rol
+    y permisos), sin consultar la BD.
+    """
+    @property
+    def email(self):
+        return self.token.get('email', '')
+
+    @property
+    def rol(self):
+        return self.token.get('rol', '')
+
+    @property
+    def permisos(self):
+        return self.token.get('permisos', [])
+
+
+def clave_version(usuario_id):
+    return f'auth-version:{usuario_id}'
+
+
+def version_vigente(usuario_id):
+    # (version_token, is_active) del usuario, guardado en caché por poco tiempo
+    clave = clave_version(usuario_id)
+    datos = cache.get(clave)
+    if datos is None:
+        datos = (
+            Usuario.objects.filter(pk=usuario_id).values_list('version_token', 'is_active').first()
+            or (None, False)
+        )
+        cache.set(clave, datos, DURACION_CACHE_VERSION)
+    return datos
+
+
+async def aversion_vigente(usuario_id):
+    # Versión asíncrona de version_vigente para las vistas ASGI
+    clave = clave_version(usuario_id)
+    datos = await cache.aget(clave)
+    if datos is None:
+        datos = (
+            await Usuario.objects.filter(pk=usuario_id).values_list('version_token', 'is_active').afirst()
+            or (None, False)
+        )
+        await cache.aset(clave, datos, DURACION_CACHE_VERSION)
+    return datos
+
+
+def invalidar_version(usuario_id):
+    cache.delete(clave_version(usuario_id))
+
+
+class JWTSinEstadoAuthentication(JWTStatelessUserAuthentication):
+    """
+    Autenticación JWT que no carga el Usuario de la BD en cada solicitud.
+    Solo compara la versión del token con la vigente (en caché), para que
+    los cambios de rol, permisos o contraseña y las bajas invaliden los
+    tokens emitidos antes.
+    """
+    def get_user(self, validated_token):
+        usuario = super().get_user(validated_token)
+        self.verificar_version(validated_token, *version_vigente(usuario.id))
+        return usuario
+
+    def verificar_version(self, validated_token, version, activo):
+        if not activo or validated_token.get('version', 0) != version:
+            raise AuthenticationFailed("El token ya no es válido.", code='token_not_valid')
+
+    async def aauthenticate(self, request):
+        # Igual que authenticate(), pero la versión vigente se consulta sin bloquear
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        usuario = super().get_user(validated_token)
+        self.verificar_version(validated_token, *await aversion_vigente(usuario.id))
+        return usuario, validated_token
@@ -0,0 +1,200 @@
+# cuentas/benchmarks.py
+
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from .models import Usuario, Cliente, Factura, Notificacion
+
+
+class Escenario:
+    """
+    Un escenario hace una solicitud por llamada. `preparar` se ejecuta fuera
+    de la medición (p. ej. para limpiar la caché) y `solicitud` devuelve la
+    respuesta medida.
+    """
+    def __init__(self, nombre, solicitud, preparar=None, estado=200):
+        self.nombre = nombre
+        self.solicitud = solicitud
+        self.preparar = preparar
+        self.estado = estado
+
+
+def escenarios(client, usuario, clave, azar):
+    ids_facturas = list(Factura.objects.values_list('id', flat=True)[:10000])
+    cliente = Cliente.objects.values_list('id', flat=True).first()
+    refresh = client.post('/api/token/', {'username': usuario.username, 'password': clave}).json()['refresh']
+    contador = iter(range(10 ** 9))
+
+    def crear_factura():
+        return client.post('/api/facturas/', {
+            'numero_factura': f"BENCH-{next(contador)}-{azar.randrange(10 ** 9)}",
+            'tipo': 'Cobrar', 'cliente': cliente, 'fecha_emision': '2024-01-01',
+            'fecha_vencimiento': '2024-02-01', 'monto_total': '150.00',
+        })
+
+    return [
+        Escenario('facturas_listado', lambda: client.get('/api/facturas/?page_size=100')),
+        Escenario('facturas_listado_expand', lambda: client.get('/api/facturas/?page_size=100&expand=cliente,proveedor')),
+        Escenario('facturas_detalle', lambda: client.get(f'/api/facturas/{azar.choice(ids_facturas)}/')),
+        Escenario('facturas_crear', crear_factura, estado=201),
+        Escenario('notificaciones_listado', lambda: client.get('/api/notificaciones/?page_size=100')),
+        Escenario('dashboard', lambda: client.get('/api/dashboard-metrics/')),
+        Escenario('dashboard_sin_cache', lambda: client.get('/api/dashboard-metrics/'), preparar=cache.clear),
+        Escenario('flujo_caja', lambda: client.get('/api/flujo-caja/?dias=365')),
+        Escenario('flujo_caja_sin_cache', lambda: client.get('/api/flujo-caja/?dias=365'), preparar=cache.clear),
+        Escenario('token_obtener', lambda: client.post(
+            '/api/token/', {'username': usuario.username, 'password': clave})),
+        Escenario('token_refrescar', lambda: client.post('/api/token/refresh/', {'refresh': refresh})),
+    ]
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def medir(escenario, repeticiones, calentamiento=5):
+    for _ in range(calentamiento):
+        if escenario.preparar:
+            escenario.preparar()
+        escenario.solicitud()
+
+    tiempos = []
+    consultas = 0
+    for _ in range(repeticiones):
+        if escenario.preparar:
+            escenario.preparar()
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            response = escenario.solicitud()
+            tiempos.append(time.perf_counter() - inicio)
+        consultas += len(capturadas)
+        if response.status_code != escenario.estado:
+            raise RuntimeError(f"{escenario.nombre}: respuesta {response.status_code}")
+
+    # Las asignaciones se miden en una pasada aparte para no distorsionar las latencias
+    picos = []
+    tracemalloc.start()
+    for _ in range(max(1, repeticiones // 10)):
+        if escenario.preparar:
+            escenario.preparar()
+        tracemalloc.reset_peak()
+        antes = tracemalloc.get_traced_memory()[0]
+        escenario.solicitud()
+        picos.append(tracemalloc.get_traced_memory()[1] - antes)
+    tracemalloc.stop()
+
+    return {
+        'solicitudes': repeticiones,
+        'p50_ms': round(_percentil(tiempos, 50) * 1000, 3),
+        'p95_ms': round(_percentil(tiempos, 95) * 1000, 3),
+        'p99_ms': round(_percentil(tiempos, 99) * 1000, 3),
+        'media_ms': round(statistics.fmean(tiempos) * 1000, 3),
+        'consultas_por_solicitud': round(consultas / repeticiones, 2),
+        'memoria_pico_kb': round(statistics.median(picos) / 1024, 1),
+    }
+
+
+def _cpu(funcion, repeticiones):
+    # Menor tiempo de CPU (time.process_time) entre varias ejecuciones
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.process_time()
+        funcion()
+        duracion = time.process_time() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+
+def medir_serializacion(filas=5000, repeticiones=5):
+    """
+    CPU por fila de los listados de facturas y notificaciones con los
+    serializers y con la lectura rápida: solo la serialización (filas ya
+    leídas) y en total, incluida la consulta.
+    """
+    from .lectura import LECTURA_FACTURAS, LECTURA_NOTIFICACIONES
+    from .serializers import FacturaSerializer, NotificacionSerializer
+    from .views import NotificacionViewSet
+
+    caminos = {
+        'facturas': (FacturaSerializer, Factura.objects.order_by('-id'), LECTURA_FACTURAS),
+        'notificaciones': (NotificacionSerializer, NotificacionViewSet.queryset.order_by('-id'), LECTURA_NOTIFICACIONES),
+    }
+    resultados = {}
+    for nombre, (serializer, queryset, lectura) in caminos.items():
+        instancias = list(queryset[:filas])
+        tuplas = list(lectura.consulta(queryset)[:filas])
+        if not tuplas:
+            continue
+        tiempos = {
+            'serializer': _cpu(lambda: serializer(instancias, many=True).data, repeticiones),
+            'rapida': _cpu(lambda: lectura.renderizar(tuplas), repeticiones),
+            'serializer_total': _cpu(lambda: serializer(list(queryset[:filas]), many=True).data, repeticiones),
+            'rapida_total': _cpu(lambda: lectura.renderizar(lectura.consulta(queryset)[:filas]), repeticiones),
+        }
+        resultados[nombre] = {'filas': len(tuplas)}
+        for camino, duracion in tiempos.items():
+            resultados[nombre][f'{camino}_us_por_fila'] = round(duracion / len(tuplas) * 1e6, 2)
+        resultados[nombre]['mejora'] = round(tiempos['serializer'] / tiempos['rapida'], 1)
+        resultados[nombre]['mejora_total'] = round(tiempos['serializer_total'] / tiempos['rapida_total'], 1)
+    return resultados
+
+
+def ejecutar_benchmarks(repeticiones=200, semilla=0, solo=None, datos=None):
+    """
+    Ejecuta los escenarios sobre la BD actual (se espera una BD de prueba ya
+    poblada con generar_datos) y devuelve un diccionario serializable a JSON.
+    """
+    azar = random.Random(semilla)
+    clave = 'benchmark-clave'
+    usuario = Usuario.objects.create_user('benchmark', 'benchmark@example.com', clave, rol='Administrador')
+    client = Client()
+    token = client.post('/api/token/', {'username': usuario.username, 'password': clave}).json()['access']
+    client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+    resultados = {}
+    for escenario in escenarios(client, usuario, clave, azar):
+        if solo and escenario.nombre not in solo:
+            continue
+        resultados[escenario.nombre] = medir(escenario, repeticiones)
+
+    return {
+        'entorno': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'bd': connection.vendor,
+        },
+        'datos': datos or {},
+        'escenarios': resultados,
+        'serializacion': medir_serializacion(),
+    }
+
+
+def comparar(anterior, actual):
+    # Diferencia porcentual de p50/p95 y consultas por escenario entre dos resultados
+    lineas = []
+    for nombre, medidas in actual['escenarios'].items():
+        previas = anterior.get('escenarios', {}).get(nombre)
+        if not previas:
+            continue
+        cambios = []
+        for clave in ('p50_ms', 'p95_ms', 'consultas_por_solicitud'):
+            if previas[clave]:
+                cambios.append(f"{clave} {(medidas[clave] - previas[clave]) / previas[clave] * 100:+.1f}%")
+            else:
+                cambios.append(f"{clave} {previas[clave]} -> {medidas[clave]}")
+        lineas.append(f"{nombre}: " + ", ".join(cambios))
+    return lineas
+
+
+def a_json(resultado):
+    return json.dumps(resultado, indent=2, sort_keys=True)
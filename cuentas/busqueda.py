@@ -0,0 +1,86 @@
+# cuentas/busqueda.py
+#
+# Búsqueda de clientes, proveedores y facturas. En PostgreSQL usa la columna
+# tsvector `busqueda` (generada y con índice GIN, ver migración 0009) y los
+# índices pg_trgm sobre nombre y número de factura; en otras bases de datos
+# (SQLite en las pruebas) se usa icontains con un ranking simple.
+
+import re
+from django.db import connection
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from .models import Cliente, Proveedor, Factura
+
+CAMPOS_CONTRAPARTE = ('id', 'nombre', 'email')
+TIPOS = {
+    'clientes': (Cliente, CAMPOS_CONTRAPARTE),
+    'proveedores': (Proveedor, CAMPOS_CONTRAPARTE),
+    'facturas': (Factura, (
+        'id', 'numero_factura', 'tipo', 'estado', 'monto_total', 'fecha_vencimiento', 'cliente_id', 'proveedor_id',
+    )),
+}
+LONGITUD_MINIMA = 2
+
+
+def consulta_prefijos(texto):
+    # "ana gar" -> "ana:* & gar:*" para to_tsquery; solo quedan caracteres de palabra
+    return ' & '.join(f'{palabra}:*' for palabra in re.findall(r'\w+', texto))
+
+
+def _escapar_like(texto):
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def buscar(tipo, texto):
+    """
+    Devuelve un queryset de valores (con `rank`) de los objetos de `tipo` que
+    coinciden con `texto`, ordenado por relevancia. Se pagina con slicing.
+    """
+    modelo, campos = TIPOS[tipo]
+    if connection.vendor == 'postgresql':
+        coincide, rank = _condiciones_postgresql(modelo, texto)
+        queryset = modelo.objects.filter(coincide).annotate(rank=rank)
+    else:
+        queryset = _buscar_generico(modelo, texto)
+    return queryset.order_by('-rank', 'id').values(*campos, 'rank')
+
+
+def _condiciones_postgresql(modelo, texto):
+    tabla = connection.ops.quote_name(modelo._meta.db_table)
+    prefijo = _escapar_like(texto) + '%'
+    if modelo is Factura:
+        # pg_trgm: el índice GIN sirve tanto para ILIKE '%...%' como para word_similarity (<%)
+        columna = f'{tabla}."numero_factura"'
+        coincide = RawSQL(
+            f"({columna} ILIKE %s OR %s <%% {columna})",
+            ('%' + _escapar_like(texto) + '%', texto), output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"word_similarity(%s, {columna}) + CASE WHEN {columna} ILIKE %s THEN 1 ELSE 0 END",
+            (texto, prefijo), output_field=FloatField(),
+        )
+        return coincide, rank
+
+    columna = f'{tabla}."nombre"'
+    consulta = consulta_prefijos(texto)
+    coincide = RawSQL(
+        f"({tabla}.\"busqueda\" @@ to_tsquery('simple', %s) OR %s <%% {columna})",
+        (consulta, texto), output_field=BooleanField(),
+    )
+    rank = RawSQL(
+        f"ts_rank({tabla}.\"busqueda\", to_tsquery('simple', %s)) + word_similarity(%s, {columna})",
+        (consulta, texto), output_field=FloatField(),
+    )
+    return coincide, rank
+
+
+def _buscar_generico(modelo, texto):
+    if modelo is Factura:
+        filtro = Q(numero_factura__icontains=texto)
+        al_inicio = Q(numero_factura__istartswith=texto)
+    else:
+        filtro = Q(nombre__icontains=texto) | Q(email__icontains=texto)
+        al_inicio = Q(nombre__istartswith=texto) | Q(email__istartswith=texto)
+    return modelo.objects.filter(filtro).annotate(
+        rank=Case(When(al_inicio, then=Value(2.0)), default=Value(1.0), output_field=FloatField())
+    )
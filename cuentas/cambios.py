@@ -0,0 +1,163 @@
+# cuentas/cambios.py
+#
+# Registro de cambios de facturas y notificaciones. Las señales anotan cada
+# save/delete y los caminos masivos (barrido de vencidas, carga, archivo,
+# pagos, notificaciones) anotan sus ids en lote, en la misma transacción que
+# el cambio. /api/async/cambios/ los transmite como server-sent events desde
+# un número de secuencia, así los clientes no tienen que releer los listados.
+
+import asyncio
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from .models import Cambio, Factura, Notificacion
+
+TAMANO_LOTE = 1000
+CAMPOS = ('id', 'modelo', 'objeto_id', 'accion', 'fecha')
+# Datos que acompañan a cada cambio (la misma salida que los listados). Las
+# lecturas se importan al usarse: las señales cargan este módulo en
+# django.setup() y cuentas.lectura arrastra los serializers de DRF.
+LECTURAS = {
+    'factura': (Factura, 'LECTURA_FACTURAS'),
+    'notificacion': (Notificacion, 'LECTURA_NOTIFICACIONES'),
+}
+INTERVALO_SEGUNDOS = 1
+LATIDO_SEGUNDOS = 15
+
+
+def registrar(modelo, ids, accion):
+    # Anota `accion` para los objetos `ids` de `modelo` (Factura o Notificacion)
+    ahora = timezone.now()
+    nombre = modelo._meta.model_name
+    Cambio.objects.bulk_create(
+        (Cambio(modelo=nombre, objeto_id=pk, accion=accion, fecha=ahora) for pk in ids),
+        batch_size=TAMANO_LOTE,
+    )
+
+
+def purgar(dias=None):
+    # Borra los cambios más antiguos que la retención; devuelve cuántos
+    dias = getattr(settings, 'CAMBIOS_RETENCION_DIAS', 7) if dias is None else dias
+    borrados, _ = Cambio.objects.filter(fecha__lt=timezone.now() - timedelta(days=dias)).delete()
+    return borrados
+
+
+def _evento(nombre, data, id=None):
+    texto = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return (f'id: {id}\n' if id is not None else '') + f'event: {nombre}\ndata: {texto}\n\n'
+
+
+async def _con_datos(cambios):
+    # Agrega los datos actuales de los objetos creados o actualizados, con una consulta por modelo
+    from . import lectura as modulo_lectura
+
+    datos = {}
+    for nombre, (modelo, atributo) in LECTURAS.items():
+        lectura = getattr(modulo_lectura, atributo)
+        ids = {cambio['objeto_id'] for cambio in cambios if cambio['modelo'] == nombre and cambio['accion'] != 'eliminar'}
+        if ids:
+            filas = [fila async for fila in lectura.consulta(modelo.objects.filter(pk__in=ids))]
+            datos.update(((nombre, fila['id']), fila) for fila in lectura.renderizar(filas))
+    for cambio in cambios:
+        # None si el objeto ya no existe: le sigue su cambio 'eliminar'
+        cambio['datos'] = datos.get((cambio['modelo'], cambio['objeto_id']))
+    return cambios
+
+
+def _quitar(huecos, ids):
+    # Parte los huecos para dejar fuera los ids ya enviados (ordenados)
+    resultado = []
+    ids = iter(ids)
+    siguiente = next(ids, None)
+    for primero, ultimo, hasta in huecos:
+        while siguiente is not None and siguiente <= ultimo:
+            if siguiente > primero:
+                resultado.append((primero, siguiente - 1, hasta))
+            primero = max(primero, siguiente + 1)
+            siguiente = next(ids, None)
+        if primero <= ultimo:
+            resultado.append((primero, ultimo, hasta))
+    return resultado
+
+
+async def eventos(desde=None, modelos=None, seguir=True):
+    """
+    Genera los eventos SSE de los cambios posteriores a `desde`. Sin `desde`
+    empieza en el último cambio (evento 'inicio'); si `desde` ya se purgó
+    envía 'reinicio' para que el cliente recargue. Con `seguir` espera
+    cambios nuevos indefinidamente; si no, termina al agotar los pendientes.
+
+    Los ids se asignan al insertar pero se ven al confirmar, así que un hueco
+    en la secuencia puede ser una transacción aún abierta: se espera hasta
+    CAMBIOS_MARGEN_SEGUNDOS antes de avanzar (p. ej. fue un rollback). Los
+    huecos saltados se siguen revisando durante CAMBIOS_REVISION_SEGUNDOS y
+    lo que aparezca en ellos (una transacción larga, como una carga masiva)
+    se envía tarde, con el id del cursor actual para no retroceder.
+
+    Esa revisión vive en la conexión: un cliente que se reconecta con
+    Last-Event-ID no recupera los cambios confirmados tarde en huecos que ya
+    había pasado, ni nada llega si la transacción dura más que la revisión.
+    Quien necesite exactitud debe recargar el listado tras reconectarse.
+    """
+    margen = getattr(settings, 'CAMBIOS_MARGEN_SEGUNDOS', 10)
+    revision = getattr(settings, 'CAMBIOS_REVISION_SEGUNDOS', 3600)
+    extremos = await Cambio.objects.aaggregate(primero=Min('id'), ultimo=Max('id'))
+    ultimo_id = extremos['ultimo'] or 0
+    if desde is None:
+        desde = ultimo_id
+        yield _evento('inicio', {'ultimo': desde}, id=desde)
+    elif extremos['primero'] is not None and desde + 1 < extremos['primero']:
+        desde = ultimo_id
+        yield _evento('reinicio', {'ultimo': desde}, id=desde)
+
+    hueco_desde = None
+    # Huecos saltados que se siguen revisando: (primer id, último id, revisar hasta)
+    huecos = []
+    ultimo_envio = time.monotonic()
+    while True:
+        filas = [
+            fila async for fila in Cambio.objects.filter(id__gt=desde).order_by('id')
+            .values(*CAMPOS)[:TAMANO_LOTE]
+        ]
+        confirmados = []
+        for fila in filas:
+            if fila['id'] != desde + 1:
+                hueco_desde = hueco_desde or time.monotonic()
+                if time.monotonic() - hueco_desde < margen:
+                    break
+                huecos.append((desde + 1, fila['id'] - 1, time.monotonic() + revision))
+            hueco_desde = None
+            confirmados.append(fila)
+            desde = fila['id']
+
+        tardios = []
+        huecos = [hueco for hueco in huecos if hueco[2] > time.monotonic()]
+        if huecos:
+            en_huecos = Q()
+            for primero, ultimo, _ in huecos:
+                en_huecos |= Q(id__range=(primero, ultimo))
+            tardios = [
+                fila async for fila in Cambio.objects.filter(en_huecos).order_by('id').values(*CAMPOS)[:TAMANO_LOTE]
+            ]
+            huecos = _quitar(huecos, [fila['id'] for fila in tardios])
+
+        ids_tardios = {fila['id'] for fila in tardios}
+        enviar = [fila for fila in confirmados + tardios if not modelos or fila['modelo'] in modelos]
+        for cambio in await _con_datos(enviar):
+            yield _evento('cambio', cambio, id=desde if cambio['id'] in ids_tardios else cambio['id'])
+        if enviar:
+            ultimo_envio = time.monotonic()
+
+        if len(confirmados) == TAMANO_LOTE or len(tardios) == TAMANO_LOTE:
+            continue
+        if not seguir and hueco_desde is None:
+            return
+        if time.monotonic() - ultimo_envio >= LATIDO_SEGUNDOS:
+            # Comentario SSE: mantiene abierta la conexión a través de proxies
+            yield ': latido\n\n'
+            ultimo_envio = time.monotonic()
+        await asyncio.sleep(INTERVALO_SEGUNDOS)
@@ -0,0 +1,326 @@
+# cuentas/carga.py
+
+import csv
+import json
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .models import Cliente, Proveedor, Factura, FacturaArchivada
+from .resumen import registrar_grupos
+from . import cambios, saldos
+
+TAMANO_LOTE = 2000
+MAX_ERRORES = 1000
+TIPOS = dict(Factura.TIPO_CHOICES)
+ESTADOS = dict(Factura.ESTADO_CHOICES)
+MONTO_MAXIMO = Decimal('99999999.99')
+
+
+def leer_filas(request):
+    """
+    Devuelve un iterador de diccionarios con las filas del cuerpo de la solicitud.
+    Acepta un arreglo JSON, CSV con cabecera (text/csv) o NDJSON (application/x-ndjson),
+    los dos últimos leídos línea por línea sin cargar todo el archivo en memoria.
+    """
+    tipo_contenido = (request.content_type or '').split(';')[0].strip()
+    if tipo_contenido == 'text/csv':
+        lineas = (linea.decode('utf-8-sig') for linea in (request.stream or []))
+        return csv.DictReader(lineas)
+    if tipo_contenido in ('application/x-ndjson', 'application/jsonlines'):
+        return _leer_ndjson(request.stream or [])
+    if not isinstance(request.data, list):
+        return None
+    return iter(request.data)
+
+
+def _leer_ndjson(stream):
+    for linea in stream:
+        linea = linea.strip()
+        if linea:
+            try:
+                yield json.loads(linea)
+            except ValueError:
+                yield None
+
+
+def _validar_fila(fila, hoy):
+    # Validación de una fila sin consultar la BD; devuelve (valores, errores)
+    if not isinstance(fila, dict):
+        return None, {'non_field_errors': ["Fila con formato inválido."]}
+
+    errores = {}
+    valores = {}
+
+    numero = str(fila.get('numero_factura') or '').strip()
+    if not numero:
+        errores['numero_factura'] = ["Este campo es requerido."]
+    elif len(numero) > 50:
+        errores['numero_factura'] = ["No puede tener más de 50 caracteres."]
+    valores['numero_factura'] = numero
+
+    # isinstance antes de buscar en el dict: una lista o un objeto no son hashables
+    tipo = fila.get('tipo')
+    if not isinstance(tipo, str) or tipo not in TIPOS:
+        errores['tipo'] = [f"'{tipo}' no es una opción válida."]
+    valores['tipo'] = tipo
+
+    for campo in ('cliente', 'proveedor'):
+        valor = fila.get(campo)
+        if valor in (None, ''):
+            valores[campo + '_id'] = None
+            continue
+        try:
+            valores[campo + '_id'] = int(valor)
+        except (TypeError, ValueError):
+            errores[campo] = ["Debe ser un id válido."]
+
+    for campo in ('fecha_emision', 'fecha_vencimiento'):
+        try:
+            valores[campo] = parse_date(str(fila.get(campo) or ''))
+        except ValueError:
+            valores[campo] = None
+        if valores[campo] is None:
+            errores[campo] = ["Debe ser una fecha con formato AAAA-MM-DD."]
+
+    try:
+        monto = Decimal(str(fila.get('monto_total'))).quantize(Decimal('0.01'))
+        if not monto.is_finite() or abs(monto) > MONTO_MAXIMO:
+            raise InvalidOperation
+        valores['monto_total'] = monto
+    except (InvalidOperation, ValueError):
+        errores['monto_total'] = ["Debe ser un número válido de hasta 10 dígitos y 2 decimales."]
+    else:
+        # El saldo pendiente arranca en el monto y no puede ser negativo
+        if monto < 0:
+            errores['monto_total'] = ["El monto no puede ser negativo."]
+
+    estado = fila.get('estado') or 'Pendiente'
+    if not isinstance(estado, str) or estado not in ESTADOS:
+        errores['estado'] = [f"'{estado}' no es una opción válida."]
+    elif estado == 'Pendiente' and valores.get('fecha_vencimiento') and valores['fecha_vencimiento'] < hoy:
+        estado = 'Vencida'
+    valores['estado'] = estado
+
+    # Mismas reglas que FacturaSerializer.validate
+    if tipo == 'Cobrar' and not valores.get('cliente_id'):
+        errores.setdefault('non_field_errors', []).append("Debe asignar un cliente si el tipo es 'Por Cobrar'")
+    if tipo == 'Cobrar' and valores.get('proveedor_id'):
+        errores.setdefault('non_field_errors', []).append("No debe asignar un proveedor si el tipo es 'Por Cobrar'")
+    if tipo == 'Pagar' and not valores.get('proveedor_id'):
+        errores.setdefault('non_field_errors', []).append("Debe asignar un proveedor si el tipo es 'Por Pagar'")
+    if tipo == 'Pagar' and valores.get('cliente_id'):
+        errores.setdefault('non_field_errors', []).append("No debe asignar un cliente si el tipo es 'Por Pagar'")
+
+    return valores, errores
+
+
+class CargaFacturas:
+    """
+    Valida e inserta facturas por lotes dentro de una transacción. Si alguna
+    fila tiene errores no se guarda ninguna, pero se siguen validando las demás
+    para informar todos los errores (hasta MAX_ERRORES).
+    """
+    def __init__(self):
+        self.hoy = timezone.localdate()
+        self.vistos = set()
+        self.errores = []
+        self.total_errores = 0
+        self.creadas = 0
+        self.grupos = defaultdict(lambda: {'total': Decimal(0), 'cantidad': 0})
+        self.saldos = saldos.nuevos_deltas()
+
+    def ejecutar(self, filas):
+        with transaction.atomic():
+            lote = []
+            for indice, fila in enumerate(filas):
+                lote.append((indice, fila))
+                if len(lote) == TAMANO_LOTE:
+                    self._procesar_lote(lote)
+                    lote = []
+            if lote:
+                self._procesar_lote(lote)
+
+            if self.total_errores:
+                transaction.set_rollback(True)
+                self.creadas = 0
+                return self
+
+            # bulk_create no envía señales: el resumen mensual y los saldos se ajustan por grupos
+            registrar_grupos([
+                {'anio': anio, 'mes': mes, 'tipo': tipo, 'estado': estado, **valores}
+                for (anio, mes, tipo, estado), valores in self.grupos.items()
+            ])
+            saldos.aplicar(self.saldos)
+        return self
+
+    def _procesar_lote(self, lote):
+        facturas = self._validar_lote(lote)
+        if self.total_errores:
+            return
+
+        Factura.objects.bulk_create(facturas)
+        cambios.registrar(Factura, [factura.pk for factura in facturas], 'crear')
+        self.creadas += len(facturas)
+        for factura in facturas:
+            grupo = self.grupos[(factura.fecha_emision.year, factura.fecha_emision.month, factura.tipo, factura.estado)]
+            grupo['total'] += factura.monto_total
+            grupo['cantidad'] += 1
+            saldos.acumular(self.saldos, factura.valores_resumen())
+
+    def _agregar_error(self, indice, errores):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({'fila': indice, 'errores': errores})
+
+    def _validar_lote(self, lote):
+        # Las comprobaciones contra la BD (números repetidos, clientes y proveedores
+        # existentes) se hacen con una consulta por conjunto para todo el lote
+        validas = []
+        for indice, fila in lote:
+            valores, errores = _validar_fila(fila, self.hoy)
+            numero = valores['numero_factura'] if valores else None
+            if numero and numero in self.vistos:
+                errores.setdefault('numero_factura', []).append("Número repetido dentro de la carga.")
+            if numero:
+                self.vistos.add(numero)
+            if errores:
+                self._agregar_error(indice, errores)
+            else:
+                validas.append((indice, valores))
+
+        numeros = [valores['numero_factura'] for _, valores in validas]
+        # También las archivadas: restaurarlas fallaría si su número se reutilizó
+        existentes = set(Factura.objects.filter(numero_factura__in=numeros).values_list('numero_factura', flat=True))
+        existentes.update(
+            FacturaArchivada.objects.filter(numero_factura__in=numeros).values_list('numero_factura', flat=True)
+        )
+        clientes = {valores['cliente_id'] for _, valores in validas if valores['cliente_id']}
+        clientes_existentes = set(Cliente.objects.filter(pk__in=clientes).values_list('pk', flat=True))
+        proveedores = {valores['proveedor_id'] for _, valores in validas if valores['proveedor_id']}
+        proveedores_existentes = set(Proveedor.objects.filter(pk__in=proveedores).values_list('pk', flat=True))
+
+        facturas = []
+        for indice, valores in validas:
+            errores = {}
+            if valores['numero_factura'] in existentes:
+                errores['numero_factura'] = ["Ya existe una factura con este número."]
+            if valores['cliente_id'] and valores['cliente_id'] not in clientes_existentes:
+                errores['cliente'] = ["El cliente no existe."]
+            if valores['proveedor_id'] and valores['proveedor_id'] not in proveedores_existentes:
+                errores['proveedor'] = ["El proveedor no existe."]
+            if errores:
+                self._agregar_error(indice, errores)
+            else:
+                facturas.append(Factura(**valores))
+        return facturas
+
+
+# Campos que se sincronizan de clientes y proveedores; la clave es el email
+CAMPOS_CONTRAPARTE = ('nombre', 'telefono', 'direccion')
+
+
+def _validar_contraparte(fila):
+    # Igual que _validar_fila para clientes y proveedores; los campos opcionales
+    # ausentes o vacíos quedan en None (la carga reemplaza los datos)
+    if not isinstance(fila, dict):
+        return None, {'non_field_errors': ["Fila con formato inválido."]}
+
+    errores = {}
+    email = str(fila.get('email') or '').strip()
+    try:
+        validate_email(email)
+    except ValidationError:
+        errores['email'] = ["Debe ser un email válido."]
+    nombre = str(fila.get('nombre') or '').strip()
+    if not nombre:
+        errores['nombre'] = ["Este campo es requerido."]
+    elif len(nombre) > 100:
+        errores['nombre'] = ["No puede tener más de 100 caracteres."]
+    telefono = str(fila.get('telefono') or '').strip() or None
+    if telefono and len(telefono) > 15:
+        errores['telefono'] = ["No puede tener más de 15 caracteres."]
+    direccion = str(fila.get('direccion') or '').strip() or None
+    return {'email': email, 'nombre': nombre, 'telefono': telefono, 'direccion': direccion}, errores
+
+
+class SincronizacionContrapartes:
+    """
+    Inserta o actualiza clientes o proveedores por email con
+    bulk_create(update_conflicts=True), por lotes y en una transacción. Las
+    filas iguales a lo guardado no se escriben. Igual que CargaFacturas, si
+    alguna fila tiene errores no se guarda ninguna.
+    """
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.vistos = set()
+        self.errores = []
+        self.total_errores = 0
+        self.insertados = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+
+    def ejecutar(self, filas):
+        with transaction.atomic():
+            lote = []
+            for indice, fila in enumerate(filas):
+                lote.append((indice, fila))
+                if len(lote) == TAMANO_LOTE:
+                    self._procesar_lote(lote)
+                    lote = []
+            if lote:
+                self._procesar_lote(lote)
+
+            if self.total_errores:
+                transaction.set_rollback(True)
+                self.insertados = self.actualizados = self.sin_cambios = 0
+        return self
+
+    def _agregar_error(self, indice, errores):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append({'fila': indice, 'errores': errores})
+
+    def _procesar_lote(self, lote):
+        validas = []
+        for indice, fila in lote:
+            valores, errores = _validar_contraparte(fila)
+            email = valores['email'] if valores else None
+            if email and email in self.vistos:
+                errores.setdefault('email', []).append("Email repetido dentro de la carga.")
+            if email:
+                self.vistos.add(email)
+            if errores:
+                self._agregar_error(indice, errores)
+            else:
+                validas.append(valores)
+        if self.total_errores:
+            return
+
+        # Contenido guardado de los emails del lote, con una consulta
+        guardados = {
+            email: tuple(valor or None for valor in contenido)
+            for email, *contenido in self.modelo.objects.filter(
+                email__in=[valores['email'] for valores in validas]
+            ).values_list('email', *CAMPOS_CONTRAPARTE)
+        }
+        cambiados = []
+        for valores in validas:
+            anterior = guardados.get(valores['email'])
+            if anterior is None:
+                self.insertados += 1
+            elif anterior == tuple(valores[campo] for campo in CAMPOS_CONTRAPARTE):
+                self.sin_cambios += 1
+                continue
+            else:
+                self.actualizados += 1
+            cambiados.append(self.modelo(**valores))
+
+        # Si otra carga insertó el mismo email entre la lectura y la escritura, se actualiza
+        self.modelo.objects.bulk_create(
+            cambiados, update_conflicts=True, unique_fields=['email'],
+            update_fields=[*CAMPOS_CONTRAPARTE, 'actualizado_en'],
+        )
@@ -0,0 +1,78 @@
+# cuentas/condicional.py
+#
+# GET condicionales (ETag / Last-Modified) para los ModelViewSets. Los
+# validadores salen de una consulta MAX(actualizado_en)/COUNT sobre el mismo
+# queryset del listado o del detalle, sin serializar nada; si el cliente ya
+# tiene esa versión se responde 304.
+
+import hashlib
+from datetime import datetime, time
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class CacheCondicionalMixin:
+    # Relaciones cuyo actualizado_en también cambia la respuesta (p. ej. datos expandidos)
+    relaciones_validacion = ()
+
+    def get_relaciones_validacion(self):
+        return self.relaciones_validacion
+
+    def vigente_desde(self):
+        # Fecha mínima de Last-Modified, para respuestas que cambian aunque no cambien las filas
+        return None
+
+    def validadores(self, queryset):
+        relaciones = self.get_relaciones_validacion()
+        agregados = {'ultima': Max('actualizado_en'), 'cantidad': Count('pk')}
+        for relacion in relaciones:
+            agregados[f'ultima_{relacion}'] = Max(f'{relacion}__actualizado_en')
+        datos = queryset.order_by().aggregate(**agregados)
+
+        fechas = [datos['ultima']] + [datos[f'ultima_{relacion}'] for relacion in relaciones]
+        fechas = [fecha for fecha in fechas + [self.vigente_desde()] if fecha]
+        ultima = max(fechas) if fechas else None
+        huella = '|'.join([
+            self.request.get_full_path(), str(self.request.user.pk), str(datos['cantidad']),
+            *(fecha.isoformat() for fecha in fechas),
+        ])
+        etag = quote_etag(hashlib.md5(huella.encode()).hexdigest())
+        return datos['cantidad'], etag, int(ultima.timestamp()) if ultima else None
+
+    def agregar_validadores(self, response, etag, ultima):
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if ultima is not None:
+                response['Last-Modified'] = http_date(ultima)
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        _, etag, ultima = self.validadores(self.filter_queryset(self.get_queryset()))
+        response = get_conditional_response(request, etag=etag, last_modified=ultima)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return self.agregar_validadores(response, etag, ultima)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(**{self.lookup_field: lookup})
+            cantidad, etag, ultima = self.validadores(queryset)
+        except (TypeError, ValueError, ValidationError):
+            cantidad = 0
+        if not cantidad:
+            # No existe (o el pk no es válido): la vista normal responde 404
+            return super().retrieve(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag, last_modified=ultima)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return self.agregar_validadores(response, etag, ultima)
+
+
+def inicio_del_dia():
+    # Medianoche local de hoy, como datetime con zona horaria
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
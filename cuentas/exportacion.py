@@ -0,0 +1,78 @@
+# cuentas/exportacion.py
+
+import csv
+import json
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+TAMANO_LOTE = 2000
+FORMATOS = ('csv', 'ndjson')
+
+COLUMNAS_FACTURA = [
+    'id', 'numero_factura', 'tipo', 'cliente_id', 'cliente', 'proveedor_id', 'proveedor',
+    'fecha_emision', 'fecha_vencimiento', 'monto_total', 'saldo_pendiente', 'estado',
+]
+
+
+class Eco:
+    # Objeto tipo archivo cuyo write devuelve el texto, para que csv.writer genere trozos
+    def write(self, valor):
+        return valor
+
+
+def filas_facturas(queryset):
+    """
+    Recorre las facturas con un cursor del lado del servidor (iterator) y
+    devuelve tuplas en el orden de COLUMNAS_FACTURA, con los nombres de cliente
+    y proveedor traídos en la misma consulta.
+    """
+    hoy = timezone.localdate()
+    filas = (
+        queryset
+        .order_by('id')
+        .values_list(
+            'id', 'numero_factura', 'tipo', 'cliente_id', 'cliente__nombre', 'proveedor_id', 'proveedor__nombre',
+            'fecha_emision', 'fecha_vencimiento', 'monto_total', 'saldo_pendiente', 'estado',
+        )
+        .iterator(chunk_size=TAMANO_LOTE)
+    )
+    for fila in filas:
+        # Mismo criterio que Factura.estado_actual
+        if fila[11] == 'Pendiente' and fila[8] < hoy:
+            fila = fila[:11] + ('Vencida',)
+        yield fila
+
+
+def _valor(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, (int, str)):
+        return valor
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _generar_csv(columnas, filas):
+    escritor = csv.writer(Eco())
+    yield escritor.writerow(columnas)
+    for fila in filas:
+        yield escritor.writerow([_valor(valor) for valor in fila])
+
+
+def _generar_ndjson(columnas, filas):
+    for fila in filas:
+        yield json.dumps(dict(zip(columnas, map(_valor, fila))), ensure_ascii=False) + '\n'
+
+
+def respuesta_exportacion(formato, nombre, columnas, filas):
+    # Respuesta que empieza a enviar datos de inmediato y usa memoria constante
+    if formato == 'ndjson':
+        contenido = _generar_ndjson(columnas, filas)
+        tipo = 'application/x-ndjson'
+    else:
+        contenido = _generar_csv(columnas, filas)
+        tipo = 'text/csv; charset=utf-8'
+    response = StreamingHttpResponse(contenido, content_type=tipo)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+    return response
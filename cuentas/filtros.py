@@ -0,0 +1,89 @@
+# cuentas/filtros.py
+
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from .models import Factura
+
+
+def obtener_fecha(params, nombre):
+    valor = params.get(nombre)
+    if not valor:
+        return None
+    try:
+        fecha = parse_date(valor)
+    except ValueError:
+        fecha = None
+    if fecha is None:
+        raise ValidationError({nombre: "Debe ser una fecha con formato AAAA-MM-DD."})
+    return fecha
+
+
+def obtener_entero(params, nombre):
+    valor = params.get(nombre)
+    if not valor:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValidationError({nombre: "Debe ser un número entero."})
+
+
+def obtener_opcion(params, nombre, opciones):
+    valor = params.get(nombre)
+    if valor and valor not in opciones:
+        raise ValidationError({nombre: f"Debe ser uno de: {', '.join(opciones)}."})
+    return valor or None
+
+
+def obtener_booleano(params, nombre):
+    return params.get(nombre) in ('1', 'true')
+
+
+def filtrar_facturas(queryset, params):
+    """
+    Filtra facturas según los parámetros de la consulta:
+    tipo, estado, cliente, proveedor, emision_desde, emision_hasta,
+    vencimiento_desde y vencimiento_hasta.
+    """
+    tipo = obtener_opcion(params, 'tipo', dict(Factura.TIPO_CHOICES))
+    if tipo:
+        queryset = queryset.filter(tipo=tipo)
+
+    estado = obtener_opcion(params, 'estado', dict(Factura.ESTADO_CHOICES))
+    if estado == 'Vencida':
+        # Incluye las pendientes que vencieron antes del próximo barrido diario
+        queryset = queryset.vencidas()
+    elif estado == 'Pendiente':
+        queryset = queryset.pendientes()
+    elif estado:
+        queryset = queryset.filter(estado=estado)
+
+    for parametro, campo in (('cliente', 'cliente_id'), ('proveedor', 'proveedor_id')):
+        valor = obtener_entero(params, parametro)
+        if valor is not None:
+            queryset = queryset.filter(**{campo: valor})
+
+    for parametro, lookup in (
+        ('emision_desde', 'fecha_emision__gte'),
+        ('emision_hasta', 'fecha_emision__lte'),
+        ('vencimiento_desde', 'fecha_vencimiento__gte'),
+        ('vencimiento_hasta', 'fecha_vencimiento__lte'),
+    ):
+        fecha = obtener_fecha(params, parametro)
+        if fecha is not None:
+            queryset = queryset.filter(**{lookup: fecha})
+
+    return queryset
+
+
+def filtrar_notificaciones(queryset, params):
+    # Filtros de notificaciones: factura y enviada (true/false)
+    factura = obtener_entero(params, 'factura')
+    if factura is not None:
+        queryset = queryset.filter(factura_id=factura)
+
+    enviada = params.get('enviada')
+    if enviada:
+        queryset = queryset.filter(enviada=enviada.lower() in ('1', 'true', 'si', 'sí'))
+
+    return queryset
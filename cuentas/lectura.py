@@ -0,0 +1,121 @@
+# cuentas/lectura.py
+#
+# Lectura rápida para los listados de facturas y notificaciones: en lugar de
+# instanciar modelos y pasar cada campo por un ModelSerializer, se piden
+# tuplas con values_list() y se convierten directamente a la misma salida
+# JSON que producen FacturaSerializer y NotificacionSerializer. Las escrituras,
+# el detalle y las lecturas con ?expand= siguen usando los serializers.
+
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework.response import Response
+from .serializers import parametro_lista
+
+
+# Las conversiones reciben el valor (nunca None) y la zona horaria actual
+
+def _decimal(valor, zona):
+    # Igual que serializers.DecimalField(decimal_places=2) con COERCE_DECIMAL_TO_STRING
+    return f'{valor:.2f}'
+
+
+def _fecha(valor, zona):
+    return valor.isoformat()
+
+
+def _fecha_hora(valor, zona):
+    # Igual que serializers.DateTimeField: zona horaria actual, ISO 8601 y 'Z' para UTC
+    texto = valor.astimezone(zona).isoformat()
+    if texto.endswith('+00:00'):
+        texto = texto[:-6] + 'Z'
+    return texto
+
+
+class LecturaRapida:
+    """
+    `campos` es una lista de (nombre en la respuesta, expresión para
+    values_list, conversión o None). `anotaciones` calcula en la consulta los
+    campos derivados (p. ej. el estado actual de la factura).
+    """
+    def __init__(self, campos, anotaciones=None):
+        self.campos = campos
+        self.anotaciones = anotaciones
+
+    def seleccionar(self, permitidos):
+        # Aplica ?fields= conservando el orden de los campos
+        if not permitidos:
+            return self
+        campos = [campo for campo in self.campos if campo[0] in permitidos]
+        return LecturaRapida(campos, self.anotaciones)
+
+    def consulta(self, queryset):
+        # Filas con nombre para que CursorPagination pueda leer el id del cursor
+        if self.anotaciones:
+            queryset = queryset.annotate(**self.anotaciones())
+        rutas = [ruta for _, ruta, _ in self.campos]
+        if 'id' not in rutas:
+            rutas.append('id')
+        return queryset.values_list(*rutas, named=True)
+
+    def renderizar(self, filas):
+        nombres = [nombre for nombre, _, _ in self.campos]
+        conversiones = [convertir for _, _, convertir in self.campos]
+        zona = timezone.get_current_timezone()
+        return [
+            dict(zip(nombres, [
+                valor if convertir is None or valor is None else convertir(valor, zona)
+                for convertir, valor in zip(conversiones, fila)
+            ]))
+            for fila in filas
+        ]
+
+
+def _estado_actual():
+    # Mismo criterio que Factura.estado_actual, calculado en la consulta
+    return {'estado_actual': Case(
+        When(estado='Pendiente', fecha_vencimiento__lt=timezone.localdate(), then=Value('Vencida')),
+        default=F('estado'),
+    )}
+
+
+LECTURA_FACTURAS = LecturaRapida([
+    ('id', 'id', None),
+    ('numero_factura', 'numero_factura', None),
+    ('tipo', 'tipo', None),
+    ('cliente', 'cliente_id', None),
+    ('proveedor', 'proveedor_id', None),
+    ('fecha_emision', 'fecha_emision', _fecha),
+    ('fecha_vencimiento', 'fecha_vencimiento', _fecha),
+    ('monto_total', 'monto_total', _decimal),
+    ('saldo_pendiente', 'saldo_pendiente', _decimal),
+    ('estado', 'estado_actual', None),
+], anotaciones=_estado_actual)
+
+LECTURA_NOTIFICACIONES = LecturaRapida([
+    ('id', 'id', None),
+    ('factura', 'factura_id', None),
+    ('factura_numero', 'factura__numero_factura', None),
+    ('tipo', 'tipo', None),
+    ('mensaje', 'mensaje', None),
+    ('fecha_envio', 'fecha_envio', _fecha_hora),
+    ('enviada', 'enviada', None),
+])
+
+
+class ListadoRapidoMixin:
+    # Usa la lectura rápida en list() cuando get_lectura_rapida() la devuelve
+    lectura_rapida = None
+
+    def get_lectura_rapida(self):
+        return self.lectura_rapida
+
+    def list(self, request, *args, **kwargs):
+        lectura = self.get_lectura_rapida()
+        if lectura is None:
+            return super().list(request, *args, **kwargs)
+        lectura = lectura.seleccionar(parametro_lista(request, 'fields'))
+        queryset = lectura.consulta(self.filter_queryset(self.get_queryset()))
+        pagina = self.paginate_queryset(queryset)
+        if pagina is None:
+            return Response(lectura.renderizar(queryset))
+        return self.get_paginated_response(lectura.renderizar(pagina))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from cuentas.vencimientos import actualizar_vencidas
+
+
+class Command(BaseCommand):
+    help = "Marca como vencidas las facturas pendientes cuyo vencimiento ya pasó (pensado para cron diario)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo', action='store_true',
+            help="Ejecuta el barrido aunque ya se haya hecho hoy (tras cargar pendientes ya vencidas)",
+        )
+
+    def handle(self, *args, **options):
+        filas = actualizar_vencidas(completo=options['completo'])
+        self.stdout.write(self.style.SUCCESS(f"{filas} facturas marcadas como vencidas"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from cuentas.archivo import archivar, horizonte, restaurar
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve al archivo las facturas pagadas emitidas antes del horizonte "
+        "(FACTURAS_ARCHIVO_MESES) o restaura facturas archivadas con --restaurar"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, help="Horizonte en meses (por defecto FACTURAS_ARCHIVO_MESES)")
+        parser.add_argument('--lote', type=int, default=2000)
+        parser.add_argument('--restaurar', type=int, nargs='+', metavar='ID', help="Ids de facturas a restaurar")
+
+    def handle(self, *args, **options):
+        if options['restaurar']:
+            restauradas = restaurar(options['restaurar'])
+            self.stdout.write(self.style.SUCCESS(f"{restauradas} facturas restauradas"))
+            return
+        hasta = horizonte(meses=options['meses'])
+        archivadas = archivar(hasta, options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"{archivadas} facturas emitidas antes de {hasta} archivadas"))
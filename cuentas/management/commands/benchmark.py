@@ -0,0 +1,51 @@
+import json
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from cuentas.benchmarks import a_json, comparar, ejecutar_benchmarks
+from cuentas.generador import generar_datos
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea una BD de prueba, la puebla con generar_datos y mide latencia (p50/p95/p99), "
+        "consultas y memoria por solicitud de los endpoints principales. Resultado en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--facturas', type=int, default=10000)
+        parser.add_argument('--clientes', type=int, default=200)
+        parser.add_argument('--proveedores', type=int, default=100)
+        parser.add_argument('--notificaciones', type=int, default=2000)
+        parser.add_argument('--repeticiones', type=int, default=200)
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--escenario', action='append', help="Solo estos escenarios (se puede repetir)")
+        parser.add_argument('--salida', help="Archivo JSON donde guardar el resultado")
+        parser.add_argument('--comparar', help="Resultado JSON anterior con el cual comparar")
+
+    def handle(self, *args, **options):
+        datos = {campo: options[campo] for campo in ('clientes', 'proveedores', 'facturas', 'notificaciones')}
+
+        setup_test_environment()
+        bases = setup_databases(verbosity=0, interactive=False)
+        try:
+            generar_datos(semilla=options['semilla'], **datos)
+            resultado = ejecutar_benchmarks(
+                repeticiones=options['repeticiones'], semilla=options['semilla'],
+                solo=options['escenario'], datos=datos,
+            )
+        finally:
+            teardown_databases(bases, verbosity=0)
+            teardown_test_environment()
+
+        salida = a_json(resultado)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida + '\n')
+        else:
+            self.stdout.write(salida)
+
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                anterior = json.load(archivo)
+            for linea in comparar(anterior, resultado):
+                self.stdout.write(linea)
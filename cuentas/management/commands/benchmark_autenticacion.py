@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.module_loading import import_string
+from rest_framework.test import APIRequestFactory
+from cuentas.models import Usuario
+from cuentas.views import UsuarioActualView
+from cuentas.vistas_acceso import CustomTokenObtainPairSerializer
+
+CLASES = [
+    'rest_framework_simplejwt.authentication.JWTAuthentication',
+    'cuentas.autenticacion.JWTSinEstadoAuthentication',
+]
+
+
+class Command(BaseCommand):
+    help = "Compara solicitudes por segundo y consultas por solicitud de /api/usuario/ con y sin autenticación JWT sin estado"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', required=True, help="username de un usuario existente")
+        parser.add_argument('--solicitudes', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.get(username=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}")
+
+        token = CustomTokenObtainPairSerializer.get_token(usuario).access_token
+        factory = APIRequestFactory()
+        solicitudes = options['solicitudes']
+
+        for ruta in CLASES:
+            clase = import_string(ruta)
+            view = UsuarioActualView.as_view(authentication_classes=[clase])
+            view(factory.get('/api/usuario/', HTTP_AUTHORIZATION=f'Bearer {token}'))  # calentamiento
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                for _ in range(solicitudes):
+                    response = view(factory.get('/api/usuario/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+                duracion = time.perf_counter() - inicio
+            if response.status_code != 200:
+                raise CommandError(f"{clase.__name__}: respuesta {response.status_code}")
+            self.stdout.write(
+                f"{clase.__name__}: {solicitudes / duracion:.0f} solicitudes/s, "
+                f"{len(consultas) / solicitudes:.2f} consultas por solicitud"
+            )
@@ -0,0 +1,47 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from cuentas.models import Cliente, Proveedor, Factura, FacturaArchivada, FacturaResumenMensual
+from cuentas.resumen import reconstruir_resumen
+from cuentas.saldos import reconciliar
+from cuentas.vencimientos import actualizar_vencidas
+from cuentas.volcado import CargaFixture, abrir_texto, leer_objetos
+
+
+class Command(BaseCommand):
+    help = (
+        "Carga fixtures JSON (formato dumpdata) o NDJSON en UTF-8 o UTF-16 leyéndolos en streaming "
+        "e insertando por lotes; alternativa rápida a loaddata para respaldos grandes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivos', nargs='+')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--copy', action='store_true',
+            help="En PostgreSQL usa COPY en lugar de INSERT (solo para tablas sin esos pks)",
+        )
+
+    def handle(self, *args, **options):
+        for ruta in options['archivos']:
+            inicio = time.perf_counter()
+            with abrir_texto(ruta) as archivo:
+                contadores = CargaFixture(options['database'], options['copy']).ejecutar(leer_objetos(archivo))
+            duracion = time.perf_counter() - inicio
+
+            # Las pendientes ya vencidas no pasan por save(): se barren aunque hoy ya se haya hecho
+            if Factura._meta.label in contadores:
+                actualizar_vencidas(completo=True)
+            # bulk_create no envía señales: si el fixture no trae el resumen mensual se recalcula
+            facturas = {Factura._meta.label, FacturaArchivada._meta.label} & set(contadores)
+            if facturas and FacturaResumenMensual._meta.label not in contadores:
+                reconstruir_resumen()
+            # Los saldos de clientes y proveedores también se recalculan (los fixtures antiguos no los traen)
+            if {Cliente._meta.label, Proveedor._meta.label, Factura._meta.label} & set(contadores):
+                reconciliar()
+
+            for modelo, cantidad in contadores.items():
+                self.stdout.write(f"  {modelo}: {cantidad}")
+            self.stdout.write(self.style.SUCCESS(
+                f"{ruta}: {sum(contadores.values())} objetos en {duracion:.2f} s"
+            ))
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from cuentas.notificaciones import DIAS_AVISO, TAMANO_LOTE, despachar_pendientes, generar_notificaciones, obtener_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera las notificaciones de facturas por vencer y vencidas y las envía por lotes. "
+        "Se pueden ejecutar varios workers en paralelo sin enviar duplicados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Notificaciones por lote")
+        parser.add_argument('--dias-aviso', type=int, default=DIAS_AVISO,
+                            help="Días antes del vencimiento para avisar")
+        parser.add_argument('--continuo', action='store_true', help="Repite el ciclo indefinidamente")
+        parser.add_argument('--intervalo', type=int, default=60, help="Segundos entre ciclos con --continuo")
+
+    def handle(self, *args, **options):
+        backend = obtener_backend()
+        while True:
+            generadas = generar_notificaciones(dias_aviso=options['dias_aviso'])
+            enviadas = despachar_pendientes(backend, options['lote'])
+            self.stdout.write(f"{generadas} notificaciones generadas, {enviadas} enviadas")
+            if not options['continuo']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,25 @@
+import argparse
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+from cuentas.antiguedad import CONTRAPARTES, generar_antiguedad
+
+
+def fecha(valor):
+    resultado = parse_date(valor)
+    if resultado is None:
+        raise argparse.ArgumentTypeError("Debe tener formato AAAA-MM-DD")
+    return resultado
+
+
+class Command(BaseCommand):
+    help = "Genera la foto de antigüedad de saldos por cliente y proveedor para ledgers grandes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', choices=list(CONTRAPARTES), help="Solo Cobrar o solo Pagar")
+        parser.add_argument('--fecha', type=fecha, help="Fecha de corte (AAAA-MM-DD), por defecto hoy")
+
+    def handle(self, *args, **options):
+        tipos = [options['tipo']] if options['tipo'] else list(CONTRAPARTES)
+        for tipo in tipos:
+            filas = generar_antiguedad(tipo, options['fecha'])
+            self.stdout.write(self.style.SUCCESS(f"{tipo}: {filas} contrapartes guardadas"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from cuentas.generador import generar_datos
+
+
+class Command(BaseCommand):
+    help = "Genera clientes, proveedores, facturas y notificaciones de prueba con distribuciones realistas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=100)
+        parser.add_argument('--proveedores', type=int, default=50)
+        parser.add_argument('--facturas', type=int, default=10000)
+        parser.add_argument('--notificaciones', type=int, default=2000)
+        parser.add_argument('--semilla', type=int, default=0, help="Misma semilla, mismos datos")
+        parser.add_argument('--prefijo', default='GEN', help="Prefijo de números de factura y correos")
+
+    def handle(self, *args, **options):
+        generar_datos(
+            clientes=options['clientes'],
+            proveedores=options['proveedores'],
+            facturas=options['facturas'],
+            notificaciones=options['notificaciones'],
+            semilla=options['semilla'],
+            prefijo=options['prefijo'],
+        )
+        self.stdout.write(self.style.SUCCESS("Datos de prueba generados"))
@@ -0,0 +1,60 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from cuentas.arranque import comparar, perfil_arranque
+from cuentas.benchmarks import a_json
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el arranque de un worker en procesos nuevos: tiempo de importación por módulo y "
+        "paquete (-X importtime), tiempo hasta la primera respuesta, RSS y memoria por paquete."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/facturas/', help="Ruta de la primera solicitud")
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--top', type=int, default=20, help="Módulos y paquetes que se muestran")
+        parser.add_argument('--sin-memoria', action='store_true', help="Omite la medición con tracemalloc")
+        parser.add_argument('--json', action='store_true', help="Resultado completo en JSON")
+        parser.add_argument('--salida', help="Archivo JSON donde guardar el resultado")
+        parser.add_argument('--comparar', help="Resultado JSON anterior con el cual comparar")
+
+    def handle(self, *args, **options):
+        try:
+            resultado = perfil_arranque(
+                options['url'], options['repeticiones'], options['top'], memoria=not options['sin_memoria'],
+            )
+        except RuntimeError as error:
+            raise CommandError(f"No se pudo medir el arranque: {error}")
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(a_json(resultado) + '\n')
+        if options['json']:
+            self.stdout.write(a_json(resultado))
+        else:
+            self.escribir_resumen(resultado)
+
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as archivo:
+                anterior = json.load(archivo)
+            for linea in comparar(anterior, resultado):
+                self.stdout.write(linea)
+
+    def escribir_resumen(self, resultado):
+        self.stdout.write(
+            f"GET {resultado['url']} -> {resultado['estado']}\n"
+            f"  setup: {resultado['setup_ms']} ms, primera respuesta: {resultado['primera_solicitud_ms']} ms, "
+            f"RSS: {resultado['rss_mb']} MB, módulos: {resultado['modulos']} "
+            f"(importación: {resultado['importacion_ms']} ms)"
+        )
+        self.stdout.write("Importación por paquete (ms):")
+        for paquete, total in resultado['paquetes_ms'].items():
+            self.stdout.write(f"  {total:8.1f}  {paquete}")
+        self.stdout.write("Módulos más lentos (acumulado / propio, ms):")
+        for fila in resultado['modulos_ms']:
+            self.stdout.write(f"  {fila['acumulado_ms']:8.2f} {fila['propio_ms']:8.2f}  {fila['modulo']}")
+        if 'memoria_kb' in resultado:
+            self.stdout.write("Memoria asignada al arrancar por paquete (KB):")
+            for paquete, total in resultado['memoria_kb'].items():
+                self.stdout.write(f"  {total:8d}  {paquete}")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from cuentas.cambios import purgar
+
+
+class Command(BaseCommand):
+    help = "Borra del registro de cambios los más antiguos que la retención (CAMBIOS_RETENCION_DIAS)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None, help="Días que se conservan")
+
+    def handle(self, *args, **options):
+        borrados = purgar(options['dias'])
+        self.stdout.write(self.style.SUCCESS(f"Cambios borrados: {borrados}"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from cuentas.saldos import reconciliar
+
+
+class Command(BaseCommand):
+    help = "Compara los saldos de clientes y proveedores con sus facturas y corrige las diferencias"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help="Solo informa las diferencias (termina con error si hay alguna), sin corregirlas",
+        )
+
+    def handle(self, *args, **options):
+        diferencias = reconciliar(corregir=not options['verificar'])
+        for diferencia in diferencias[:20]:
+            self.stdout.write(
+                f"  {diferencia['modelo']} {diferencia['id']}: {diferencia['actual']} -> {diferencia['esperado']}"
+            )
+        if len(diferencias) > 20:
+            self.stdout.write(f"  ... y {len(diferencias) - 20} más")
+        if options['verificar'] and diferencias:
+            raise CommandError(f"{len(diferencias)} saldos no coinciden con las facturas")
+        self.stdout.write(self.style.SUCCESS(
+            f"Saldos reconciliados: {len(diferencias)} corregidos" if diferencias else "Saldos al día"
+        ))
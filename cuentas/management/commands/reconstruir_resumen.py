@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from cuentas.resumen import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = "Recalcula el resumen mensual de facturas usado por el dashboard"
+
+    def handle(self, *args, **options):
+        reconstruir_resumen()
+        self.stdout.write(self.style.SUCCESS("Resumen mensual reconstruido"))
@@ -0,0 +1,27 @@
+import sys
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from cuentas.volcado import modelos_a_volcar, volcar
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelca datos en streaming (por lotes, en UTF-8) como arreglo JSON compatible con loaddata "
+        "y cargar_fixture, o como NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('etiquetas', nargs='*', help="app o app.Modelo; por defecto todos")
+        parser.add_argument('--formato', choices=['json', 'ndjson'], default='json')
+        parser.add_argument('--excluir', action='append', default=[], help="app o app.Modelo a excluir")
+        parser.add_argument('--salida', help="Archivo de salida (por defecto, salida estándar)")
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        modelos = modelos_a_volcar(options['etiquetas'], options['excluir'])
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as salida:
+                total = volcar(salida, modelos, options['formato'], options['database'])
+            self.stderr.write(f"{total} objetos escritos en {options['salida']}")
+        else:
+            volcar(sys.stdout, modelos, options['formato'], options['database'])
@@ -0,0 +1,87 @@
+# cuentas/metricas.py
+
+import hmac
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Límites de los buckets del histograma de latencia, en segundos
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Veces que debe repetirse la misma consulta en una solicitud para considerarla N+1
+UMBRAL_N_MAS_UNO = 5
+
+
+class MetricasVista:
+    __slots__ = ('buckets', 'suma', 'cantidad', 'consultas', 'tiempo_bd', 'n_mas_uno')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.suma = 0.0
+        self.cantidad = 0
+        self.consultas = 0
+        self.tiempo_bd = 0.0
+        self.n_mas_uno = 0
+
+
+class Registro:
+    """
+    Acumula las métricas por vista en memoria del proceso. Cada worker expone
+    las suyas en /api/metrics/ y Prometheus las agrega al recolectarlas.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vistas = defaultdict(MetricasVista)
+
+    def registrar(self, vista, duracion, consultas, tiempo_bd, n_mas_uno):
+        with self._lock:
+            metricas = self._vistas[vista]
+            metricas.buckets[bisect_left(BUCKETS, duracion)] += 1
+            metricas.suma += duracion
+            metricas.cantidad += 1
+            metricas.consultas += consultas
+            metricas.tiempo_bd += tiempo_bd
+            metricas.n_mas_uno += n_mas_uno
+
+    def limpiar(self):
+        with self._lock:
+            self._vistas.clear()
+
+    def texto_prometheus(self):
+        with self._lock:
+            vistas = sorted(self._vistas.items())
+            lineas = [
+                '# HELP cuentas_solicitud_duracion_segundos Duración de las solicitudes por vista.',
+                '# TYPE cuentas_solicitud_duracion_segundos histogram',
+            ]
+            for vista, metricas in vistas:
+                acumulado = 0
+                for limite, cantidad in zip(BUCKETS + ('+Inf',), metricas.buckets):
+                    acumulado += cantidad
+                    lineas.append(f'cuentas_solicitud_duracion_segundos_bucket{{vista="{vista}",le="{limite}"}} {acumulado}')
+                lineas.append(f'cuentas_solicitud_duracion_segundos_sum{{vista="{vista}"}} {metricas.suma:.6f}')
+                lineas.append(f'cuentas_solicitud_duracion_segundos_count{{vista="{vista}"}} {metricas.cantidad}')
+
+            for nombre, ayuda, atributo, formato in (
+                ('cuentas_consultas_bd_total', 'Consultas a la BD por vista.', 'consultas', '{}'),
+                ('cuentas_tiempo_bd_segundos_total', 'Tiempo total en la BD por vista.', 'tiempo_bd', '{:.6f}'),
+                ('cuentas_n_mas_uno_total', 'Solicitudes con consultas repetidas (posible N+1).', 'n_mas_uno', '{}'),
+            ):
+                lineas.append(f'# HELP {nombre} {ayuda}')
+                lineas.append(f'# TYPE {nombre} counter')
+                for vista, metricas in vistas:
+                    lineas.append(f'{nombre}{{vista="{vista}"}} ' + formato.format(getattr(metricas, atributo)))
+        return '\n'.join(lineas) + '\n'
+
+
+registro = Registro()
+
+
+def metricas_view(request):
+    # Fuera de la autenticación JWT: Prometheus envía el token fijo METRICAS_TOKEN
+    # (authorization: credentials). Sin token configurado el endpoint queda cerrado.
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(registro.texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,12 +1,110 @@
-from django.utils.timezone import now
-from .models import Factura
+import logging
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from .metricas import UMBRAL_N_MAS_UNO, registro
+from .vencimientos import actualizar_si_cambio_el_dia, barrido_pendiente
+
+logger = logging.getLogger(__name__)
 
 class ActualizarFacturasMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Actualiza automáticamente las facturas vencidas antes de procesar la solicitud
-        Factura.actualizar_facturas_vencidas()
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # Ejecuta el barrido de vencidas una vez por día (America/Lima); en el resto
+        # de solicitudes no hace consultas. La lectura usa Factura.estado_actual.
+        actualizar_si_cambio_el_dia()
         response = self.get_response(request)
         return response
+
+    async def __acall__(self, request):
+        # En ASGI solo se salta a un hilo síncrono el día que toca el barrido
+        if barrido_pendiente():
+            await sync_to_async(actualizar_si_cambio_el_dia)()
+        return await self.get_response(request)
+
+
+class ConsultasSolicitud:
+    # Envoltorio de execute para contar consultas, su tiempo y las repetidas
+    __slots__ = ('cantidad', 'tiempo', 'formas')
+
+    def __init__(self):
+        self.cantidad = 0
+        self.tiempo = 0.0
+        self.formas = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.tiempo += time.perf_counter() - inicio
+            self.cantidad += 1
+            # Los parámetros van aparte, así que el SQL ya es la "forma" de la consulta
+            self.formas[sql] = self.formas.get(sql, 0) + 1
+
+
+class MetricasMiddleware:
+    """
+    Registra por vista (nombre de la URL) la latencia, las consultas a la BD,
+    el tiempo en la BD y las solicitudes con consultas repetidas (posible N+1).
+    Se publica en /api/metrics/ en formato de texto de Prometheus.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS_HABILITADAS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        consultas = ConsultasSolicitud()
+        inicio = time.perf_counter()
+        with ExitStack() as stack:
+            self._instalar(stack, consultas)
+            response = self.get_response(request)
+        self._registrar(request, consultas, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        # Las conexiones son locales al hilo: el envoltorio se instala en el hilo
+        # síncrono que usa el ORM durante esta solicitud (thread_sensitive)
+        consultas = ConsultasSolicitud()
+        inicio = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(self._instalar)(stack, consultas)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self._registrar(request, consultas, time.perf_counter() - inicio)
+        return response
+
+    def _instalar(self, stack, consultas):
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(consultas))
+
+    def _registrar(self, request, consultas, duracion):
+        repetidas = [sql for sql, veces in consultas.formas.items() if veces >= UMBRAL_N_MAS_UNO]
+        if repetidas:
+            logger.warning("Posible N+1 en %s: %s", request.path, repetidas[0][:200])
+
+        match = request.resolver_match
+        vista = match.view_name if match else 'sin_ruta'
+        registro.registrar(vista, duracion, consultas.cantidad, consultas.tiempo, 1 if repetidas else 0)
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ControlVencimiento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_fecha', models.DateField(blank=True, null=True)),
+                ('filas_actualizadas', models.PositiveIntegerField(default=0)),
+                ('ejecutado_en', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
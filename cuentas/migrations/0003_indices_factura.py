@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0002_control_vencimiento'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['tipo', 'fecha_emision'], include=('monto_total',), name='factura_tipo_emision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['estado'], name='factura_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(condition=models.Q(('estado', 'Pendiente')), fields=['fecha_vencimiento'], name='factura_pendiente_venc_idx'),
+        ),
+    ]
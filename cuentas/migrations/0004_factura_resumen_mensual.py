@@ -0,0 +1,44 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:29
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def poblar_resumen(apps, schema_editor):
+    Factura = apps.get_model('cuentas', 'Factura')
+    FacturaResumenMensual = apps.get_model('cuentas', 'FacturaResumenMensual')
+    grupos = (
+        Factura.objects
+        .annotate(anio=ExtractYear('fecha_emision'), mes=ExtractMonth('fecha_emision'))
+        .values('anio', 'mes', 'tipo', 'estado')
+        .annotate(total=Sum('monto_total'), cantidad=Count('id'))
+        .order_by()
+    )
+    FacturaResumenMensual.objects.bulk_create(FacturaResumenMensual(**grupo) for grupo in grupos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0003_indices_factura'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacturaResumenMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.PositiveSmallIntegerField()),
+                ('mes', models.PositiveSmallIntegerField()),
+                ('tipo', models.CharField(choices=[('Cobrar', 'Por Cobrar'), ('Pagar', 'Por Pagar')], max_length=10)),
+                ('estado', models.CharField(choices=[('Pagada', 'Pagada'), ('Pendiente', 'Pendiente'), ('Vencida', 'Vencida')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('anio', 'mes', 'tipo', 'estado'), name='resumen_mensual_unico')],
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
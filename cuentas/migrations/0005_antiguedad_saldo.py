@@ -0,0 +1,32 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0004_factura_resumen_mensual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AntiguedadSaldo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_corte', models.DateField()),
+                ('tipo', models.CharField(choices=[('Cobrar', 'Por Cobrar'), ('Pagar', 'Por Pagar')], max_length=10)),
+                ('contraparte_id', models.BigIntegerField()),
+                ('contraparte', models.CharField(max_length=100)),
+                ('por_vencer', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('dias_0_30', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('dias_31_60', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('dias_61_90', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('dias_90_mas', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha_corte', 'tipo', '-total'], name='antiguedad_corte_total_idx')],
+            },
+        ),
+    ]
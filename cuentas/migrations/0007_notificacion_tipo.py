@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0006_usuario_version_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacion',
+            name='tipo',
+            field=models.CharField(choices=[('General', 'General'), ('PorVencer', 'Por vencer'), ('Vencida', 'Vencida')], default='General', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('enviada', False)), fields=['id'], name='notificacion_no_enviada_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('tipo', 'General'), _negated=True), fields=('factura', 'tipo'), name='notificacion_unica_por_tipo'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:43
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def poblar_saldos(apps, schema_editor):
+    Factura = apps.get_model('cuentas', 'Factura')
+    campos = {'Pendiente': ('saldo_pendiente', 'facturas_pendientes'), 'Vencida': ('saldo_vencido', 'facturas_vencidas')}
+    for tipo, nombre, columna in (('Cobrar', 'Cliente', 'cliente_id'), ('Pagar', 'Proveedor', 'proveedor_id')):
+        modelo = apps.get_model('cuentas', nombre)
+        grupos = (
+            Factura.objects.filter(tipo=tipo, estado__in=campos, **{f'{columna}__isnull': False})
+            .values(columna, 'estado')
+            .annotate(total=Sum('monto_total'), cantidad=Count('id'))
+            .order_by()
+        )
+        for grupo in grupos:
+            saldo, cantidad = campos[grupo['estado']]
+            modelo.objects.filter(pk=grupo[columna]).update(**{saldo: grupo['total'], cantidad: grupo['cantidad']})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0007_notificacion_tipo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='facturas_pendientes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='facturas_vencidas',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='saldo_pendiente',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='saldo_vencido',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='facturas_pendientes',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='facturas_vencidas',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='saldo_pendiente',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='saldo_vencido',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['-saldo_vencido'], name='cliente_saldo_vencido_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['-saldo_pendiente'], name='cliente_saldo_pendiente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proveedor',
+            index=models.Index(fields=['-saldo_vencido'], name='proveedor_saldo_vencido_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proveedor',
+            index=models.Index(fields=['-saldo_pendiente'], name='proveedor_saldo_pendiente_idx'),
+        ),
+        migrations.RunPython(poblar_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Columna tsvector generada e índices pg_trgm para cuentas/busqueda.py.
+# Solo se crean en PostgreSQL; en otras bases de datos la búsqueda usa icontains.
+
+from django.db import migrations
+
+TABLAS_CONTRAPARTE = ('cuentas_cliente', 'cuentas_proveedor')
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for tabla in TABLAS_CONTRAPARTE:
+        schema_editor.execute(
+            f"ALTER TABLE {tabla} ADD COLUMN busqueda tsvector GENERATED ALWAYS AS "
+            f"(to_tsvector('simple', coalesce(nombre, '') || ' ' || coalesce(email, ''))) STORED"
+        )
+        schema_editor.execute(f"CREATE INDEX {tabla}_busqueda_idx ON {tabla} USING gin (busqueda)")
+        schema_editor.execute(f"CREATE INDEX {tabla}_nombre_trgm_idx ON {tabla} USING gin (nombre gin_trgm_ops)")
+    schema_editor.execute(
+        "CREATE INDEX cuentas_factura_numero_trgm_idx ON cuentas_factura USING gin (numero_factura gin_trgm_ops)"
+    )
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS cuentas_factura_numero_trgm_idx")
+    for tabla in TABLAS_CONTRAPARTE:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {tabla}_nombre_trgm_idx")
+        schema_editor.execute(f"ALTER TABLE {tabla} DROP COLUMN IF EXISTS busqueda")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0008_saldos_contraparte'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
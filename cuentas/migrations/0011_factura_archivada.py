@@ -0,0 +1,52 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0010_actualizado_en'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacturaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('numero_factura', models.CharField(max_length=50, unique=True)),
+                ('tipo', models.CharField(choices=[('Cobrar', 'Por Cobrar'), ('Pagar', 'Por Pagar')], max_length=10)),
+                ('fecha_emision', models.DateField()),
+                ('fecha_vencimiento', models.DateField()),
+                ('monto_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('estado', models.CharField(choices=[('Pagada', 'Pagada'), ('Pendiente', 'Pendiente'), ('Vencida', 'Vencida')], max_length=10)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+                ('archivada_en', models.DateTimeField(auto_now_add=True)),
+                ('notificaciones', models.JSONField(blank=True, default=list)),
+            ],
+        ),
+        migrations.RemoveConstraint(
+            model_name='facturaresumenmensual',
+            name='resumen_mensual_unico',
+        ),
+        migrations.AddField(
+            model_name='facturaresumenmensual',
+            name='archivada',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddConstraint(
+            model_name='facturaresumenmensual',
+            constraint=models.UniqueConstraint(fields=('anio', 'mes', 'tipo', 'estado', 'archivada'), name='resumen_mensual_unico_archivada'),
+        ),
+        migrations.AddField(
+            model_name='facturaarchivada',
+            name='cliente',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='facturas_archivadas', to='cuentas.cliente'),
+        ),
+        migrations.AddField(
+            model_name='facturaarchivada',
+            name='proveedor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='facturas_archivadas', to='cuentas.proveedor'),
+        ),
+    ]
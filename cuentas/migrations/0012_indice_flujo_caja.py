@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0011_factura_archivada'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(condition=models.Q(('estado__in', ['Pendiente', 'Vencida'])), fields=['fecha_vencimiento'], include=('tipo', 'monto_total'), name='factura_abierta_venc_idx'),
+        ),
+    ]
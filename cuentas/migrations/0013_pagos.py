@@ -0,0 +1,63 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def poblar_saldo_pendiente(apps, schema_editor):
+    # Sin pagos registrados: las facturas abiertas deben todo su monto
+    Factura = apps.get_model('cuentas', 'Factura')
+    Factura.objects.exclude(estado='Pagada').update(saldo_pendiente=F('monto_total'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0012_indice_flujo_caja'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factura',
+            name='saldo_pendiente',
+            field=models.DecimalField(blank=True, decimal_places=2, default=0, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(poblar_saldo_pendiente, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='factura',
+            constraint=models.CheckConstraint(condition=models.Q(('saldo_pendiente__gte', 0)), name='factura_saldo_no_negativo'),
+        ),
+        migrations.RemoveIndex(
+            model_name='factura',
+            name='factura_abierta_venc_idx',
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(condition=models.Q(('estado__in', ['Pendiente', 'Vencida'])), fields=['fecha_vencimiento'], include=('tipo', 'saldo_pendiente'), name='factura_abierta_venc_idx'),
+        ),
+        migrations.AddField(
+            model_name='facturaarchivada',
+            name='saldo_pendiente',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='facturaarchivada',
+            name='pagos',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.CreateModel(
+            name='Pago',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fecha', models.DateField(default=django.utils.timezone.localdate)),
+                ('referencia', models.CharField(blank=True, max_length=100)),
+                ('registrado_en', models.DateTimeField(auto_now_add=True)),
+                ('factura', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pagos', to='cuentas.factura')),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(('monto__gt', 0)), name='pago_monto_positivo')],
+            },
+        ),
+    ]
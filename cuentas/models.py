@@ -1,7 +1,9 @@
+from decimal import Decimal
 from django.contrib.auth.models import AbstractUser, Group, Permission
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Q, Sum
 from django.core.exceptions import ValidationError
-from datetime import date
+from django.utils import timezone
 
 class Usuario(AbstractUser):
     ROLES = [
@@ -10,6 +12,8 @@ class Usuario(AbstractUser):
         ('Gerente', 'Gerente'),
     ]
     rol = models.CharField(max_length=20, choices=ROLES)
+    # Se incrementa al cambiar rol, permisos, contraseña o estado; invalida los tokens emitidos
+    version_token = models.PositiveIntegerField(default=0)
 
     groups = models.ManyToManyField(
         Group,
@@ -26,6 +30,10 @@ class Usuario(AbstractUser):
         help_text="Specific permissions for this user.",
     )
 
+    @property
+    def permisos(self):
+        return [perm.codename for perm in self.user_permissions.all()]
+
 
 # Modelo de Cliente
 class Cliente(models.Model):
@@ -33,6 +41,19 @@ class Cliente(models.Model):
     email = models.EmailField(unique=True)
     telefono = models.CharField(max_length=15, blank=True, null=True)
     direccion = models.TextField(blank=True, null=True)
+    # Saldos mantenidos al guardar facturas (ver cuentas/saldos.py)
+    saldo_pendiente = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    saldo_vencido = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    facturas_pendientes = models.IntegerField(default=0)
+    facturas_vencidas = models.IntegerField(default=0)
+    # Fecha de la última modificación (ETag/Last-Modified en cuentas/condicional.py)
+    actualizado_en = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-saldo_vencido'], name='cliente_saldo_vencido_idx'),
+            models.Index(fields=['-saldo_pendiente'], name='cliente_saldo_pendiente_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
@@ -43,10 +64,40 @@ class Proveedor(models.Model):
     email = models.EmailField(unique=True)
     telefono = models.CharField(max_length=15, blank=True, null=True)
     direccion = models.TextField(blank=True, null=True)
+    # Saldos mantenidos al guardar facturas (ver cuentas/saldos.py)
+    saldo_pendiente = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    saldo_vencido = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    facturas_pendientes = models.IntegerField(default=0)
+    facturas_vencidas = models.IntegerField(default=0)
+    actualizado_en = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-saldo_vencido'], name='proveedor_saldo_vencido_idx'),
+            models.Index(fields=['-saldo_pendiente'], name='proveedor_saldo_pendiente_idx'),
+        ]
 
     def __str__(self):
         return self.nombre
 
+class FacturaQuerySet(models.QuerySet):
+    def vencidas(self, hoy=None):
+        # Incluye las pendientes ya vencidas aunque el barrido diario aún no las haya marcado
+        hoy = hoy or timezone.localdate()
+        return self.filter(Q(estado='Vencida') | Q(estado='Pendiente', fecha_vencimiento__lt=hoy))
+
+    def pendientes(self, hoy=None):
+        hoy = hoy or timezone.localdate()
+        return self.filter(estado='Pendiente', fecha_vencimiento__gte=hoy)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create no llama a save(): el saldo inicial se completa aquí
+        objs = list(objs)
+        preparar = getattr(self.model, 'preparar_insercion', None)
+        if preparar:
+            preparar(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
 # Modelo de Factura
 class Factura(models.Model):
     TIPO_CHOICES = [
@@ -66,7 +117,68 @@ class Factura(models.Model):
     fecha_emision = models.DateField()
     fecha_vencimiento = models.DateField()
     monto_total = models.DecimalField(max_digits=10, decimal_places=2)
+    # monto_total menos los pagos registrados; lo mantiene cuentas/pagos.py
+    saldo_pendiente = models.DecimalField(max_digits=10, decimal_places=2, blank=True)
     estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='Pendiente')
+    actualizado_en = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = FacturaQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=Q(saldo_pendiente__gte=0), name='factura_saldo_no_negativo'),
+        ]
+        indexes = [
+            # Totales del dashboard por tipo y período (monto_total incluido para index-only scans en PostgreSQL)
+            models.Index(fields=['tipo', 'fecha_emision'], include=['monto_total'], name='factura_tipo_emision_idx'),
+            # Conteo de vencidas y filtros por estado
+            models.Index(fields=['estado'], name='factura_estado_idx'),
+            # Barrido diario de vencimientos: solo las pendientes
+            models.Index(
+                fields=['fecha_vencimiento'],
+                condition=Q(estado='Pendiente'),
+                name='factura_pendiente_venc_idx',
+            ),
+            # Proyección del flujo de caja: facturas abiertas por vencimiento
+            models.Index(
+                fields=['fecha_vencimiento'],
+                include=['tipo', 'saldo_pendiente'],
+                condition=Q(estado__in=['Pendiente', 'Vencida']),
+                name='factura_abierta_venc_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores leídos de la BD, para ajustar el resumen mensual al guardar
+        instance._valores_originales = instance.valores_resumen()
+        return instance
+
+    # Campos de los que dependen el resumen mensual, los saldos por contraparte
+    # (saldo_pendiente) y la proyección del flujo de caja (fecha_vencimiento)
+    CAMPOS_RESUMEN = (
+        'fecha_emision', 'fecha_vencimiento', 'tipo', 'estado', 'monto_total', 'saldo_pendiente',
+        'cliente_id', 'proveedor_id',
+    )
+
+    def valores_resumen(self):
+        return {campo: self.__dict__.get(campo) for campo in self.CAMPOS_RESUMEN}
+
+    def saldo_inicial(self):
+        return 0 if self.estado == 'Pagada' else self.monto_total
+
+    def total_pagado(self):
+        if self.pk is None:
+            return Decimal(0)
+        return self.pagos.aggregate(total=Sum('monto'))['total'] or Decimal(0)
+
+    @classmethod
+    def preparar_insercion(cls, facturas):
+        # Facturas nuevas sin saldo: queda pendiente todo el monto (nada si ya está pagada)
+        for factura in facturas:
+            if factura.saldo_pendiente is None:
+                factura.saldo_pendiente = factura.saldo_inicial()
 
     def save(self, *args, **kwargs):
         # Validación para facturas "Por Cobrar"
@@ -82,29 +194,198 @@ class Factura(models.Model):
             raise ValidationError("No debe asignar un cliente si el tipo es 'Por Pagar'")
 
         # Actualizar el estado automáticamente
-        if self.estado == 'Pendiente' and self.fecha_vencimiento < date.today():
+        if self.estado == 'Pendiente' and self.fecha_vencimiento < timezone.localdate():
             self.estado = 'Vencida'
 
-        # Llamar al método save original
-        super().save(*args, **kwargs)
+        # El saldo sigue al monto: lo ya pagado se mantiene
+        originales = getattr(self, '_valores_originales', None)
+        if self.saldo_pendiente is None:
+            self.saldo_pendiente = self.saldo_inicial()
+        elif originales and originales['estado'] and (originales['estado'] == 'Pagada') != (self.estado == 'Pagada'):
+            # Marcada pagada a mano: no queda saldo. Reabierta: se recalcula desde los pagos
+            if self.estado == 'Pagada':
+                self.saldo_pendiente = Decimal(0)
+            else:
+                self.saldo_pendiente = Decimal(str(self.monto_total)) - self.total_pagado()
+                if self.saldo_pendiente <= 0:
+                    raise ValidationError("Los pagos registrados ya cubren el monto total")
+        elif originales and originales['monto_total'] is not None and originales['monto_total'] != self.monto_total:
+            self.saldo_pendiente += Decimal(str(self.monto_total)) - originales['monto_total']
+            if self.saldo_pendiente < 0:
+                raise ValidationError("El monto total no puede ser menor que lo ya pagado")
+
+        # Llamar al método save original (junto con el ajuste del resumen mensual)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    @property
+    def estado_actual(self):
+        # Estado correcto en lectura, aunque el barrido diario aún no se haya ejecutado
+        if self.estado == 'Pendiente' and self.fecha_vencimiento < timezone.localdate():
+            return 'Vencida'
+        return self.estado
 
     @staticmethod
-    def actualizar_facturas_vencidas():
-        # Actualizar facturas vencidas de forma masiva
-        from django.utils.timezone import now
-        Factura.objects.filter(
-            estado='Pendiente', fecha_vencimiento__lt=now().date()
-        ).update(estado='Vencida')
+    def actualizar_facturas_vencidas(hoy=None):
+        # Actualizar facturas vencidas de forma masiva; devuelve el número de filas modificadas.
+        # El índice parcial factura_pendiente_venc_idx solo contiene pendientes, así que el
+        # rango fecha_vencimiento < hoy lee justo las filas a cambiar, sin acotar por fecha inicial.
+        hoy = hoy or timezone.localdate()
+        facturas = Factura.objects.filter(estado='Pendiente', fecha_vencimiento__lt=hoy)
+        from .resumen import mover_a_vencidas
+        return mover_a_vencidas(facturas)
 
     def __str__(self):
         return f"{self.numero_factura} - {self.tipo}"
     
 # Modelo de Notificaciones
 class Notificacion(models.Model):
+    TIPO_CHOICES = [
+        ('General', 'General'),
+        ('PorVencer', 'Por vencer'),
+        ('Vencida', 'Vencida'),
+    ]
+
     factura = models.ForeignKey(Factura, on_delete=models.CASCADE)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES, default='General')
     mensaje = models.TextField()
     fecha_envio = models.DateTimeField(auto_now_add=True)
     enviada = models.BooleanField(default=False)
+    actualizado_en = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            # Una sola notificación automática de cada tipo por factura, aunque haya varios workers
+            models.UniqueConstraint(
+                fields=['factura', 'tipo'], condition=~Q(tipo='General'), name='notificacion_unica_por_tipo',
+            ),
+        ]
+        indexes = [
+            # Cola de notificaciones pendientes de envío
+            models.Index(fields=['id'], condition=Q(enviada=False), name='notificacion_no_enviada_idx'),
+        ]
 
     def __str__(self):
         return f"Notificación para {self.factura.numero_factura}"
+
+
+# Pagos (parciales o totales) de una factura; se registran con cuentas/pagos.py,
+# que descuenta cada pago del saldo_pendiente de la factura
+class Pago(models.Model):
+    factura = models.ForeignKey(Factura, on_delete=models.CASCADE, related_name='pagos')
+    monto = models.DecimalField(max_digits=10, decimal_places=2)
+    fecha = models.DateField(default=timezone.localdate)
+    referencia = models.CharField(max_length=100, blank=True)
+    registrado_en = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(condition=Q(monto__gt=0), name='pago_monto_positivo'),
+        ]
+
+    def __str__(self):
+        return f"Pago de {self.monto} a {self.factura_id}"
+
+
+# Registro de cambios de facturas y notificaciones (cuentas/cambios.py); el id
+# es el número de secuencia desde el que los clientes piden los cambios
+class Cambio(models.Model):
+    ACCIONES = [
+        ('crear', 'Crear'),
+        ('actualizar', 'Actualizar'),
+        ('eliminar', 'Eliminar'),
+    ]
+
+    modelo = models.CharField(max_length=20)
+    objeto_id = models.BigIntegerField()
+    accion = models.CharField(max_length=10, choices=ACCIONES)
+    fecha = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.id}: {self.accion} {self.modelo} {self.objeto_id}"
+
+
+# Marca de agua del barrido de facturas vencidas (una sola fila)
+class ControlVencimiento(models.Model):
+    ultima_fecha = models.DateField(null=True, blank=True)
+    filas_actualizadas = models.PositiveIntegerField(default=0)
+    ejecutado_en = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Vencimientos al {self.ultima_fecha} ({self.filas_actualizadas} facturas)"
+
+
+# Resumen mensual de facturas para el dashboard, se mantiene al guardar o eliminar facturas
+class FacturaResumenMensual(models.Model):
+    anio = models.PositiveSmallIntegerField()
+    mes = models.PositiveSmallIntegerField()
+    tipo = models.CharField(max_length=10, choices=Factura.TIPO_CHOICES)
+    estado = models.CharField(max_length=10, choices=Factura.ESTADO_CHOICES)
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    cantidad = models.IntegerField(default=0)
+    # Grupos de facturas archivadas; el dashboard solo los incluye si se piden
+    archivada = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['anio', 'mes', 'tipo', 'estado', 'archivada'], name='resumen_mensual_unico_archivada',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.anio}-{self.mes:02d} {self.tipo} {self.estado}" + (" (archivo)" if self.archivada else "")
+
+
+# Facturas pagadas antiguas movidas fuera de la tabla principal (ver cuentas/archivo.py).
+# Conservan el id original y sus notificaciones como JSON, para poder restaurarlas.
+class FacturaArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    numero_factura = models.CharField(max_length=50, unique=True)
+    tipo = models.CharField(max_length=10, choices=Factura.TIPO_CHOICES)
+    cliente = models.ForeignKey(
+        Cliente, on_delete=models.CASCADE, null=True, blank=True, related_name='facturas_archivadas'
+    )
+    proveedor = models.ForeignKey(
+        Proveedor, on_delete=models.CASCADE, null=True, blank=True, related_name='facturas_archivadas'
+    )
+    fecha_emision = models.DateField()
+    fecha_vencimiento = models.DateField()
+    monto_total = models.DecimalField(max_digits=10, decimal_places=2)
+    estado = models.CharField(max_length=10, choices=Factura.ESTADO_CHOICES)
+    saldo_pendiente = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    actualizado_en = models.DateTimeField(auto_now=True)
+    archivada_en = models.DateTimeField(auto_now_add=True)
+    notificaciones = models.JSONField(default=list, blank=True)
+    pagos = models.JSONField(default=list, blank=True)
+
+    objects = FacturaQuerySet.as_manager()
+
+    def __str__(self):
+        return self.numero_factura
+
+    @property
+    def estado_actual(self):
+        return self.estado
+
+
+# Foto de la antigüedad de saldos por contraparte, generada con el comando generar_antiguedad
+class AntiguedadSaldo(models.Model):
+    fecha_corte = models.DateField()
+    tipo = models.CharField(max_length=10, choices=Factura.TIPO_CHOICES)
+    contraparte_id = models.BigIntegerField()
+    contraparte = models.CharField(max_length=100)
+    por_vencer = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    dias_0_30 = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    dias_31_60 = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    dias_61_90 = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    dias_90_mas = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_corte', 'tipo', '-total'], name='antiguedad_corte_total_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.contraparte} al {self.fecha_corte}"
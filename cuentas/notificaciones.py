@@ -0,0 +1,143 @@
+# cuentas/notificaciones.py
+
+import json
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Factura, Notificacion
+from . import cambios
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500
+DIAS_AVISO = 5
+
+
+# Backends de envío: reciben una lista de notificaciones (con su factura cargada)
+# y devuelven los ids de las que se enviaron correctamente.
+class BackendConsola:
+    def enviar(self, notificaciones):
+        for notificacion in notificaciones:
+            logger.info("Notificación %s: %s", notificacion.pk, notificacion.mensaje)
+        return [notificacion.pk for notificacion in notificaciones]
+
+
+class BackendArchivo:
+    # Escribe cada notificación como una línea JSON en NOTIFICACIONES_ARCHIVO
+    def __init__(self):
+        self.ruta = getattr(settings, 'NOTIFICACIONES_ARCHIVO', 'notificaciones.ndjson')
+
+    def enviar(self, notificaciones):
+        with open(self.ruta, 'a', encoding='utf-8') as archivo:
+            for notificacion in notificaciones:
+                archivo.write(json.dumps({
+                    'id': notificacion.pk,
+                    'factura': notificacion.factura.numero_factura,
+                    'tipo': notificacion.tipo,
+                    'mensaje': notificacion.mensaje,
+                }, ensure_ascii=False) + '\n')
+        return [notificacion.pk for notificacion in notificaciones]
+
+
+def obtener_backend():
+    ruta = getattr(settings, 'NOTIFICACIONES_BACKEND', 'cuentas.notificaciones.BackendConsola')
+    return import_string(ruta)()
+
+
+def _crear_en_lotes(filas, tipo, mensaje):
+    # filas: (id, numero_factura, fecha_vencimiento). Los conflictos con la restricción
+    # única (factura, tipo) se ignoran, así que generar dos veces no duplica avisos.
+    creadas = 0
+    lote = []
+    for factura_id, numero, vencimiento in filas:
+        lote.append(Notificacion(
+            factura_id=factura_id, tipo=tipo, mensaje=mensaje.format(numero=numero, fecha=vencimiento),
+        ))
+        if len(lote) == TAMANO_LOTE:
+            creadas += _insertar_lote(lote, tipo)
+            lote = []
+    if lote:
+        creadas += _insertar_lote(lote, tipo)
+    return creadas
+
+
+def _insertar_lote(lote, tipo):
+    with transaction.atomic():
+        Notificacion.objects.bulk_create(lote, ignore_conflicts=True)
+        # Con ignore_conflicts no vuelven los ids: se leen por (factura, tipo). Si
+        # otro proceso ya la había creado, el cliente recibe un 'crear' repetido
+        ids = Notificacion.objects.filter(
+            factura_id__in=[notificacion.factura_id for notificacion in lote], tipo=tipo,
+        ).values_list('id', flat=True)
+        cambios.registrar(Notificacion, list(ids), 'crear')
+    return len(lote)
+
+
+def generar_notificaciones(hoy=None, dias_aviso=DIAS_AVISO):
+    """
+    Crea las notificaciones de facturas por vencer (dentro de `dias_aviso`) y
+    vencidas que aún no tienen una. Cada tipo se resuelve con una consulta
+    que excluye las facturas ya notificadas. Devuelve cuántas intentó crear.
+    """
+    hoy = hoy or timezone.localdate()
+    campos = ('id', 'numero_factura', 'fecha_vencimiento')
+
+    por_vencer = (
+        Factura.objects.pendientes(hoy)
+        .filter(fecha_vencimiento__lte=hoy + timedelta(days=dias_aviso))
+        .exclude(notificacion__tipo='PorVencer')
+        .values_list(*campos)
+    )
+    vencidas = (
+        Factura.objects.vencidas(hoy)
+        .exclude(notificacion__tipo='Vencida')
+        .values_list(*campos)
+    )
+    return (
+        _crear_en_lotes(por_vencer.iterator(chunk_size=TAMANO_LOTE), 'PorVencer',
+                        "La factura {numero} vence el {fecha}.")
+        + _crear_en_lotes(vencidas.iterator(chunk_size=TAMANO_LOTE), 'Vencida',
+                          "La factura {numero} venció el {fecha}.")
+    )
+
+
+def despachar_lote(backend, tamano=TAMANO_LOTE):
+    """
+    Toma un lote de notificaciones no enviadas con SELECT ... FOR UPDATE SKIP
+    LOCKED (cada worker obtiene filas distintas), las entrega al backend y
+    marca como enviadas las que tuvieron éxito. Devuelve (tomadas, enviadas).
+    """
+    with transaction.atomic():
+        ids = list(
+            Notificacion.objects
+            .select_for_update(skip_locked=True)
+            .filter(enviada=False)
+            .order_by('id')
+            .values_list('id', flat=True)[:tamano]
+        )
+        if not ids:
+            return 0, 0
+        notificaciones = list(Notificacion.objects.filter(pk__in=ids).select_related('factura').order_by('id'))
+        try:
+            enviadas = backend.enviar(notificaciones)
+        except Exception:
+            logger.exception("Error al enviar %s notificaciones", len(ids))
+            enviadas = []
+        if enviadas:
+            Notificacion.objects.filter(pk__in=enviadas).update(enviada=True, fecha_envio=timezone.now(), actualizado_en=timezone.now())
+            cambios.registrar(Notificacion, enviadas, 'actualizar')
+    return len(ids), len(enviadas)
+
+
+def despachar_pendientes(backend=None, tamano=TAMANO_LOTE):
+    # Despacha lotes hasta que no quedan notificaciones libres; devuelve el total enviado
+    backend = backend or obtener_backend()
+    total = 0
+    while True:
+        tomadas, enviadas = despachar_lote(backend, tamano)
+        total += enviadas
+        if tomadas == 0 or enviadas == 0:
+            return total
@@ -0,0 +1,26 @@
+# cuentas/paginacion.py
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CursorPaginacion(CursorPagination):
+    # Paginación por cursor (keyset) sobre la clave primaria, que siempre está indexada
+    ordering = '-id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def decode_cursor(self, request):
+        # Un cursor mal formado es un error del cliente (400), no un recurso inexistente (404)
+        try:
+            return super().decode_cursor(request)
+        except NotFound:
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+
+
+class PaginaPaginacion(PageNumberPagination):
+    # Para resultados agregados, que no tienen una clave única por la cual usar cursor
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
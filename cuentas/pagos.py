@@ -0,0 +1,85 @@
+# cuentas/pagos.py
+#
+# Registro de pagos. Cada pago se descuenta del saldo_pendiente de su factura
+# con F() en la misma transacción, y la factura pasa a Pagada cuando el saldo
+# llega a cero; así consultar un saldo nunca requiere sumar el historial de
+# pagos. El resumen mensual y los saldos por contraparte se ajustan a la vez.
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from .models import Factura, Pago
+from .resumen import invalidar_dashboard, registrar_grupos
+from . import cambios, saldos
+
+
+def registrar_pagos(pagos):
+    """
+    Guarda los pagos (instancias de Pago sin guardar) y actualiza sus facturas.
+    Si algún pago no es válido no se guarda ninguno. Devuelve las facturas
+    afectadas como {id: {'saldo_pendiente', 'estado'}}.
+    """
+    totales = defaultdict(Decimal)
+    for pago in pagos:
+        totales[pago.factura_id] += pago.monto
+
+    with transaction.atomic():
+        # Se bloquean las facturas en orden fijo: el saldo leído no cambia hasta el final
+        facturas = {
+            factura.pk: factura
+            for factura in Factura.objects.select_for_update().filter(pk__in=totales).order_by('pk')
+        }
+        errores = {}
+        for factura_id, total in totales.items():
+            factura = facturas.get(factura_id)
+            if factura is None:
+                errores[factura_id] = "La factura no existe."
+            elif factura.estado == 'Pagada':
+                errores[factura_id] = "La factura ya está pagada."
+            elif total > factura.saldo_pendiente:
+                errores[factura_id] = f"El pago supera el saldo pendiente ({factura.saldo_pendiente})."
+        if errores:
+            raise ValidationError({'facturas': errores})
+
+        Pago.objects.bulk_create(pagos)
+        ahora = timezone.now()
+        deltas = saldos.nuevos_deltas()
+        pagadas = defaultdict(lambda: {'total': Decimal(0), 'cantidad': 0})
+        resultado = {}
+        for factura_id, total in sorted(totales.items()):
+            factura = facturas[factura_id]
+            Factura.objects.filter(pk=factura_id).update(
+                saldo_pendiente=F('saldo_pendiente') - total,
+                estado=Case(When(saldo_pendiente=total, then=Value('Pagada')), default=F('estado')),
+                actualizado_en=ahora,
+            )
+            anterior = factura.valores_resumen()
+            nuevo = {
+                **anterior,
+                'saldo_pendiente': factura.saldo_pendiente - total,
+                'estado': 'Pagada' if factura.saldo_pendiente == total else factura.estado,
+            }
+            saldos.acumular(deltas, anterior, -1)
+            saldos.acumular(deltas, nuevo, 1)
+            if nuevo['estado'] != anterior['estado']:
+                grupo = pagadas[(factura.fecha_emision.year, factura.fecha_emision.month, factura.tipo, factura.estado)]
+                grupo['total'] += factura.monto_total
+                grupo['cantidad'] += 1
+            resultado[factura_id] = {'saldo_pendiente': nuevo['saldo_pendiente'], 'estado': nuevo['estado']}
+
+        saldos.aplicar(deltas)
+        cambios.registrar(Factura, sorted(totales), 'actualizar')
+        # Las facturas saldadas pasan de su estado (Pendiente o Vencida) a Pagada en el resumen
+        for estado in ('Pendiente', 'Vencida'):
+            grupos = [
+                {'anio': anio, 'mes': mes, 'tipo': tipo, 'estado': 'Pagada', **valores}
+                for (anio, mes, tipo, estado_anterior), valores in pagadas.items() if estado_anterior == estado
+            ]
+            if grupos:
+                registrar_grupos(grupos, estado_anterior=estado)
+        # Cambian los saldos que usa la proyección del flujo de caja
+        invalidar_dashboard()
+    return resultado
@@ -0,0 +1,97 @@
+# cuentas/replica.py
+#
+# Lecturas en la réplica (settings.DATABASE_REPLICA). Solo se leen de ella las
+# solicitudes GET de las vistas con LecturaReplicaMixin; todo lo demás (las
+# escrituras, el barrido de vencimientos, las lecturas dentro de
+# transacciones y los comandos) usa el primario.
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.http import JsonResponse
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_leer_de_replica = ContextVar('leer_de_replica', default=False)
+# Momento (time.monotonic) hasta el cual no se usa la réplica tras un error
+_replica_caida_hasta = 0.0
+
+
+def alias_replica():
+    return getattr(settings, 'DATABASE_REPLICA', None)
+
+
+def replica_disponible():
+    return alias_replica() is not None and time.monotonic() >= _replica_caida_hasta
+
+
+def marcar_replica_caida():
+    global _replica_caida_hasta
+    _replica_caida_hasta = time.monotonic() + getattr(settings, 'REPLICA_REINTENTO_SEGUNDOS', 30)
+
+
+@contextmanager
+def leer_de_replica():
+    token = _leer_de_replica.set(True)
+    try:
+        yield
+    finally:
+        _leer_de_replica.reset(token)
+
+
+class RouterReplica:
+    def db_for_read(self, model, **hints):
+        if not _leer_de_replica.get() or not replica_disponible():
+            return DEFAULT_DB_ALIAS
+        # Dentro de una transacción se lee lo que se acaba de escribir
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplica tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación
+        return db != alias_replica()
+
+
+class LecturaReplicaMixin:
+    # Atiende los GET/HEAD/OPTIONS leyendo de la réplica; si no responde, se repite en el primario
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or not replica_disponible():
+            return super().dispatch(request, *args, **kwargs)
+        try:
+            with leer_de_replica():
+                return super().dispatch(request, *args, **kwargs)
+        except OperationalError:
+            logger.exception("Error en la réplica %s; se usa el primario", alias_replica())
+            marcar_replica_caida()
+            connections[alias_replica()].close()
+            return super().dispatch(request, *args, **kwargs)
+
+
+def salud_view(request):
+    # Comprueba cada conexión con SELECT 1; 503 si el primario no responde
+    estado = {}
+    for alias in connections:
+        inicio = time.perf_counter()
+        try:
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT 1')
+            estado[alias] = {'ok': True, 'ms': round((time.perf_counter() - inicio) * 1000, 2)}
+        except OperationalError:
+            # El detalle (host, usuario) solo va al log: esta vista no requiere autenticación
+            logger.exception("La conexión %s no responde", alias)
+            estado[alias] = {'ok': False}
+    if alias_replica() in estado:
+        estado[alias_replica()]['en_uso'] = replica_disponible()
+    return JsonResponse(estado, status=200 if estado[DEFAULT_DB_ALIAS]['ok'] else 503)
@@ -0,0 +1,200 @@
+# cuentas/resumen.py
+
+import calendar
+from datetime import date
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+from .models import Factura, FacturaArchivada, FacturaResumenMensual
+from . import cambios, saldos
+
+CLAVE_VERSION_DASHBOARD = 'dashboard-metrics:version'
+DURACION_CACHE_DASHBOARD = 60 * 15
+
+
+def _ajustar(fecha_emision, tipo, estado, monto, cantidad, archivada=False):
+    # Suma (o resta) una factura en su grupo del resumen mensual
+    if not cantidad:
+        return
+    filtros = {
+        'anio': fecha_emision.year, 'mes': fecha_emision.month, 'tipo': tipo, 'estado': estado,
+        'archivada': archivada,
+    }
+    resumen, creado = FacturaResumenMensual.objects.get_or_create(
+        **filtros, defaults={'total': monto, 'cantidad': cantidad}
+    )
+    if not creado:
+        FacturaResumenMensual.objects.filter(pk=resumen.pk).update(
+            total=F('total') + monto, cantidad=F('cantidad') + cantidad
+        )
+
+
+def registrar_cambio(anterior=None, nuevo=None):
+    """
+    Aplica al resumen mensual el cambio de una factura. `anterior` y `nuevo` son
+    los valores de Factura.valores_resumen() antes y después (None si no existían).
+    """
+    if anterior == nuevo:
+        return
+    with transaction.atomic():
+        if anterior:
+            _ajustar(anterior['fecha_emision'], anterior['tipo'], anterior['estado'],
+                     -Decimal(str(anterior['monto_total'])), -1)
+        if nuevo:
+            _ajustar(nuevo['fecha_emision'], nuevo['tipo'], nuevo['estado'],
+                     Decimal(str(nuevo['monto_total'])), 1)
+    invalidar_dashboard()
+
+
+def registrar_grupos(grupos, estado_anterior=None):
+    """
+    Aplica al resumen grupos ya agregados con agrupar_por_mes(). Con
+    `estado_anterior`, los grupos se mueven de ese estado al que traen.
+    """
+    with transaction.atomic():
+        for grupo in grupos:
+            fecha = date(grupo['anio'], grupo['mes'], 1)
+            if estado_anterior:
+                _ajustar(fecha, grupo['tipo'], estado_anterior, -grupo['total'], -grupo['cantidad'])
+            _ajustar(fecha, grupo['tipo'], grupo['estado'], grupo['total'], grupo['cantidad'])
+    invalidar_dashboard()
+
+
+def archivar_grupos(grupos, archivada=True):
+    # Pasa grupos de agrupar_por_mes() a los del archivo (o de vuelta, con archivada=False)
+    with transaction.atomic():
+        for grupo in grupos:
+            fecha = date(grupo['anio'], grupo['mes'], 1)
+            _ajustar(fecha, grupo['tipo'], grupo['estado'], -grupo['total'], -grupo['cantidad'], not archivada)
+            _ajustar(fecha, grupo['tipo'], grupo['estado'], grupo['total'], grupo['cantidad'], archivada)
+    invalidar_dashboard()
+
+
+def agrupar_por_mes(facturas):
+    # Agrega un queryset de facturas por (año, mes, tipo, estado) con una sola consulta
+    return list(
+        facturas
+        .annotate(anio=ExtractYear('fecha_emision'), mes=ExtractMonth('fecha_emision'))
+        .values('anio', 'mes', 'tipo', 'estado')
+        .annotate(total=Sum('monto_total'), cantidad=Count('id'))
+        .order_by()
+    )
+
+
+def mover_a_vencidas(facturas):
+    # Marca como vencidas las facturas del queryset manteniendo al día el resumen mensual y los saldos
+    with transaction.atomic():
+        # Bloquea las filas antes de agregarlas para que el resumen coincida con lo actualizado
+        ids = list(facturas.select_for_update().values_list('pk', flat=True))
+        grupos = agrupar_por_mes(facturas)
+        grupos_saldos = saldos.agrupar_por_contraparte(facturas)
+        filas = facturas.update(estado='Vencida', actualizado_en=timezone.now())
+        if filas:
+            for grupo in grupos:
+                grupo['estado'] = 'Vencida'
+            registrar_grupos(grupos, estado_anterior='Pendiente')
+            saldos.mover_grupos(grupos_saldos, 'Vencida')
+            cambios.registrar(Factura, ids, 'actualizar')
+    return filas
+
+
+def reconstruir_resumen():
+    # Recalcula todo el resumen mensual desde las tablas de facturas y de facturas archivadas
+    with transaction.atomic():
+        FacturaResumenMensual.objects.all().delete()
+        FacturaResumenMensual.objects.bulk_create(
+            FacturaResumenMensual(**grupo) for grupo in agrupar_por_mes(Factura.objects.all())
+        )
+        FacturaResumenMensual.objects.bulk_create(
+            FacturaResumenMensual(**grupo, archivada=True)
+            for grupo in agrupar_por_mes(FacturaArchivada.objects.all())
+        )
+    invalidar_dashboard()
+
+
+def invalidar_dashboard():
+    # Cambia la versión de la caché del dashboard cuando se confirma la transacción
+    def _incrementar():
+        try:
+            cache.incr(CLAVE_VERSION_DASHBOARD)
+        except ValueError:
+            cache.set(CLAVE_VERSION_DASHBOARD, 1, None)
+    transaction.on_commit(_incrementar)
+
+
+def obtener_metricas(desde=None, hasta=None, incluir_archivo=False):
+    """
+    Métricas del dashboard calculadas sobre el resumen mensual con una sola
+    consulta agrupada. El resultado se guarda en caché hasta el próximo cambio
+    de facturas. Las facturas archivadas solo se suman con `incluir_archivo`.
+    """
+    version = cache.get_or_set(CLAVE_VERSION_DASHBOARD, 1, None)
+    clave = f'dashboard-metrics:{version}:{desde}:{hasta}:{int(incluir_archivo)}'
+    data = cache.get(clave)
+    if data is None:
+        data = _calcular_metricas(desde, hasta, incluir_archivo)
+        cache.set(clave, data, DURACION_CACHE_DASHBOARD)
+    return data
+
+
+async def aobtener_metricas(desde=None, hasta=None, incluir_archivo=False):
+    # Versión asíncrona de obtener_metricas para las vistas ASGI
+    version = await cache.aget_or_set(CLAVE_VERSION_DASHBOARD, 1, None)
+    clave = f'dashboard-metrics:{version}:{desde}:{hasta}:{int(incluir_archivo)}'
+    data = await cache.aget(clave)
+    if data is None:
+        data = _formatear_metricas([entry async for entry in _consulta_metricas(desde, hasta, incluir_archivo)])
+        await cache.aset(clave, data, DURACION_CACHE_DASHBOARD)
+    return data
+
+
+def _calcular_metricas(desde, hasta, incluir_archivo=False):
+    return _formatear_metricas(_consulta_metricas(desde, hasta, incluir_archivo))
+
+
+def _consulta_metricas(desde, hasta, incluir_archivo=False):
+    resumen = FacturaResumenMensual.objects.all()
+    if not incluir_archivo:
+        resumen = resumen.filter(archivada=False)
+    if desde is not None:
+        resumen = resumen.filter(anio__gte=desde)
+    if hasta is not None:
+        resumen = resumen.filter(anio__lte=hasta)
+
+    return (
+        resumen
+        .values('anio', 'mes')
+        .annotate(
+            flujo=Sum('total'),
+            por_cobrar=Sum('total', filter=Q(tipo='Cobrar')),
+            por_pagar=Sum('total', filter=Q(tipo='Pagar')),
+            vencidas=Sum('cantidad', filter=Q(estado='Vencida')),
+        )
+        .order_by('anio', 'mes')
+    )
+
+
+def _formatear_metricas(meses):
+    total_por_cobrar = total_por_pagar = Decimal(0)
+    facturas_vencidas = 0
+    flujo_por_mes = []
+    for entry in meses:
+        total_por_cobrar += entry['por_cobrar'] or 0
+        total_por_pagar += entry['por_pagar'] or 0
+        facturas_vencidas += entry['vencidas'] or 0
+        if entry['flujo']:
+            flujo_por_mes.append({
+                "anio": entry['anio'],
+                "mes": calendar.month_name[entry['mes']],
+                "total": entry['flujo'],
+            })
+
+    return {
+        "totalPorCobrar": total_por_cobrar,
+        "totalPorPagar": total_por_pagar,
+        "facturasVencidas": facturas_vencidas,
+        "flujoPorMes": flujo_por_mes,
+    }
@@ -0,0 +1,118 @@
+# cuentas/saldos.py
+#
+# Saldos desnormalizados por cliente y proveedor (pendiente, vencido y
+# cantidad de facturas abiertas), como suma del saldo_pendiente de sus
+# facturas: los pagos parciales ya descuentan. Se ajustan con F() en la misma transacción
+# que el cambio de la factura, así que leerlos no requiere agregar facturas.
+
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+from .models import Cliente, Proveedor, Factura
+
+# Campos (saldo, cantidad) afectados por cada estado; las facturas pagadas no suman
+CAMPOS_POR_ESTADO = {
+    'Pendiente': ('saldo_pendiente', 'facturas_pendientes'),
+    'Vencida': ('saldo_vencido', 'facturas_vencidas'),
+}
+CAMPOS_SALDO = ('saldo_pendiente', 'saldo_vencido', 'facturas_pendientes', 'facturas_vencidas')
+TAMANO_LOTE = 2000
+
+
+def nuevos_deltas():
+    return defaultdict(lambda: defaultdict(int))
+
+
+def acumular(deltas, valores, signo=1):
+    """
+    Suma a `deltas` la contribución de una factura (valores_resumen()) o de un
+    grupo de agrupar_por_contraparte(), que además trae `cantidad`.
+    """
+    if not valores or valores['estado'] not in CAMPOS_POR_ESTADO:
+        return
+    if valores['tipo'] == 'Cobrar':
+        clave = (Cliente, valores['cliente_id'])
+    else:
+        clave = (Proveedor, valores['proveedor_id'])
+    if clave[1] is None:
+        return
+    saldo, cantidad = CAMPOS_POR_ESTADO[valores['estado']]
+    delta = deltas[clave]
+    delta[saldo] += signo * Decimal(str(valores['saldo_pendiente']))
+    delta[cantidad] += signo * valores.get('cantidad', 1)
+
+
+def aplicar(deltas):
+    # Una actualización con F() por contraparte, en orden fijo para evitar interbloqueos
+    ahora = timezone.now()
+    with transaction.atomic():
+        for (modelo, pk), campos in sorted(deltas.items(), key=lambda item: (item[0][0]._meta.label, item[0][1])):
+            cambios = {campo: F(campo) + valor for campo, valor in campos.items() if valor}
+            if cambios:
+                modelo.objects.filter(pk=pk).update(actualizado_en=ahora, **cambios)
+
+
+def registrar_cambio(anterior=None, nuevo=None):
+    # Igual que resumen.registrar_cambio: `anterior` y `nuevo` son valores_resumen() o None
+    if anterior == nuevo:
+        return
+    deltas = nuevos_deltas()
+    acumular(deltas, anterior, -1)
+    acumular(deltas, nuevo, 1)
+    aplicar(deltas)
+
+
+def agrupar_por_contraparte(facturas):
+    # Agrega un queryset de facturas por contraparte y estado con una sola consulta
+    return list(
+        facturas
+        .values('tipo', 'estado', 'cliente_id', 'proveedor_id')
+        .annotate(saldo_pendiente=Sum('saldo_pendiente'), cantidad=Count('id'))
+        .order_by()
+    )
+
+
+def mover_grupos(grupos, estado):
+    # Pasa los grupos de su estado a `estado` (p. ej. de Pendiente a Vencida)
+    deltas = nuevos_deltas()
+    for grupo in grupos:
+        acumular(deltas, grupo, -1)
+        acumular(deltas, {**grupo, 'estado': estado}, 1)
+    aplicar(deltas)
+
+
+def reconciliar(corregir=True):
+    """
+    Compara los saldos guardados con los calculados desde las facturas y
+    devuelve las diferencias; con `corregir` guarda los valores calculados.
+    Conviene ejecutarlo con poca actividad: las facturas que cambien mientras
+    corre pueden aparecer como diferencias.
+    """
+    esperados = nuevos_deltas()
+    for grupo in agrupar_por_contraparte(Factura.objects.all()):
+        acumular(esperados, grupo)
+
+    diferencias = []
+    ahora = timezone.now()
+    with transaction.atomic():
+        for modelo in (Cliente, Proveedor):
+            corregidos = []
+            for objeto in modelo.objects.only('id', *CAMPOS_SALDO).order_by('id').iterator(chunk_size=TAMANO_LOTE):
+                calculado = esperados.get((modelo, objeto.pk), {})
+                actual = {campo: getattr(objeto, campo) for campo in CAMPOS_SALDO}
+                esperado = {campo: calculado.get(campo, 0) for campo in CAMPOS_SALDO}
+                if actual == esperado:
+                    continue
+                diferencias.append({
+                    'modelo': modelo._meta.model_name, 'id': objeto.pk,
+                    'actual': actual, 'esperado': esperado,
+                })
+                if corregir:
+                    for campo, valor in esperado.items():
+                        setattr(objeto, campo, valor)
+                    objeto.actualizado_en = ahora
+                    corregidos.append(objeto)
+            modelo.objects.bulk_update(corregidos, CAMPOS_SALDO + ('actualizado_en',), batch_size=TAMANO_LOTE)
+    return diferencias
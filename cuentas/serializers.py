@@ -1,27 +1,84 @@
 # cuentas/serializers.py
 
 from rest_framework import serializers
-from .models import Usuario, Cliente, Proveedor, Factura, Notificacion
+from .models import Usuario, Cliente, Proveedor, Factura, FacturaArchivada, Notificacion, Pago
+
+def parametro_lista(request, nombre):
+    # Lee un parámetro de lectura con valores separados por comas (?fields=a,b)
+    if request is None or request.method != 'GET':
+        return set()
+    valor = request.query_params.get(nombre) or ''
+    return {parte.strip() for parte in valor.split(',') if parte.strip()}
+
+class CamposDinamicosMixin:
+    # Permite ?fields=id,nombre en las lecturas para devolver solo esos campos
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        permitidos = parametro_lista(self.context.get('request'), 'fields')
+        if not permitidos:
+            return
+        for nombre in set(self.fields) - permitidos:
+            self.fields.pop(nombre)
 
 class UsuarioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Usuario
         fields = ['id', 'username', 'email', 'rol']
 
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Cliente
-        fields = ['id', 'nombre', 'email', 'telefono', 'direccion']
+        fields = [
+            'id', 'nombre', 'email', 'telefono', 'direccion',
+            'saldo_pendiente', 'saldo_vencido', 'facturas_pendientes', 'facturas_vencidas',
+        ]
+        # Los saldos los mantiene cuentas/saldos.py al guardar facturas
+        read_only_fields = ['saldo_pendiente', 'saldo_vencido', 'facturas_pendientes', 'facturas_vencidas']
 
-class ProveedorSerializer(serializers.ModelSerializer):
+class ProveedorSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     class Meta:
         model = Proveedor
-        fields = ['id', 'nombre', 'email', 'telefono', 'direccion']
+        fields = [
+            'id', 'nombre', 'email', 'telefono', 'direccion',
+            'saldo_pendiente', 'saldo_vencido', 'facturas_pendientes', 'facturas_vencidas',
+        ]
+        # Los saldos los mantiene cuentas/saldos.py al guardar facturas
+        read_only_fields = ['saldo_pendiente', 'saldo_vencido', 'facturas_pendientes', 'facturas_vencidas']
+
+class FacturaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    # Relaciones que se pueden devolver completas con ?expand=cliente,proveedor
+    EXPANSIONES = {
+        'cliente': ClienteSerializer,
+        'proveedor': ProveedorSerializer,
+    }
 
-class FacturaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Factura
-        fields = ['id', 'numero_factura', 'tipo', 'cliente', 'proveedor', 'fecha_emision', 'fecha_vencimiento', 'monto_total', 'estado']
+        fields = ['id', 'numero_factura', 'tipo', 'cliente', 'proveedor', 'fecha_emision', 'fecha_vencimiento', 'monto_total', 'saldo_pendiente', 'estado']
+        # El saldo lo mantiene cuentas/pagos.py al registrar pagos
+        read_only_fields = ['saldo_pendiente']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for nombre in self.expansiones(self.context.get('request')):
+            if nombre in self.fields:
+                self.fields[nombre] = self.EXPANSIONES[nombre](read_only=True)
+
+    @classmethod
+    def expansiones(cls, request):
+        return parametro_lista(request, 'expand') & set(cls.EXPANSIONES)
+
+    def validate_monto_total(self, value):
+        # El saldo pendiente arranca en el monto y no puede ser negativo
+        if value < 0:
+            raise serializers.ValidationError("El monto no puede ser negativo.")
+        return value
+
+    def validate_numero_factura(self, value):
+        # unique solo cubre la tabla vigente: un número archivado tampoco se reutiliza (restaurar fallaría)
+        if FacturaArchivada.objects.filter(numero_factura=value).exists():
+            raise serializers.ValidationError("Ya existe una factura archivada con este número.")
+        return value
 
     def validate(self, data):
         # Validar lógica para facturas "Por Cobrar"
@@ -36,8 +93,46 @@ class FacturaSerializer(serializers.ModelSerializer):
         if data['tipo'] == 'Pagar' and data.get('cliente'):
             raise serializers.ValidationError("No debe asignar un cliente si el tipo es 'Por Pagar'")
 
+        # Lo mismo que valida Factura.save(), como 400 en lugar de un error del servidor
+        if self.instance is not None:
+            monto = data.get('monto_total', self.instance.monto_total)
+            pagado = self.instance.total_pagado()
+            if monto < pagado:
+                raise serializers.ValidationError({'monto_total': "No puede ser menor que lo ya pagado."})
+            reabierta = self.instance.estado == 'Pagada' and data.get('estado', 'Pagada') != 'Pagada'
+            if reabierta and pagado >= monto:
+                raise serializers.ValidationError({'estado': "Los pagos registrados ya cubren el monto total."})
+
+        return data
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Refleja el vencimiento aunque el barrido diario aún no haya actualizado la fila
+        if 'estado' in data:
+            data['estado'] = instance.estado_actual
         return data
     
+class FacturaArchivadaSerializer(FacturaSerializer):
+    # Solo lectura: las facturas archivadas se modifican restaurándolas
+    class Meta:
+        model = FacturaArchivada
+        fields = FacturaSerializer.Meta.fields + ['archivada_en', 'notificaciones', 'pagos']
+        read_only_fields = fields
+
+class PagoSerializer(serializers.ModelSerializer):
+    # Solo el id: la existencia y el saldo de la factura se validan al registrar,
+    # con una consulta para todo el lote
+    factura = serializers.IntegerField(source='factura_id')
+
+    class Meta:
+        model = Pago
+        fields = ['id', 'factura', 'monto', 'fecha', 'referencia', 'registrado_en']
+
+    def validate_monto(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("El monto debe ser mayor que cero.")
+        return value
+
 class RegistroUsuarioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Usuario
@@ -56,9 +151,9 @@ class RegistroUsuarioSerializer(serializers.ModelSerializer):
         )
         return usuario
 
-class NotificacionSerializer(serializers.ModelSerializer):
+class NotificacionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     factura_numero = serializers.CharField(source='factura.numero_factura', read_only=True)
 
     class Meta:
         model = Notificacion
-        fields = ['id', 'factura', 'factura_numero', 'mensaje', 'fecha_envio', 'enviada']
+        fields = ['id', 'factura', 'factura_numero', 'tipo', 'mensaje', 'fecha_envio', 'enviada']
@@ -0,0 +1,84 @@
+# cuentas/signals.py
+
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import Usuario, Factura, Notificacion
+from .resumen import registrar_cambio
+from . import cambios, saldos
+from .autenticacion import invalidar_version
+
+
+@receiver(pre_save, sender=Factura)
+def guardar_valores_anteriores(sender, instance, **kwargs):
+    if instance._state.adding:
+        instance._resumen_anterior = None
+        return
+    anterior = getattr(instance, '_valores_originales', None)
+    if anterior is None or any(anterior[campo] is None for campo in ('fecha_emision', 'tipo', 'estado', 'monto_total')):
+        # Instancia sin valores originales completos (p. ej. cargada con only()): se leen de la BD
+        anterior = (
+            Factura.objects.filter(pk=instance.pk)
+            .values(*Factura.CAMPOS_RESUMEN)
+            .first()
+        )
+    instance._resumen_anterior = anterior
+
+
+@receiver(post_save, sender=Factura)
+def actualizar_resumen_al_guardar(sender, instance, **kwargs):
+    nuevo = instance.valores_resumen()
+    anterior = getattr(instance, '_resumen_anterior', None)
+    registrar_cambio(anterior, nuevo)
+    saldos.registrar_cambio(anterior, nuevo)
+    instance._valores_originales = nuevo
+
+
+@receiver(post_delete, sender=Factura)
+def actualizar_resumen_al_eliminar(sender, instance, **kwargs):
+    anterior = getattr(instance, '_valores_originales', None) or instance.valores_resumen()
+    registrar_cambio(anterior, None)
+    saldos.registrar_cambio(anterior, None)
+
+
+@receiver(post_save, sender=Factura)
+@receiver(post_save, sender=Notificacion)
+def registrar_cambio_al_guardar(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        cambios.registrar(sender, [instance.pk], 'crear' if created else 'actualizar')
+
+
+@receiver(post_delete, sender=Factura)
+@receiver(post_delete, sender=Notificacion)
+def registrar_cambio_al_eliminar(sender, instance, **kwargs):
+    cambios.registrar(sender, [instance.pk], 'eliminar')
+
+
+@receiver(pre_save, sender=Usuario)
+def incrementar_version_token(sender, instance, **kwargs):
+    # Los tokens llevan rol y permisos; si cambian los datos de acceso dejan de ser válidos
+    if instance._state.adding:
+        return
+    anterior = Usuario.objects.filter(pk=instance.pk).values('rol', 'password', 'is_active', 'version_token').first()
+    if anterior is None:
+        return
+    if any(anterior[campo] != getattr(instance, campo) for campo in ('rol', 'password', 'is_active')):
+        instance.version_token = anterior['version_token'] + 1
+
+
+@receiver(post_save, sender=Usuario)
+def limpiar_cache_version(sender, instance, **kwargs):
+    invalidar_version(instance.pk)
+
+
+@receiver(m2m_changed, sender=Usuario.user_permissions.through)
+def permisos_modificados(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    usuarios = pk_set if reverse else [instance.pk]
+    if reverse and action == 'post_clear':
+        # Se desconoce qué usuarios tenían el permiso: se invalidan todos
+        usuarios = list(Usuario.objects.values_list('pk', flat=True))
+    Usuario.objects.filter(pk__in=usuarios).update(version_token=F('version_token') + 1)
+    for usuario_id in usuarios:
+        invalidar_version(usuario_id)
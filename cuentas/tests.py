@@ -1,3 +1,1271 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from asgiref.sync import sync_to_async
+from unittest import mock
+from datetime import date, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command, get_commands
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from .models import Usuario, Cliente, Proveedor, Factura, FacturaArchivada, Notificacion, Pago, FacturaResumenMensual, Cambio
+from .resumen import obtener_metricas, reconstruir_resumen
+from .saldos import reconciliar
+from .busqueda import consulta_prefijos
+from .archivo import archivar, horizonte, restaurar
+from .arranque import leer_importtime
+from .flujo import proyectar_flujo
+from .pagos import registrar_pagos
+from . import cambios, replica
+from .replica import RouterReplica, leer_de_replica, marcar_replica_caida
+from .vencimientos import actualizar_vencidas, actualizar_si_cambio_el_dia
+from .serializers import FacturaSerializer, NotificacionSerializer
+from .views import NotificacionViewSet
+from .vistas_acceso import CustomTokenObtainPairSerializer
+from .metricas import registro
+from .volcado import CargaFixture, leer_objetos, volcar
+from .notificaciones import despachar_pendientes, generar_notificaciones
 
-# Create your tests here.
+
+def crear_facturas(n, hoy=None):
+    # Genera n facturas repartidas entre cobrar/pagar, estados y tres años de emisión
+    hoy = hoy or date.today()
+    cliente, _ = Cliente.objects.get_or_create(email="cliente@example.com", defaults={'nombre': "Cliente"})
+    proveedor, _ = Proveedor.objects.get_or_create(email="proveedor@example.com", defaults={'nombre': "Proveedor"})
+    estados = ['Pagada', 'Pagada', 'Pagada', 'Pagada', 'Vencida', 'Pendiente']
+    facturas = []
+    for i in range(n):
+        cobrar = i % 2 == 0
+        emision = hoy - timedelta(days=i % 1095)
+        facturas.append(Factura(
+            numero_factura=f"F-{i:07d}",
+            tipo='Cobrar' if cobrar else 'Pagar',
+            cliente=cliente if cobrar else None,
+            proveedor=None if cobrar else proveedor,
+            fecha_emision=emision,
+            fecha_vencimiento=emision + timedelta(days=30),
+            monto_total=Decimal(100 + i % 900),
+            estado=estados[i % len(estados)],
+        ))
+    Factura.objects.bulk_create(facturas, batch_size=5000)
+
+
+class IndicesFacturaTests(TestCase):
+    """
+    Verifica con EXPLAIN que las consultas del dashboard y del barrido de
+    vencimientos usan los índices de Factura. En PostgreSQL conviene correrlo
+    con FILAS = 1_000_000; en SQLite bastan unas decenas de miles.
+    """
+    FILAS = 30000
+
+    @classmethod
+    def setUpTestData(cls):
+        crear_facturas(cls.FILAS)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan, plan)
+
+    def test_barrido_de_vencimientos_usa_indice_parcial(self):
+        hoy = date.today()
+        facturas = Factura.objects.filter(
+            estado='Pendiente', fecha_vencimiento__lt=hoy,
+        )
+        self.assertUsaIndice(facturas, 'factura_pendiente_venc_idx')
+
+    def test_vencidas_del_dashboard_usan_indice_por_estado(self):
+        self.assertUsaIndice(Factura.objects.filter(estado='Vencida'), 'factura_estado_idx')
+
+    def test_totales_por_tipo_y_periodo_usan_indice_compuesto(self):
+        hoy = date.today()
+        facturas = Factura.objects.filter(
+            tipo='Cobrar', fecha_emision__gte=hoy.replace(month=1, day=1),
+        ).values('monto_total')
+        self.assertUsaIndice(facturas, 'factura_tipo_emision_idx')
+
+
+class ResumenMensualTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hoy = date.today()
+        self.cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+
+    def crear_factura(self, numero, monto, vencimiento):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Factura.objects.create(
+                numero_factura=numero, tipo='Cobrar', cliente=self.cliente,
+                fecha_emision=self.hoy - timedelta(days=40), fecha_vencimiento=vencimiento,
+                monto_total=Decimal(monto),
+            )
+
+    def assertResumenCoincide(self):
+        metricas = obtener_metricas()
+        self.assertEqual(
+            metricas['totalPorCobrar'],
+            Factura.objects.filter(tipo='Cobrar').aggregate(total=Sum('monto_total'))['total'] or 0,
+        )
+        self.assertEqual(metricas['facturasVencidas'], Factura.objects.filter(estado='Vencida').count())
+
+    def test_resumen_se_mantiene_al_crear_modificar_y_eliminar(self):
+        factura = self.crear_factura('F-1', '100.00', self.hoy + timedelta(days=5))
+        self.crear_factura('F-2', '50.00', self.hoy - timedelta(days=5))
+        self.assertResumenCoincide()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            factura.monto_total = Decimal('80.00')
+            factura.estado = 'Pagada'
+            factura.save()
+        self.assertResumenCoincide()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            factura.delete()
+        self.assertResumenCoincide()
+
+    def test_barrido_de_vencimientos_actualiza_resumen(self):
+        self.crear_factura('F-1', '100.00', self.hoy)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(actualizar_vencidas(hoy=self.hoy + timedelta(days=1)), 1)
+        self.assertEqual(obtener_metricas()['facturasVencidas'], 1)
+
+    def test_reconstruir_resumen_desde_facturas(self):
+        crear_facturas(300)
+        with self.captureOnCommitCallbacks(execute=True):
+            reconstruir_resumen()
+        self.assertResumenCoincide()
+
+
+class ConsultasPorListadoTests(TestCase):
+    """
+    Los listados deben hacer el mismo número de consultas sin importar
+    cuántas filas devuelven (sin N+1).
+    """
+    def setUp(self):
+        # El barrido diario del middleware no debe contarse en las consultas
+        actualizar_si_cambio_el_dia()
+        usuario = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador')
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def crear_datos(self, n):
+        crear_facturas(n)
+        Notificacion.objects.bulk_create(
+            Notificacion(factura=factura, mensaje="Factura por vencer")
+            for factura in Factura.objects.all()
+        )
+
+    def assertConsultasConstantes(self, url, consultas):
+        for filas in (10, 10000):
+            with self.subTest(filas=filas):
+                Factura.objects.all().delete()
+                self.crear_datos(filas)
+                with self.assertNumQueries(consultas):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), min(filas, 1000))
+
+    # Una consulta para el ETag (MAX/COUNT) y otra para la página
+    def test_listado_de_notificaciones(self):
+        self.assertConsultasConstantes('/api/notificaciones/?page_size=1000', 2)
+
+    def test_listado_de_facturas_con_expand(self):
+        self.assertConsultasConstantes('/api/facturas/?page_size=1000&expand=cliente,proveedor', 2)
+
+
+class FiltrosPaginacionTests(TestCase):
+    def setUp(self):
+        actualizar_si_cambio_el_dia()
+        self.hoy = date.today()
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('u', 'u@example.com', 'clave'))
+        self.cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+        self.otro = Cliente.objects.create(nombre="Otro", email="otro@example.com")
+        self.proveedor = Proveedor.objects.create(nombre="Proveedor", email="proveedor@example.com")
+        self.crear('C-1', 'Cobrar', cliente=self.cliente, emision=date(2024, 1, 10), vencimiento=self.hoy + timedelta(days=5))
+        self.crear('C-2', 'Cobrar', cliente=self.otro, emision=date(2024, 2, 10), vencimiento=self.hoy - timedelta(days=5))
+        self.crear('C-3', 'Cobrar', cliente=self.cliente, emision=date(2024, 3, 10), vencimiento=self.hoy - timedelta(days=1),
+                   estado='Pagada')
+        self.crear('P-1', 'Pagar', proveedor=self.proveedor, emision=date(2024, 2, 20), vencimiento=self.hoy + timedelta(days=40))
+
+    def crear(self, numero, tipo, emision, vencimiento, estado='Pendiente', **contraparte):
+        # bulk_create: C-2 queda Pendiente aunque ya venció, como antes del barrido diario
+        Factura.objects.bulk_create([Factura(
+            numero_factura=numero, tipo=tipo, fecha_emision=emision, fecha_vencimiento=vencimiento,
+            monto_total=Decimal('10.00'), estado=estado, **contraparte,
+        )])
+
+    def numeros(self, params):
+        response = self.client.get('/api/facturas/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(fila['numero_factura'] for fila in response.data['results'])
+
+    def test_filtros(self):
+        self.assertEqual(self.numeros({'tipo': 'Pagar'}), ['P-1'])
+        self.assertEqual(self.numeros({'estado': 'Vencida'}), ['C-2'])
+        self.assertEqual(self.numeros({'estado': 'Pendiente'}), ['C-1', 'P-1'])
+        self.assertEqual(self.numeros({'estado': 'Pagada'}), ['C-3'])
+        self.assertEqual(self.numeros({'cliente': self.cliente.pk}), ['C-1', 'C-3'])
+        self.assertEqual(self.numeros({'proveedor': self.proveedor.pk, 'tipo': 'Cobrar'}), [])
+        # Los límites de los rangos son inclusivos
+        self.assertEqual(self.numeros({'emision_desde': '2024-02-10', 'emision_hasta': '2024-02-20'}), ['C-2', 'P-1'])
+        self.assertEqual(self.numeros({'vencimiento_desde': self.hoy.isoformat()}), ['C-1', 'P-1'])
+        self.assertEqual(self.numeros({'vencimiento_hasta': (self.hoy - timedelta(days=5)).isoformat()}), ['C-2'])
+
+    def test_filtros_invalidos(self):
+        for params in ({'tipo': 'Otro'}, {'estado': 'vencida'}, {'cliente': 'abc'}, {'emision_desde': '2024-13-01'}):
+            with self.subTest(params=params):
+                response = self.client.get('/api/facturas/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(params)), response.data)
+
+    def test_cursor_recorre_sin_repetir_ni_saltar(self):
+        # Fechas repetidas en todas las filas: el cursor va sobre el id, que es único
+        for i in range(8):
+            self.crear(f'R-{i}', 'Cobrar', cliente=self.cliente, emision=date(2024, 5, 1), vencimiento=self.hoy)
+        esperados = list(Factura.objects.order_by('-id').values_list('numero_factura', flat=True))
+
+        vistos = []
+        url = '/api/facturas/?page_size=5'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            vistos += [fila['numero_factura'] for fila in response.data['results']]
+            if len(vistos) == 5:
+                # Una factura nueva a mitad del recorrido no desplaza las páginas siguientes
+                self.crear('N-1', 'Cobrar', cliente=self.cliente, emision=date(2024, 5, 1), vencimiento=self.hoy)
+            url = response.data['next']
+        self.assertEqual(vistos, esperados)
+
+        response = self.client.get('/api/facturas/', {'cursor': 'no-es-un-cursor'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+
+class VencimientosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hoy = date.today()
+        self.cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+
+    def crear_pendiente(self, numero, vencimiento):
+        # Sin save(): como bulk_create, update o una fixture
+        Factura.objects.bulk_create([Factura(
+            numero_factura=numero, tipo='Cobrar', cliente=self.cliente, fecha_emision=vencimiento - timedelta(days=30),
+            fecha_vencimiento=vencimiento, monto_total=Decimal('10.00'),
+        )])
+
+    def test_barrido_diario_incluye_pendientes_anteriores_a_la_ultima_ejecucion(self):
+        self.assertEqual(actualizar_vencidas(hoy=self.hoy), 0)
+        # Ya se barrió hoy: una pendiente vencida insertada después espera al día siguiente o a --completo
+        self.crear_pendiente('F-1', self.hoy - timedelta(days=20))
+        self.assertEqual(actualizar_vencidas(hoy=self.hoy), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(actualizar_vencidas(hoy=self.hoy + timedelta(days=1)), 1)
+        self.assertEqual(Factura.objects.get(numero_factura='F-1').estado, 'Vencida')
+
+        self.crear_pendiente('F-2', self.hoy - timedelta(days=20))
+        call_command('actualizar_vencidas', '--completo', stdout=io.StringIO())
+        self.assertEqual(Factura.objects.get(numero_factura='F-2').estado, 'Vencida')
+
+    @mock.patch('cuentas.vencimientos._ultimo_dia_procesado', None)
+    def test_middleware_barre_una_vez_por_dia(self):
+        self.crear_pendiente('F-1', self.hoy - timedelta(days=1))
+        self.assertEqual(actualizar_si_cambio_el_dia(), 1)
+        self.crear_pendiente('F-2', self.hoy - timedelta(days=1))
+        with self.assertNumQueries(0):
+            self.assertEqual(actualizar_si_cambio_el_dia(), 0)
+        with mock.patch('cuentas.vencimientos._ultimo_dia_procesado', None):
+            # Otro proceso en el mismo día: consulta la marca de agua pero no vuelve a barrer
+            self.assertEqual(actualizar_si_cambio_el_dia(), 0)
+        self.assertEqual(Factura.objects.get(numero_factura='F-2').estado, 'Pendiente')
+
+
+class CacheCondicionalTests(TestCase):
+    def setUp(self):
+        actualizar_si_cambio_el_dia()
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('u', 'u@example.com', 'clave'))
+        crear_facturas(5)
+        self.cliente = Cliente.objects.get(email="cliente@example.com")
+
+    def test_listado_responde_304_hasta_que_cambian_los_datos(self):
+        url = '/api/facturas/?expand=cliente'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # Cambia una relación expandida: el listado de facturas también cambia
+        self.cliente.nombre = "Otro nombre"
+        self.cliente.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        Factura.objects.first().delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_detalle_con_if_modified_since(self):
+        url = f'/api/clientes/{self.cliente.pk}/'
+        response = self.client.get(url)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304
+        )
+        self.assertEqual(self.client.get('/api/clientes/0/').status_code, 404)
+        self.assertEqual(self.client.get('/api/clientes/abc/').status_code, 404)
+
+    def test_patch_de_notificacion_invalida_el_listado(self):
+        notificacion = Notificacion.objects.create(factura=Factura.objects.first(), mensaje="Aviso")
+        etag = self.client.get('/api/notificaciones/')['ETag']
+        anterior = notificacion.actualizado_en
+
+        response = self.client.patch(f'/api/notificaciones/{notificacion.pk}/', {'enviada': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        notificacion.refresh_from_db()
+        self.assertGreater(notificacion.actualizado_en, anterior)
+        response = self.client.get('/api/notificaciones/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][0]['enviada'])
+
+
+class LecturaRapidaTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('u', 'u@example.com', 'clave'))
+        crear_facturas(50)
+        # Pendiente ya vencida que el barrido aún no marcó: se devuelve como Vencida
+        Factura.objects.filter(pk=Factura.objects.filter(estado='Pendiente').first().pk).update(
+            fecha_vencimiento=date.today() - timedelta(days=3)
+        )
+        Notificacion.objects.bulk_create(
+            Notificacion(factura=factura, mensaje="Aviso") for factura in Factura.objects.all()[:20]
+        )
+
+    def assertMismaSalida(self, url, serializer, queryset):
+        response = self.client.get(url)
+        esperado = serializer(queryset.order_by('-id'), many=True).data
+        self.assertEqual(json.loads(response.content)['results'], json.loads(JSONRenderer().render(esperado)))
+
+    def test_misma_salida_que_los_serializers(self):
+        self.assertMismaSalida('/api/facturas/?page_size=1000', FacturaSerializer, Factura.objects.all())
+        self.assertMismaSalida('/api/notificaciones/?page_size=1000', NotificacionSerializer, Notificacion.objects.all())
+        self.assertEqual(
+            self.client.get('/api/facturas/?fields=monto_total,numero_factura').data['results'][0],
+            {'numero_factura': 'F-0000049', 'monto_total': '149.00'},
+        )
+
+
+@override_settings(DATABASE_REPLICA='replica')
+class RouterReplicaTests(SimpleTestCase):
+    def setUp(self):
+        parche = mock.patch.object(replica, '_replica_caida_hasta', 0.0)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_lecturas_en_replica_solo_dentro_del_contexto(self):
+        self.assertEqual(Factura.objects.all().db, 'default')
+        with leer_de_replica():
+            self.assertEqual(Factura.objects.all().db, 'replica')
+            self.assertEqual(RouterReplica().db_for_write(Factura), 'default')
+            with mock.patch.object(connection, 'in_atomic_block', True):
+                self.assertEqual(Factura.objects.all().db, 'default')
+            marcar_replica_caida()
+            self.assertEqual(Factura.objects.all().db, 'default')
+
+
+class SaludTests(TestCase):
+    def test_salud_de_las_conexiones(self):
+        response = self.client.get('/api/salud/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['default']['ok'])
+
+    def test_error_de_conexion_no_se_expone(self):
+        # El barrido del middleware también usa la conexión: que corra antes de simular la caída
+        actualizar_si_cambio_el_dia()
+        error = OperationalError('could not connect to server: host "db.interna" port 5432')
+        with mock.patch.object(connection, 'cursor', side_effect=error), self.assertLogs('cuentas.replica', 'ERROR'):
+            response = self.client.get('/api/salud/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['default'], {'ok': False})
+
+
+class SaldosContraparteTests(TestCase):
+    def setUp(self):
+        self.hoy = date.today()
+        self.cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+        self.otro = Cliente.objects.create(nombre="Otro", email="otro@example.com")
+
+    def crear_factura(self, numero, monto, vencimiento, cliente=None):
+        return Factura.objects.create(
+            numero_factura=numero, tipo='Cobrar', cliente=cliente or self.cliente,
+            fecha_emision=self.hoy - timedelta(days=40), fecha_vencimiento=vencimiento,
+            monto_total=Decimal(monto),
+        )
+
+    def saldos(self, cliente=None):
+        cliente = Cliente.objects.get(pk=(cliente or self.cliente).pk)
+        return (cliente.saldo_pendiente, cliente.saldo_vencido, cliente.facturas_pendientes, cliente.facturas_vencidas)
+
+    def test_saldos_se_mantienen_al_guardar_y_eliminar(self):
+        factura = self.crear_factura('F-1', '100.00', self.hoy + timedelta(days=5))
+        self.crear_factura('F-2', '50.00', self.hoy - timedelta(days=5))
+        self.assertEqual(self.saldos(), (Decimal('100.00'), Decimal('50.00'), 1, 1))
+
+        factura.cliente = self.otro
+        factura.save()
+        self.assertEqual(self.saldos(), (0, Decimal('50.00'), 0, 1))
+        self.assertEqual(self.saldos(self.otro), (Decimal('100.00'), 0, 1, 0))
+
+        factura.estado = 'Pagada'
+        factura.save()
+        self.assertEqual(self.saldos(self.otro), (0, 0, 0, 0))
+
+        Factura.objects.get(numero_factura='F-2').delete()
+        self.assertEqual(self.saldos(), (0, 0, 0, 0))
+
+    def test_barrido_mueve_saldo_a_vencido(self):
+        self.crear_factura('F-1', '100.00', self.hoy)
+        actualizar_vencidas(hoy=self.hoy + timedelta(days=1))
+        self.assertEqual(self.saldos(), (0, Decimal('100.00'), 0, 1))
+        self.assertEqual(call_command('reconciliar_saldos', '--verificar', stdout=io.StringIO()), None)
+
+    def test_reconciliar_y_top_saldos(self):
+        crear_facturas(60)
+        self.assertEqual(len(reconciliar()), 2)
+        self.assertEqual(reconciliar(), [])
+        cliente = Cliente.objects.get(email="cliente@example.com")
+        esperado = Factura.objects.filter(cliente=cliente, estado='Vencida').aggregate(total=Sum('monto_total'))['total']
+        self.assertEqual(cliente.saldo_vencido, esperado)
+
+        client = APIClient()
+        client.force_authenticate(Usuario.objects.create_user('u', 'u@example.com', 'clave'))
+        response = client.get('/api/clientes/top-saldos/?limite=5')
+        self.assertEqual([fila['id'] for fila in response.data], [cliente.pk])
+        self.assertEqual(Decimal(response.data[0]['saldo_vencido']), esperado)
+        response = client.get('/api/clientes/top-saldos/?limite=-1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+
+
+class BusquedaTests(TestCase):
+    url = '/api/buscar/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('u', 'u@example.com', 'clave'))
+        Cliente.objects.create(nombre="Ana García", email="ana@example.com")
+        Cliente.objects.create(nombre="Mariana López", email="mlopez@example.com")
+        Proveedor.objects.create(nombre="Distribuidora Ana", email="ventas@distribuidora.com")
+        crear_facturas(30)
+
+    def test_resultados_ordenados_por_relevancia(self):
+        response = self.client.get(self.url, {'q': 'ana'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([fila['nombre'] for fila in response.data['clientes']['resultados']],
+                         ["Ana García", "Mariana López"])
+        self.assertEqual(len(response.data['proveedores']['resultados']), 1)
+        self.assertEqual(response.data['facturas']['resultados'], [])
+
+    def test_paginacion_y_validacion(self):
+        response = self.client.get(self.url, {'q': 'F-00000', 'tipo': 'facturas', 'page_size': 20})
+        self.assertEqual(list(response.data), ['pagina', 'facturas'])
+        self.assertEqual(len(response.data['facturas']['resultados']), 20)
+        self.assertTrue(response.data['facturas']['hay_mas'])
+        response = self.client.get(self.url, {'q': 'F-00000', 'tipo': 'facturas', 'page_size': 20, 'page': 2})
+        self.assertEqual(len(response.data['facturas']['resultados']), 10)
+        self.assertFalse(response.data['facturas']['hay_mas'])
+
+        self.assertEqual(self.client.get(self.url, {'q': 'a'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'ana', 'tipo': 'usuarios'}).status_code, 400)
+        response = self.client.get(self.url, {'q': 'F-00000', 'tipo': 'facturas', 'page_size': -5})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['facturas']['resultados']), 1)
+        self.assertEqual(consulta_prefijos("ana  gar-cía"), "ana:* & gar:* & cía:*")
+
+
+class ArchivoFacturasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # El barrido del middleware no debe cambiar las métricas a mitad de la prueba
+        actualizar_si_cambio_el_dia()
+        self.hoy = date.today()
+        crear_facturas(200, hoy=self.hoy)
+        Notificacion.objects.bulk_create(
+            Notificacion(factura=factura, mensaje="Aviso") for factura in Factura.objects.all()[:50]
+        )
+        Pago.objects.bulk_create(
+            Pago(factura=factura, monto=factura.monto_total)
+            for factura in Factura.objects.filter(estado='Pagada').order_by('fecha_emision')[:50]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            reconstruir_resumen()
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('u', 'u@example.com', 'clave'))
+
+    def test_archivar_y_restaurar(self):
+        completas = obtener_metricas()
+        hasta = horizonte(self.hoy, meses=2)
+        antiguas = Factura.objects.filter(estado='Pagada', fecha_emision__lt=hasta)
+        esperadas = antiguas.count()
+        ids = list(antiguas.values_list('id', flat=True))
+        notificaciones = Notificacion.objects.filter(factura_id__in=ids).count()
+        pagos = Pago.objects.filter(factura_id__in=ids).count()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archivar(hasta, tamano=40), esperadas)
+        self.assertEqual(FacturaArchivada.objects.count(), esperadas)
+        self.assertFalse(Factura.objects.filter(pk__in=ids).exists())
+        self.assertEqual(
+            sum(len(factura.notificaciones) for factura in FacturaArchivada.objects.all()), notificaciones
+        )
+
+        # El dashboard solo suma el archivo si se pide
+        self.assertEqual(obtener_metricas(incluir_archivo=True), completas)
+        self.assertLess(obtener_metricas()['totalPorCobrar'], completas['totalPorCobrar'])
+
+        response = self.client.get('/api/facturas/', {'archivo': 1, 'page_size': 1000})
+        self.assertEqual(len(response.data['results']), esperadas)
+        self.assertEqual(self.client.get(f'/api/facturas/{ids[0]}/', {'archivo': 1}).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/facturas/{ids[0]}/').status_code, 404)
+        self.assertEqual(self.client.delete(f'/api/facturas/{ids[0]}/?archivo=1').status_code, 405)
+        con_pagos = next(factura for factura in FacturaArchivada.objects.all() if factura.pagos)
+        response = self.client.get(f'/api/facturas/{con_pagos.pk}/pagos/', {'archivo': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, con_pagos.pagos)
+        self.assertEqual(self.client.post(f'/api/facturas/{con_pagos.pk}/pagos/?archivo=1', {'monto': '1'}).status_code, 405)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(restaurar(ids), esperadas)
+        self.assertEqual(Notificacion.objects.filter(factura_id__in=ids).count(), notificaciones)
+        self.assertEqual(Pago.objects.filter(factura_id__in=ids).count(), pagos)
+        self.assertEqual(obtener_metricas(), completas)
+
+    def test_numero_archivado_no_se_reutiliza(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            archivar(horizonte(self.hoy, meses=2), tamano=40)
+        archivada = FacturaArchivada.objects.first()
+        self.client.force_authenticate(Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador'))
+        fila = {
+            'numero_factura': archivada.numero_factura, 'tipo': 'Cobrar', 'cliente': Cliente.objects.get().pk,
+            'fecha_emision': '2024-01-10', 'fecha_vencimiento': '2999-01-01', 'monto_total': '10.00',
+        }
+        response = self.client.post('/api/facturas/', fila, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('numero_factura', response.data)
+        response = self.client.post('/api/facturas/bulk/', [fila], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('numero_factura', response.data['errores'][0]['errores'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(restaurar([archivada.pk]), 1)
+
+
+class PagosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hoy = date.today()
+        self.cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+        self.factura = self.crear_factura('F-1', '100.00')
+        self.otra = self.crear_factura('F-2', '40.00')
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador'))
+
+    def crear_factura(self, numero, monto):
+        return Factura.objects.create(
+            numero_factura=numero, tipo='Cobrar', cliente=self.cliente, fecha_emision=self.hoy,
+            fecha_vencimiento=self.hoy + timedelta(days=30), monto_total=Decimal(monto),
+        )
+
+    def resumen(self):
+        return sorted(FacturaResumenMensual.objects.values_list('tipo', 'estado', 'total', 'cantidad'))
+
+    def test_pagos_parciales_hasta_saldar(self):
+        self.assertEqual(self.factura.saldo_pendiente, Decimal('100.00'))
+        etag = self.client.get(f'/api/facturas/{self.factura.pk}/')['ETag']
+
+        response = self.client.post(f'/api/facturas/{self.factura.pk}/pagos/', {'monto': '30.00', 'referencia': 'TR-1'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['factura'], {'id': self.factura.pk, 'saldo_pendiente': Decimal('70.00'), 'estado': 'Pendiente'})
+        self.assertEqual(Cliente.objects.get().saldo_pendiente, Decimal('110.00'))
+        self.assertNotEqual(self.client.get(f'/api/facturas/{self.factura.pk}/')['ETag'], etag)
+
+        response = self.client.post(f'/api/facturas/{self.factura.pk}/pagos/', {'monto': '70.00'})
+        self.assertEqual(response.data['factura']['estado'], 'Pagada')
+        factura = Factura.objects.get(pk=self.factura.pk)
+        self.assertEqual((factura.saldo_pendiente, factura.estado), (0, 'Pagada'))
+        self.assertEqual(len(self.client.get(f'/api/facturas/{self.factura.pk}/pagos/').data), 2)
+
+        # Saldos, resumen y rechazos coinciden con recalcularlos desde cero
+        self.assertEqual(reconciliar(), [])
+        resumen = self.resumen()
+        reconstruir_resumen()
+        self.assertEqual(self.resumen(), resumen)
+        response = self.client.post(f'/api/facturas/{self.factura.pk}/pagos/', {'monto': '1.00'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_pagos_masivos_todo_o_nada(self):
+        pagos = [
+            {'factura': self.factura.pk, 'monto': '60.00'},
+            {'factura': self.factura.pk, 'monto': '50.00'},
+            {'factura': self.otra.pk, 'monto': '40.00'},
+        ]
+        response = self.client.post('/api/facturas/pagos/', pagos, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(self.factura.pk), json.dumps(response.data))
+        self.assertFalse(Pago.objects.exists())
+
+        pagos[1]['monto'] = '40.00'
+        response = self.client.post('/api/facturas/pagos/', pagos, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['registrados'], 3)
+        self.assertEqual(
+            sorted(Factura.objects.values_list('numero_factura', 'saldo_pendiente', 'estado')),
+            [('F-1', Decimal('0.00'), 'Pagada'), ('F-2', Decimal('0.00'), 'Pagada')],
+        )
+        self.assertEqual(reconciliar(), [])
+
+    def test_cambio_de_monto_conserva_lo_pagado(self):
+        registrar_pagos([Pago(factura_id=self.factura.pk, monto=Decimal('30.00'))])
+        factura = Factura.objects.get(pk=self.factura.pk)
+        factura.monto_total = Decimal('120.00')
+        factura.save()
+        self.assertEqual(Factura.objects.get(pk=factura.pk).saldo_pendiente, Decimal('90.00'))
+        self.assertEqual(reconciliar(), [])
+
+    def test_pago_con_cuerpo_que_no_es_objeto(self):
+        response = self.client.post(f'/api/facturas/{self.factura.pk}/pagos/', [{'monto': '10.00'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Pago.objects.exists())
+
+    def cambiar_estado(self, factura, estado):
+        datos = {**FacturaSerializer(Factura.objects.get(pk=factura.pk)).data, 'estado': estado}
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.put(f'/api/facturas/{factura.pk}/', datos, format='json')
+
+    def test_cambio_de_estado_recalcula_el_saldo(self):
+        registrar_pagos([Pago(factura_id=self.factura.pk, monto=Decimal('30.00'))])
+        # Marcada pagada a mano: no queda saldo
+        self.assertEqual(self.cambiar_estado(self.factura, 'Pagada').status_code, 200)
+        self.assertEqual(Factura.objects.get(pk=self.factura.pk).saldo_pendiente, Decimal('0.00'))
+        self.assertEqual(reconciliar(corregir=False), [])
+
+        # Reabierta: el saldo vuelve a ser el monto menos lo pagado y se aceptan pagos
+        self.assertEqual(self.cambiar_estado(self.factura, 'Pendiente').status_code, 200)
+        self.assertEqual(Factura.objects.get(pk=self.factura.pk).saldo_pendiente, Decimal('70.00'))
+        self.assertEqual(reconciliar(corregir=False), [])
+        response = self.client.post(f'/api/facturas/{self.factura.pk}/pagos/', {'monto': '70.00'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['factura']['estado'], 'Pagada')
+
+        # Saldada con pagos: no se puede reabrir
+        response = self.cambiar_estado(self.factura, 'Pendiente')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('estado', response.data)
+
+
+class CargaMasivaFacturasTests(TestCase):
+    url = '/api/facturas/bulk/'
+
+    def setUp(self):
+        cache.clear()
+        usuario = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador')
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+        self.cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+        self.proveedor = Proveedor.objects.create(nombre="Proveedor", email="proveedor@example.com")
+
+    def test_carga_json(self):
+        filas = [
+            {'numero_factura': 'C-1', 'tipo': 'Cobrar', 'cliente': self.cliente.pk, 'fecha_emision': '2024-01-10',
+             'fecha_vencimiento': '2024-02-10', 'monto_total': '100.50'},
+            {'numero_factura': 'P-1', 'tipo': 'Pagar', 'proveedor': self.proveedor.pk, 'fecha_emision': '2024-01-15',
+             'fecha_vencimiento': '2999-01-01', 'monto_total': '20'},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, filas, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['creadas'], 2)
+        self.assertEqual(Factura.objects.get(numero_factura='C-1').estado, 'Vencida')
+        self.assertEqual(Factura.objects.get(numero_factura='P-1').estado, 'Pendiente')
+
+        metricas = obtener_metricas()
+        self.assertEqual(metricas['totalPorCobrar'], Decimal('100.50'))
+        self.assertEqual(metricas['facturasVencidas'], 1)
+
+    def test_carga_csv_con_errores_no_guarda_nada(self):
+        contenido = (
+            "numero_factura,tipo,cliente,proveedor,fecha_emision,fecha_vencimiento,monto_total\n"
+            f"C-1,Cobrar,{self.cliente.pk},,2024-01-10,2024-02-10,100\n"
+            f"C-2,Cobrar,,{self.proveedor.pk},2024-01-10,2024-02-10,100\n"
+            f"C-1,Cobrar,{self.cliente.pk},,2024-01-10,fecha,100\n"
+        )
+        response = self.client.post(self.url, contenido, content_type='text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['total_errores'], 2)
+        self.assertEqual([error['fila'] for error in response.data['errores']], [1, 2])
+        self.assertIn('fecha_vencimiento', response.data['errores'][1]['errores'])
+        self.assertFalse(Factura.objects.exists())
+
+    def test_carga_ndjson_rechaza_numero_existente(self):
+        Factura.objects.create(
+            numero_factura='C-1', tipo='Cobrar', cliente=self.cliente,
+            fecha_emision=date(2024, 1, 1), fecha_vencimiento=date(2999, 1, 1), monto_total=Decimal('5'),
+        )
+        contenido = "\n".join([
+            f'{{"numero_factura": "C-1", "tipo": "Cobrar", "cliente": {self.cliente.pk}, '
+            '"fecha_emision": "2024-01-10", "fecha_vencimiento": "2024-02-10", "monto_total": 1}',
+            f'{{"numero_factura": "C-2", "tipo": "Cobrar", "cliente": {self.cliente.pk}, '
+            '"fecha_emision": "2024-01-10", "fecha_vencimiento": "2024-02-10", "monto_total": 1}',
+        ])
+        response = self.client.post(self.url, contenido, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errores'][0]['fila'], 0)
+        self.assertEqual(Factura.objects.count(), 1)
+
+    def test_tipo_y_estado_no_textuales_son_errores_de_fila(self):
+        fila = {'numero_factura': 'C-1', 'cliente': self.cliente.pk, 'fecha_emision': '2024-01-10',
+                'fecha_vencimiento': '2999-01-01', 'monto_total': '5.00'}
+        response = self.client.post(self.url, [
+            {**fila, 'tipo': ['Cobrar']}, {**fila, 'numero_factura': 'C-2', 'tipo': 'Cobrar', 'estado': {'a': 1}},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tipo', response.data['errores'][0]['errores'])
+        self.assertIn('estado', response.data['errores'][1]['errores'])
+
+    def test_monto_negativo_se_rechaza(self):
+        fila = {'numero_factura': 'C-1', 'tipo': 'Cobrar', 'cliente': self.cliente.pk, 'fecha_emision': '2024-01-10',
+                'fecha_vencimiento': '2999-01-01', 'monto_total': '-5.00'}
+        response = self.client.post(self.url, [fila], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('monto_total', response.data['errores'][0]['errores'])
+
+        response = self.client.post('/api/facturas/', fila, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('monto_total', response.data)
+        self.assertFalse(Factura.objects.exists())
+
+
+class SincronizacionContrapartesTests(TestCase):
+    url = '/api/clientes/sincronizar/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador'))
+        Cliente.objects.create(nombre="Ana", email="ana@example.com", telefono='')
+        Cliente.objects.create(nombre="Luis", email="luis@example.com")
+
+    def ndjson(self, filas):
+        return "\n".join(json.dumps(fila) for fila in filas)
+
+    def test_upsert_por_email(self):
+        filas = [
+            {'email': 'ana@example.com', 'nombre': "Ana"},
+            {'email': 'luis@example.com', 'nombre': "Luis Pérez", 'telefono': '555'},
+            {'email': 'eva@example.com', 'nombre': "Eva", 'direccion': "Calle 1"},
+        ]
+        # Por lote: una lectura y un INSERT ... ON CONFLICT (más SAVEPOINT/RELEASE)
+        with self.assertNumQueries(4):
+            response = self.client.post(self.url, self.ndjson(filas), content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data, {'insertados': 1, 'actualizados': 1, 'sin_cambios': 1})
+        self.assertEqual(Cliente.objects.get(email='luis@example.com').telefono, '555')
+        self.assertEqual(Cliente.objects.count(), 3)
+
+        # Repetir la misma carga no escribe nada
+        response = self.client.post(self.url, self.ndjson(filas), content_type='application/x-ndjson')
+        self.assertEqual(response.data, {'insertados': 0, 'actualizados': 0, 'sin_cambios': 3})
+
+    def test_errores_no_guardan_nada(self):
+        filas = [
+            {'email': 'eva@example.com', 'nombre': "Eva"},
+            {'email': 'eva@example.com', 'nombre': "Eva 2"},
+            {'email': 'no-es-email', 'nombre': "X"},
+        ]
+        response = self.client.post('/api/proveedores/sincronizar/', filas, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['fila'] for error in response.data['errores']], [1, 2])
+        self.assertFalse(Proveedor.objects.exists())
+
+
+class ExportacionFacturasTests(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador')
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+        crear_facturas(50)
+
+    def test_exportacion_csv_con_filtros(self):
+        response = self.client.get('/api/facturas/export/?tipo=Pagar')
+        self.assertEqual(response.status_code, 200)
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lineas[0].startswith('id,numero_factura,tipo'))
+        self.assertEqual(len(lineas) - 1, Factura.objects.filter(tipo='Pagar').count())
+        self.assertTrue(all(',Pagar,' in linea for linea in lineas[1:]))
+
+    def test_exportacion_ndjson(self):
+        factura = Factura.objects.exclude(estado='Pagada').order_by('id').first()
+        registrar_pagos([Pago(factura_id=factura.pk, monto=Decimal('1.00'))])
+        response = self.client.get('/api/facturas/export/?formato=ndjson')
+        filas = [json.loads(linea) for linea in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(len(filas), 50)
+        self.assertEqual(filas[1]['proveedor'], "Proveedor")
+        # El saldo exportado coincide con el de la API en las facturas con pagos parciales
+        fila = next(fila for fila in filas if fila['id'] == factura.pk)
+        self.assertEqual(fila['saldo_pendiente'], self.client.get(f'/api/facturas/{factura.pk}/').data['saldo_pendiente'])
+        self.assertEqual(Decimal(fila['saldo_pendiente']), factura.monto_total - 1)
+
+
+class AntiguedadSaldosTests(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador')
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+        self.corte = date(2024, 6, 30)
+        self.cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+        for numero, dias, estado in [('A', -5, 'Pendiente'), ('B', 0, 'Pendiente'), ('C', 45, 'Vencida'),
+                                     ('D', 75, 'Vencida'), ('E', 200, 'Vencida'), ('F', 200, 'Pagada')]:
+            Factura.objects.create(
+                numero_factura=numero, tipo='Cobrar', cliente=self.cliente, estado=estado,
+                fecha_emision=date(2024, 1, 1), fecha_vencimiento=self.corte - timedelta(days=dias),
+                monto_total=Decimal('10.00'),
+            )
+
+    def test_tramos_por_cliente(self):
+        response = self.client.get('/api/antiguedad-saldos/?tipo=Cobrar&fecha=2024-06-30')
+        self.assertEqual(response.status_code, 200)
+        fila = response.data['results'][0]
+        self.assertEqual(fila['contraparte'], "Cliente")
+        self.assertEqual(
+            [fila[tramo] for tramo in ['por_vencer', 'dias_0_30', 'dias_31_60', 'dias_61_90', 'dias_90_mas', 'total']],
+            [Decimal('10'), Decimal('10'), Decimal('10'), Decimal('10'), Decimal('10'), Decimal('50')],
+        )
+
+    def test_foto_guardada(self):
+        call_command('generar_antiguedad', '--tipo=Cobrar', '--fecha=2024-06-30', stdout=io.StringIO())
+        response = self.client.get('/api/antiguedad-saldos/?snapshot=1')
+        self.assertEqual(response.data['fecha_corte'], self.corte)
+        self.assertEqual(response.data['results'][0]['total'], Decimal('50.00'))
+
+
+class FlujoCajaTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hoy = date(2024, 6, 12)
+        cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+        proveedor = Proveedor.objects.create(nombre="Proveedor", email="proveedor@example.com")
+        for numero, tipo, dias, estado, monto in [('A', 'Cobrar', -10, 'Vencida', '100.00'),
+                                                  ('B', 'Cobrar', 2, 'Pendiente', '50.00'),
+                                                  ('C', 'Pagar', 2, 'Pendiente', '30.00'),
+                                                  ('D', 'Pagar', 25, 'Pendiente', '80.00'),
+                                                  ('E', 'Cobrar', 3, 'Pagada', '999.00')]:
+            Factura.objects.create(
+                numero_factura=numero, tipo=tipo, estado=estado, fecha_emision=date(2024, 5, 1),
+                fecha_vencimiento=self.hoy + timedelta(days=dias), monto_total=Decimal(monto),
+                **({'cliente': cliente} if tipo == 'Cobrar' else {'proveedor': proveedor}),
+            )
+
+    def test_serie_diaria_con_acumulado(self):
+        with self.assertNumQueries(1):
+            flujo = proyectar_flujo('dia', 30, hoy=self.hoy)
+        serie = flujo['serie']
+        self.assertEqual(len(serie), 30)
+        # La vencida cuenta en el primer día
+        self.assertEqual((serie[0]['periodo'], serie[0]['entradas']), (self.hoy, Decimal('100.00')))
+        self.assertEqual(serie[2]['neto'], Decimal('20.00'))
+        self.assertEqual(serie[-1]['acumulado'], Decimal('40.00'))
+        self.assertEqual((flujo['totalEntradas'], flujo['totalSalidas']), (Decimal('150.00'), Decimal('110.00')))
+
+    def test_granularidad_y_cache(self):
+        semanas = proyectar_flujo('semana', 14, hoy=self.hoy)['serie']
+        self.assertEqual([fila['periodo'] for fila in semanas], [date(2024, 6, 10), date(2024, 6, 17), date(2024, 6, 24)])
+        meses = proyectar_flujo('mes', 30, hoy=self.hoy)['serie']
+        self.assertEqual([(fila['periodo'], fila['neto']) for fila in meses],
+                         [(date(2024, 6, 1), Decimal('120.00')), (date(2024, 7, 1), Decimal('-80.00'))])
+
+        with self.assertNumQueries(0):
+            proyectar_flujo('mes', 30, hoy=self.hoy)
+        # Cambiar solo el vencimiento invalida la proyección
+        with self.captureOnCommitCallbacks(execute=True):
+            factura = Factura.objects.get(numero_factura='D')
+            factura.fecha_vencimiento = self.hoy + timedelta(days=60)
+            factura.save()
+        meses = proyectar_flujo('mes', 30, hoy=self.hoy)['serie']
+        self.assertEqual(meses[1]['neto'], Decimal('0'))
+
+    def test_vista_valida_parametros(self):
+        client = APIClient()
+        client.force_authenticate(Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador'))
+        self.assertEqual(client.get('/api/flujo-caja/?granularidad=anio').status_code, 400)
+        self.assertEqual(client.get('/api/flujo-caja/?dias=0').status_code, 400)
+        response = client.get('/api/flujo-caja/?granularidad=semana&dias=28')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['granularidad'], 'semana')
+
+
+class AutenticacionSinEstadoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        actualizar_si_cambio_el_dia()
+        self.usuario = Usuario.objects.create_user('contador', 'contador@example.com', 'clave', rol='Contador')
+        self.client = APIClient()
+
+    def autenticar(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.usuario).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_lecturas_sin_consultas_de_autenticacion(self):
+        self.autenticar()
+        self.client.get('/api/usuario/')  # llena la caché de versión
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/usuario/')
+        self.assertEqual(response.data['rol'], 'Contador')
+        self.assertEqual(response.data['permisos'], [])
+
+    def test_token_sin_datos_del_usuario(self):
+        # Token emitido sin los datos agregados por CustomTokenObtainPairSerializer
+        token = AccessToken.for_user(self.usuario)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        response = self.client.get('/api/usuario/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['email'], response.data['rol'], response.data['permisos']), ('', '', []))
+
+    def test_cambio_de_rol_invalida_el_token(self):
+        self.autenticar()
+        self.assertEqual(self.client.get('/api/usuario/').status_code, 200)
+        self.usuario.rol = 'Gerente'
+        self.usuario.save()
+        self.assertEqual(self.client.get('/api/usuario/').status_code, 401)
+        self.autenticar()
+        self.assertEqual(self.client.get('/api/usuario/').data['rol'], 'Gerente')
+
+    def test_cambio_de_permisos_invalida_el_token(self):
+        self.autenticar()
+        self.usuario.user_permissions.add(Permission.objects.get(codename='view_factura'))
+        self.assertEqual(self.client.get('/api/usuario/').status_code, 401)
+        self.usuario.refresh_from_db()
+        self.autenticar()
+        self.assertEqual(self.client.get('/api/usuario/').data['permisos'], ['view_factura'])
+
+
+class DespachoNotificacionesTests(TestCase):
+    class BackendPrueba:
+        def __init__(self):
+            self.enviadas = []
+
+        def enviar(self, notificaciones):
+            self.enviadas.extend(notificacion.factura.numero_factura for notificacion in notificaciones)
+            return [notificacion.pk for notificacion in notificaciones]
+
+    def setUp(self):
+        self.hoy = date(2024, 6, 1)
+        cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+        for numero, dias in [('POR-VENCER', 3), ('LEJANA', 30), ('VENCIDA', -10)]:
+            Factura.objects.filter(pk=Factura.objects.create(
+                numero_factura=numero, tipo='Cobrar', cliente=cliente, fecha_emision=date(2024, 1, 1),
+                fecha_vencimiento=date(2999, 1, 1), monto_total=Decimal('10'),
+            ).pk).update(fecha_vencimiento=self.hoy + timedelta(days=dias))
+
+    def test_genera_sin_duplicar_y_envia_por_lotes(self):
+        self.assertEqual(generar_notificaciones(hoy=self.hoy), 2)
+        self.assertEqual(generar_notificaciones(hoy=self.hoy), 0)
+
+        backend = self.BackendPrueba()
+        self.assertEqual(despachar_pendientes(backend, tamano=1), 2)
+        self.assertEqual(sorted(backend.enviadas), ['POR-VENCER', 'VENCIDA'])
+        self.assertFalse(Notificacion.objects.filter(enviada=False).exists())
+        self.assertEqual(despachar_pendientes(backend), 0)
+
+
+class MetricasMiddlewareTests(TestCase):
+    def setUp(self):
+        registro.limpiar()
+        actualizar_si_cambio_el_dia()
+        usuario = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador')
+        self.client = APIClient()
+        self.client.force_authenticate(usuario)
+
+    def test_metricas_por_vista_y_deteccion_de_n_mas_uno(self):
+        crear_facturas(10)
+        Notificacion.objects.bulk_create(
+            Notificacion(factura=factura, mensaje="Aviso") for factura in Factura.objects.all()
+        )
+        self.client.get('/api/facturas/')
+        # Sin select_related ni lectura rápida, el serializer consulta la factura de cada notificación
+        with mock.patch.object(NotificacionViewSet, 'queryset', Notificacion.objects.all()), \
+                mock.patch.object(NotificacionViewSet, 'lectura_rapida', None):
+            self.client.get('/api/notificaciones/')
+
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        with override_settings(METRICAS_TOKEN='secreto'):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+            texto = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secreto').content.decode()
+        self.assertIn('cuentas_solicitud_duracion_segundos_count{vista="facturas-list"} 1', texto)
+        self.assertIn('cuentas_consultas_bd_total{vista="facturas-list"} 2', texto)
+        self.assertIn('cuentas_n_mas_uno_total{vista="facturas-list"} 0', texto)
+        self.assertIn('cuentas_n_mas_uno_total{vista="notificaciones-list"} 1', texto)
+
+    def test_metricas_requieren_token(self):
+        cliente = APIClient()
+        # Sin METRICAS_TOKEN el endpoint queda cerrado, incluso con un Bearer vacío
+        self.assertEqual(cliente.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+        with override_settings(METRICAS_TOKEN='secreto'):
+            for cabecera in ('', 'Bearer otro', 'Basic secreto', 'Bearer secreto '):
+                self.assertEqual(cliente.get('/api/metrics/', HTTP_AUTHORIZATION=cabecera).status_code, 403)
+            # Un usuario autenticado con JWT tampoco basta
+            token = CustomTokenObtainPairSerializer.get_token(Usuario.objects.get(username='admin')).access_token
+            self.assertEqual(cliente.get('/api/metrics/', HTTP_AUTHORIZATION=f'Bearer {token}').status_code, 403)
+            response = cliente.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+class CambiosTests(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador')
+        token = CustomTokenObtainPairSerializer.get_token(usuario).access_token
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.hoy = date.today()
+        self.cliente = Cliente.objects.create(nombre="Cliente", email="cliente@example.com")
+
+    def crear_factura(self, numero, vencimiento):
+        return Factura.objects.create(
+            numero_factura=numero, tipo='Cobrar', cliente=self.cliente, fecha_emision=self.hoy,
+            fecha_vencimiento=vencimiento, monto_total=Decimal('10.00'),
+        )
+
+    def registrados(self, desde=0):
+        return list(Cambio.objects.filter(id__gt=desde).order_by('id').values_list('modelo', 'objeto_id', 'accion'))
+
+    def test_guardar_eliminar_y_caminos_masivos(self):
+        factura = self.crear_factura('F-1', self.hoy)
+        notificacion = Notificacion.objects.create(factura=factura, mensaje="Aviso").pk
+        Notificacion.objects.get(pk=notificacion).delete()
+        self.assertEqual(self.registrados(), [
+            ('factura', factura.pk, 'crear'), ('notificacion', notificacion, 'crear'),
+            ('notificacion', notificacion, 'eliminar'),
+        ])
+
+        ultimo = Cambio.objects.latest('id').pk
+        actualizar_vencidas(hoy=self.hoy + timedelta(days=1))
+        registrar_pagos([Pago(factura_id=factura.pk, monto=Decimal('10.00'))])
+        self.assertEqual(self.registrados(ultimo), [('factura', factura.pk, 'actualizar')] * 2)
+
+    async def leer(self, url, **headers):
+        response = await self.async_client.get(url, headers={**self.headers, **headers})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        contenido = b''.join([parte async for parte in response.streaming_content]).decode()
+        eventos = []
+        for bloque in contenido.strip().split('\n\n'):
+            campos = dict(linea.split(': ', 1) for linea in bloque.split('\n'))
+            eventos.append((campos['event'], json.loads(campos['data'])))
+        return eventos
+
+    async def test_stream_desde_secuencia(self):
+        eventos = await self.leer('/api/async/cambios/?seguir=0')
+        self.assertEqual(eventos, [('inicio', {'ultimo': 0})])
+
+        factura = await sync_to_async(self.crear_factura)('F-1', self.hoy + timedelta(days=5))
+        await Notificacion.objects.acreate(factura=factura, mensaje="Aviso")
+        eventos = await self.leer('/api/async/cambios/?seguir=0&desde=0')
+        self.assertEqual([(nombre, data['modelo'], data['accion']) for nombre, data in eventos],
+                         [('cambio', 'factura', 'crear'), ('cambio', 'notificacion', 'crear')])
+        self.assertEqual(eventos[0][1]['datos']['numero_factura'], 'F-1')
+
+        # Reconexión con Last-Event-ID y filtro por modelo
+        eventos = await self.leer('/api/async/cambios/?seguir=0&modelos=notificacion', **{'Last-Event-ID': '0'})
+        self.assertEqual([data['modelo'] for _, data in eventos], ['notificacion'])
+
+        # Un número ya purgado obliga a recargar
+        await Cambio.objects.filter(modelo='factura').adelete()
+        eventos = await self.leer('/api/async/cambios/?seguir=0&desde=0')
+        self.assertEqual(eventos[0][0], 'reinicio')
+
+    @override_settings(CAMBIOS_MARGEN_SEGUNDOS=0)
+    async def test_hueco_confirmado_tarde_se_envia(self):
+        factura = await sync_to_async(self.crear_factura)('F-1', self.hoy + timedelta(days=5))
+        inicio = (await Cambio.objects.alatest('id')).pk
+        # El id inicio + 1 es de una transacción larga que aún no se confirmó: queda un hueco
+        ultimo = await Cambio.objects.acreate(id=inicio + 2, modelo='factura', objeto_id=factura.pk,
+                                              accion='eliminar', fecha=timezone.now())
+
+        with mock.patch('cuentas.cambios.INTERVALO_SEGUNDOS', 0):
+            flujo = cambios.eventos(desde=inicio)
+            self.assertIn(f'id: {ultimo.pk}\nevent: cambio', await anext(flujo))
+            await Cambio.objects.acreate(id=inicio + 1, modelo='factura', objeto_id=factura.pk,
+                                         accion='actualizar', fecha=timezone.now())
+            evento = await anext(flujo)
+            await flujo.aclose()
+        # Se envía con el id del cursor para que Last-Event-ID no retroceda
+        self.assertIn(f'id: {ultimo.pk}\nevent: cambio', evento)
+        self.assertIn(f'"id": {inicio + 1}', evento)
+        self.assertEqual(cambios._quitar([(1, 10, 0)], [1, 4, 5, 10]), [(2, 3, 0), (6, 9, 0)])
+
+
+class VistasAsyncTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        actualizar_si_cambio_el_dia()
+        usuario = Usuario.objects.create_user('admin', 'admin@example.com', 'clave', rol='Administrador')
+        token = CustomTokenObtainPairSerializer.get_token(usuario).access_token
+        self.headers = {'Authorization': f'Bearer {token}'}
+        crear_facturas(30)
+        with self.captureOnCommitCallbacks(execute=True):
+            reconstruir_resumen()
+
+    async def test_listado_paginado_por_clave(self):
+        response = await self.async_client.get(
+            '/api/async/facturas/?page_size=20&tipo=Cobrar&fields=id,tipo', headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        self.assertEqual(len(data['results']), 15)
+        self.assertIsNone(data['next'])
+        self.assertEqual(set(data['results'][0]), {'id', 'tipo'})
+
+        response = await self.async_client.get('/api/async/facturas/?page_size=10', headers=self.headers)
+        siguiente = (await self.async_client.get(response.json()['next'], headers=self.headers)).json()
+        self.assertEqual(len(siguiente['results']), 10)
+        self.assertLess(siguiente['results'][0]['id'], response.json()['results'][-1]['id'])
+
+    async def test_detalle_y_dashboard(self):
+        factura = await Factura.objects.afirst()
+        response = await self.async_client.get(f'/api/async/facturas/{factura.pk}/?expand=cliente', headers=self.headers)
+        self.assertEqual(response.json()['numero_factura'], factura.numero_factura)
+        response = await self.async_client.get('/api/async/facturas/0/', headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.async_client.get('/api/async/dashboard-metrics/', headers=self.headers)
+        self.assertEqual(response.json()['facturasVencidas'], await Factura.objects.filter(estado='Vencida').acount())
+
+    async def test_sin_token(self):
+        response = await self.async_client.get('/api/async/facturas/')
+        self.assertEqual(response.status_code, 401)
+
+
+class CargaFixtureTests(TestCase):
+    def test_carga_datos_json_utf16_y_volcado_ndjson(self):
+        cache.clear()
+        # El barrido del día ya corrió: las pendientes vencidas del fixture igual pasan a Vencida
+        actualizar_vencidas()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('cargar_fixture', 'datos.json', stdout=io.StringIO())
+        self.assertEqual(Factura.objects.count(), 6)
+        self.assertFalse(Factura.objects.filter(estado='Pendiente', fecha_vencimiento__lt=date.today()).exists())
+        self.assertEqual(reconciliar(corregir=False), [])
+        self.assertTrue(Usuario.objects.filter(username='admin').exists())
+        self.assertEqual(obtener_metricas()['totalPorCobrar'],
+                         Factura.objects.filter(tipo='Cobrar').aggregate(total=Sum('monto_total'))['total'])
+
+        salida = io.StringIO()
+        volcar(salida, [Factura], formato='ndjson')
+        filas = [json.loads(linea) for linea in salida.getvalue().splitlines()]
+        self.assertEqual([fila['pk'] for fila in filas], list(Factura.objects.order_by('pk').values_list('pk', flat=True)))
+
+        Factura.objects.all().delete()
+        salida.seek(0)
+        self.assertEqual(CargaFixture().ejecutar(leer_objetos(salida)), {'cuentas.Factura': 6})
+        self.assertEqual(Factura.objects.count(), 6)
+
+    def test_csv_de_copy_serializa_json(self):
+        archivada = FacturaArchivada(
+            id=1, numero_factura='F-COPY', tipo='Cobrar', fecha_emision=date(2020, 1, 1),
+            fecha_vencimiento=date(2020, 2, 1), monto_total=Decimal('100.00'), estado='Pagada',
+            pagos=[{'fecha': '2020-01-15', 'monto': '100.00', 'nota': 'con "comillas"'}],
+        )
+        campos = FacturaArchivada._meta.concrete_fields
+        # En PostgreSQL get_db_prep_save envuelve el JSON en un adaptador de psycopg2
+        from psycopg2.extras import Json
+        with mock.patch.object(connection.ops, 'adapt_json_value', lambda valor, encoder: Json(valor)):
+            fila = next(csv.reader(CargaFixture()._csv_copy(campos, [archivada])))
+        valores = dict(zip((campo.name for campo in campos), fila))
+        self.assertEqual(json.loads(valores['pagos']), archivada.pagos)
+        self.assertEqual(json.loads(valores['notificaciones']), [])
+        self.assertEqual(valores['cliente'], '\\N')
+
+
+class ArranqueTests(TestCase):
+    def test_vistas_de_acceso_perezosas(self):
+        Usuario.objects.create_user('contador', 'contador@example.com', 'clave', rol='Contador')
+        client = APIClient(enforce_csrf_checks=True)
+        response = client.post('/api/token/', {'username': 'contador', 'password': 'clave'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        refresco = client.post('/api/token/refresh/', {'refresh': response.data['refresh']}, format='json')
+        self.assertIn('access', refresco.data)
+
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(client.post('/api/registro/', {}, format='json').status_code, 403)
+        self.assertEqual(self.client.get(reverse('admin:cuentas_factura_changelist')).status_code, 302)
+
+    def test_setup_no_carga_acceso_ni_admin(self):
+        script = (
+            "import sys, django; django.setup(); from django.urls import resolve; resolve('/api/facturas/'); "
+            "print([m for m in ('rest_framework_simplejwt.views', 'cuentas.vistas_acceso', 'cuentas.admin') if m in sys.modules])"
+        )
+        proceso = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                 env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE})
+        self.assertEqual(proceso.stdout.strip(), '[]')
+
+    def test_leer_importtime(self):
+        texto = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     cuentas.lectura\n"
+            "import time:      2500 |       2620 |   cuentas.views\n"
+        )
+        self.assertEqual(leer_importtime(texto), [('cuentas.lectura', 120, 120), ('cuentas.views', 2500, 2620)])
+
+
+class ComandosTests(TestCase):
+    def test_todos_los_comandos_se_ejecutan(self):
+        # Cada comando de cuentas con argumentos mínimos: detecta importaciones rotas al mover código
+        cache.clear()
+        with tempfile.TemporaryDirectory() as carpeta:
+            argumentos = {
+                'generar_datos': ['--clientes', '3', '--proveedores', '2', '--facturas', '20', '--notificaciones', '5', '--prefijo', 'HUMO'],
+                'cargar_fixture': ['datos.json'],
+                'actualizar_vencidas': ['--completo'],
+                'reconstruir_resumen': [],
+                'reconciliar_saldos': ['--verificar'],
+                'generar_antiguedad': [],
+                'despachar_notificaciones': [],
+                'archivar_facturas': [],
+                'purgar_cambios': [],
+                'volcar_fixture': ['cuentas.Cliente', '--salida', os.path.join(carpeta, 'clientes.json')],
+                'benchmark_autenticacion': ['--usuario', 'admin', '--solicitudes', '2'],  # de datos.json
+                'benchmark': [
+                    '--facturas', '20', '--clientes', '3', '--proveedores', '2', '--notificaciones', '5',
+                    '--repeticiones', '1', '--escenario', 'facturas_listado',
+                    '--salida', os.path.join(carpeta, 'benchmark.json'),
+                ],
+                'perfil_arranque': ['--repeticiones', '1', '--sin-memoria', '--top', '3'],
+            }
+            comandos = {nombre for nombre, app in get_commands().items() if app == 'cuentas'}
+            self.assertEqual(comandos, set(argumentos))
+
+            # benchmark crea y borra su propia BD de prueba; aquí corre sobre la del test
+            with mock.patch('cuentas.management.commands.benchmark.setup_databases'), \
+                    mock.patch('cuentas.management.commands.benchmark.teardown_databases'), \
+                    mock.patch('cuentas.management.commands.benchmark.setup_test_environment'), \
+                    mock.patch('cuentas.management.commands.benchmark.teardown_test_environment'), \
+                    mock.patch('cuentas.benchmarks.medir_serializacion', return_value={}):
+                for nombre, args in argumentos.items():
+                    with self.subTest(comando=nombre), self.captureOnCommitCallbacks(execute=True):
+                        call_command(nombre, *args, stdout=io.StringIO(), stderr=io.StringIO())
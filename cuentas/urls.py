@@ -2,6 +2,8 @@
 
 from rest_framework.routers import DefaultRouter
 from django.urls import path
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
 from .views import DashboardMetricsView
 from .views import (
     UsuarioViewSet,
@@ -10,10 +12,28 @@ from .views import (
     FacturaViewSet,
     NotificacionViewSet,
     UsuarioActualView,
-    CustomTokenObtainPairView,
-    RegistroUsuarioView
+    AntiguedadSaldosView,
+    BusquedaView,
+    FlujoCajaView
 )
-from rest_framework_simplejwt.views import TokenRefreshView
+from .metricas import metricas_view
+from .replica import salud_view
+from . import vistas_async
+
+
+def vista_perezosa(ruta):
+    # Importa la vista de clase `ruta` en su primera solicitud y no al cargar las URLs
+    vista = None
+
+    # Las APIView ya están exentas de CSRF; la envoltura debe estarlo para que el middleware no la frene
+    @csrf_exempt
+    def despachar(request, *args, **kwargs):
+        nonlocal vista
+        if vista is None:
+            vista = import_string(ruta).as_view()
+        return vista(request, *args, **kwargs)
+    return despachar
+
 
 # Registrar los endpoints principales con DefaultRouter
 router = DefaultRouter()
@@ -26,8 +46,20 @@ router.register(r'notificaciones', NotificacionViewSet, basename='notificaciones
 # Agregar rutas personalizadas
 urlpatterns = router.urls + [
     path('usuario/', UsuarioActualView.as_view(), name='usuario_actual'),
-    path('token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('token/', vista_perezosa('cuentas.vistas_acceso.CustomTokenObtainPairView'), name='token_obtain_pair'),
+    path('token/refresh/', vista_perezosa('rest_framework_simplejwt.views.TokenRefreshView'), name='token_refresh'),
     path('dashboard-metrics/', DashboardMetricsView.as_view(), name='dashboard-metrics'),
-    path('registro/', RegistroUsuarioView.as_view(), name='registro_usuario'),
+    path('registro/', vista_perezosa('cuentas.vistas_acceso.RegistroUsuarioView'), name='registro_usuario'),
+    path('metrics/', metricas_view, name='metricas'),
+    path('salud/', salud_view, name='salud'),
+    path('antiguedad-saldos/', AntiguedadSaldosView.as_view(), name='antiguedad-saldos'),
+    path('flujo-caja/', FlujoCajaView.as_view(), name='flujo-caja'),
+    path('buscar/', BusquedaView.as_view(), name='buscar'),
+    # Lecturas asíncronas para servir con ASGI (uvicorn backend.asgi:application)
+    path('async/facturas/', vistas_async.facturas_list, name='async-facturas-list'),
+    path('async/facturas/<int:pk>/', vistas_async.factura_detail, name='async-facturas-detail'),
+    path('async/notificaciones/', vistas_async.notificaciones_list, name='async-notificaciones-list'),
+    path('async/dashboard-metrics/', vistas_async.dashboard_metrics, name='async-dashboard-metrics'),
+    # Cambios en tiempo real (server-sent events); requiere servir con ASGI
+    path('async/cambios/', vistas_async.cambios_stream, name='async-cambios'),
 ]
@@ -0,0 +1,54 @@
+# cuentas/vencimientos.py
+
+import logging
+from django.db import transaction
+from django.utils import timezone
+from .models import Factura, ControlVencimiento
+
+logger = logging.getLogger(__name__)
+
+# Último día (hora de Lima) en que este proceso ejecutó el barrido
+_ultimo_dia_procesado = None
+
+
+def actualizar_vencidas(hoy=None, completo=False):
+    """
+    Pasa a 'Vencida' todas las facturas pendientes con vencimiento anterior a
+    hoy, incluidas las escritas sin save() (bulk_create, update, fixtures).
+
+    ControlVencimiento registra el día del último barrido para ejecutarlo una
+    vez por día; `completo=True` lo repite aunque ya se haya hecho hoy, para
+    quien inserte pendientes ya vencidas sin pasar por save(). Devuelve el
+    número de facturas actualizadas.
+    """
+    hoy = hoy or timezone.localdate()
+    with transaction.atomic():
+        control, _ = ControlVencimiento.objects.select_for_update().get_or_create(pk=1)
+        if not completo and control.ultima_fecha is not None and control.ultima_fecha >= hoy:
+            return 0
+
+        filas = Factura.actualizar_facturas_vencidas(hoy=hoy)
+
+        control.ultima_fecha = hoy
+        control.filas_actualizadas = filas
+        control.ejecutado_en = timezone.now()
+        control.save()
+
+    logger.info("Barrido de vencimientos al %s: %s facturas actualizadas", hoy, filas)
+    return filas
+
+
+def barrido_pendiente():
+    # Comprobación sin BD, útil en el camino asíncrono para evitar saltos de hilo
+    return _ultimo_dia_procesado != timezone.localdate()
+
+
+def actualizar_si_cambio_el_dia():
+    # Solo accede a la BD la primera vez que el proceso atiende una solicitud en un día nuevo
+    global _ultimo_dia_procesado
+    hoy = timezone.localdate()
+    if _ultimo_dia_procesado == hoy:
+        return 0
+    filas = actualizar_vencidas(hoy=hoy)
+    _ultimo_dia_procesado = hoy
+    return filas
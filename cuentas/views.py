@@ -1,18 +1,30 @@
 # cuentas/views.py
 
-from django.db.models import Sum, Count
 from rest_framework.viewsets import ModelViewSet
+from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework.permissions import BasePermission
-from .models import Usuario, Cliente, Proveedor, Factura, Notificacion
+from rest_framework.permissions import BasePermission, SAFE_METHODS
+from .models import Usuario, Cliente, Proveedor, Factura, FacturaArchivada, Notificacion, Pago
 from .serializers import UsuarioSerializer, ClienteSerializer, ProveedorSerializer, FacturaSerializer, NotificacionSerializer
+from .serializers import PagoSerializer
 from rest_framework import status
-from .serializers import RegistroUsuarioSerializer
-from rest_framework.exceptions import PermissionDenied
+from .serializers import FacturaArchivadaSerializer, parametro_lista
+from rest_framework.exceptions import MethodNotAllowed, ValidationError
+from .resumen import obtener_metricas
+from .filtros import filtrar_facturas, filtrar_notificaciones, obtener_booleano, obtener_entero, obtener_fecha
+from .carga import CargaFacturas, SincronizacionContrapartes, leer_filas
+from .exportacion import COLUMNAS_FACTURA, FORMATOS, filas_facturas, respuesta_exportacion
+from .antiguedad import CONTRAPARTES, antiguedad_guardada, antiguedad_por_contraparte
+from .flujo import GRANULARIDADES, HORIZONTE_MAXIMO, proyectar_flujo
+from .pagos import registrar_pagos
+from .paginacion import PaginaPaginacion
+from .busqueda import LONGITUD_MINIMA, TIPOS, buscar
+from .condicional import CacheCondicionalMixin, inicio_del_dia
+from .lectura import LECTURA_FACTURAS, LECTURA_NOTIFICACIONES, ListadoRapidoMixin
+from .replica import LecturaReplicaMixin
+from django.utils import timezone
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,7 +37,7 @@ class IsAdminOrReadOnly(BasePermission):
         return request.user.rol == 'Administrador'
 
 # Vistas para CRUD de modelos
-class UsuarioViewSet(ModelViewSet):
+class UsuarioViewSet(LecturaReplicaMixin, ModelViewSet):
     queryset = Usuario.objects.all()
     serializer_class = UsuarioSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -36,21 +48,159 @@ class UsuarioViewSet(ModelViewSet):
             return Usuario.objects.all()
         return Usuario.objects.filter(id=self.request.user.id)
 
-class ClienteViewSet(ModelViewSet):
+class TopSaldosMixin:
+    # /top-saldos/?por=vencido|pendiente&limite=N: recorre el índice del saldo en orden descendente
+    @action(detail=False, methods=['get'], url_path='top-saldos')
+    def top_saldos(self, request):
+        campo = 'saldo_pendiente' if request.query_params.get('por') == 'pendiente' else 'saldo_vencido'
+        limite = max(min(obtener_entero(request.query_params, 'limite') or 10, 100), 1)
+        queryset = self.get_queryset().filter(**{f'{campo}__gt': 0}).order_by(f'-{campo}')[:limite]
+        return Response(self.get_serializer(queryset, many=True).data)
+
+class SincronizacionMixin:
+    # /sincronizar/: alta o actualización masiva por email (arreglo JSON, CSV o NDJSON)
+    @action(detail=False, methods=['post'], url_path='sincronizar')
+    def sincronizar(self, request):
+        filas = leer_filas(request)
+        if filas is None:
+            return Response(
+                {'detail': "Se esperaba un arreglo JSON, CSV o NDJSON con los registros."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        carga = SincronizacionContrapartes(self.get_queryset().model).ejecutar(filas)
+        if carga.total_errores:
+            return Response(
+                {'total_errores': carga.total_errores, 'errores': carga.errores},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({
+            'insertados': carga.insertados, 'actualizados': carga.actualizados, 'sin_cambios': carga.sin_cambios,
+        })
+
+class ClienteViewSet(LecturaReplicaMixin, CacheCondicionalMixin, TopSaldosMixin, SincronizacionMixin, ModelViewSet):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
 
-class ProveedorViewSet(ModelViewSet):
+class ProveedorViewSet(LecturaReplicaMixin, CacheCondicionalMixin, TopSaldosMixin, SincronizacionMixin, ModelViewSet):
     queryset = Proveedor.objects.all()
     serializer_class = ProveedorSerializer
 
-class FacturaViewSet(ModelViewSet):
+def obtener_formato(request):
+    formato = request.query_params.get('formato', 'csv')
+    if formato not in FORMATOS:
+        raise ValidationError({'formato': f"Debe ser uno de: {', '.join(FORMATOS)}."})
+    return formato
+
+class FacturaViewSet(LecturaReplicaMixin, CacheCondicionalMixin, ListadoRapidoMixin, ModelViewSet):
     queryset = Factura.objects.all()
     serializer_class = FacturaSerializer
 
-class NotificacionViewSet(ModelViewSet):
-    queryset = Notificacion.objects.all()
+    def consulta_archivo(self):
+        # ?archivo=1 lee las facturas archivadas (solo lectura) en lugar de las vigentes
+        return obtener_booleano(self.request.query_params, 'archivo')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.consulta_archivo() and request.method not in SAFE_METHODS:
+            raise MethodNotAllowed(request.method)
+
+    def get_serializer_class(self):
+        return FacturaArchivadaSerializer if self.consulta_archivo() else FacturaSerializer
+
+    def get_lectura_rapida(self):
+        # Las expansiones y el archivo se sirven con los serializers
+        if self.consulta_archivo() or FacturaSerializer.expansiones(self.request):
+            return None
+        return LECTURA_FACTURAS
+
+    def get_relaciones_validacion(self):
+        return sorted(FacturaSerializer.expansiones(self.request))
+
+    def vigente_desde(self):
+        # El estado que se devuelve (estado_actual) cambia al pasar el día
+        return inicio_del_dia()
+
+    def get_queryset(self):
+        queryset = FacturaArchivada.objects.all() if self.consulta_archivo() else super().get_queryset()
+        # Las relaciones expandidas se traen en la misma consulta
+        expandidas = FacturaSerializer.expansiones(self.request)
+        if expandidas:
+            queryset = queryset.select_related(*expandidas)
+        return filtrar_facturas(queryset, self.request.query_params)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        # Carga masiva: arreglo JSON, CSV (text/csv) o NDJSON (application/x-ndjson)
+        filas = leer_filas(request)
+        if filas is None:
+            return Response(
+                {'detail': "Se esperaba un arreglo JSON, CSV o NDJSON con las facturas."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        carga = CargaFacturas().ejecutar(filas)
+        if carga.total_errores:
+            return Response(
+                {'creadas': 0, 'total_errores': carga.total_errores, 'errores': carga.errores},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({'creadas': carga.creadas}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get', 'post'], url_path='pagos')
+    def pagos(self, request, pk=None):
+        # GET: historial de pagos de la factura; POST: registra un pago {monto, fecha, referencia}
+        factura = self.get_object()
+        if self.consulta_archivo():
+            # Archivada: los pagos se guardan como JSON en la misma fila (ya en orden de id)
+            return Response(sorted(factura.pagos, key=lambda pago: pago['fecha']))
+        if request.method == 'GET':
+            return Response(PagoSerializer(factura.pagos.order_by('fecha', 'id'), many=True).data)
+        if not isinstance(request.data, dict):
+            raise ValidationError({'detail': "Se esperaba un objeto JSON con el pago."})
+        datos = request.data.copy()
+        datos['factura'] = factura.pk
+        serializer = PagoSerializer(data=datos)
+        serializer.is_valid(raise_exception=True)
+        pago = Pago(**serializer.validated_data)
+        estado = registrar_pagos([pago])[factura.pk]
+        return Response(
+            {'pago': PagoSerializer(pago).data, 'factura': {'id': factura.pk, **estado}},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=['post'], url_path='pagos')
+    def pagos_masivos(self, request):
+        # Varios pagos en una transacción: arreglo JSON de {factura, monto, fecha, referencia}
+        if not isinstance(request.data, list):
+            raise ValidationError({'detail': "Se esperaba un arreglo JSON con los pagos."})
+        serializer = PagoSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        pagos = [Pago(**valores) for valores in serializer.validated_data]
+        facturas = registrar_pagos(pagos)
+        return Response(
+            {'registrados': len(pagos), 'facturas': [{'id': pk, **estado} for pk, estado in facturas.items()]},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        # Exportación en streaming con los mismos filtros del listado: ?formato=csv|ndjson
+        formato = obtener_formato(request)
+        modelo = FacturaArchivada if self.consulta_archivo() else Factura
+        queryset = filtrar_facturas(modelo.objects.all(), request.query_params)
+        return respuesta_exportacion(formato, 'facturas', COLUMNAS_FACTURA, filas_facturas(queryset))
+
+class NotificacionViewSet(LecturaReplicaMixin, CacheCondicionalMixin, ListadoRapidoMixin, ModelViewSet):
+    # factura_numero se lee con un JOIN en lugar de una consulta por notificación
+    queryset = Notificacion.objects.select_related('factura').only(
+        # actualizado_en no puede quedar diferido: save() debe escribirlo en los PATCH (ETag del listado)
+        'id', 'factura_id', 'factura__numero_factura', 'tipo', 'mensaje', 'fecha_envio', 'enviada', 'actualizado_en'
+    )
     serializer_class = NotificacionSerializer
+    relaciones_validacion = ('factura',)
+    lectura_rapida = LECTURA_NOTIFICACIONES
+
+    def get_queryset(self):
+        return filtrar_notificaciones(super().get_queryset(), self.request.query_params)
 
 # Vista para obtener datos del usuario autenticado
 class UsuarioActualView(APIView):
@@ -63,77 +213,84 @@ class UsuarioActualView(APIView):
             'username': usuario.username,
             'email': usuario.email,
             'rol': usuario.rol,
-            'permisos': [perm.codename for perm in usuario.user_permissions.all()]
+            'permisos': usuario.permisos
         }
         return Response(data)
 
-class DashboardMetricsView(APIView):
+class DashboardMetricsView(LecturaReplicaMixin, APIView):
     def get(self, request):
-        # Total por cobrar
-        total_por_cobrar = Factura.objects.filter(tipo="Cobrar").aggregate(total=Sum('monto_total'))['total'] or 0
+        # Rango de años opcional: ?desde=2023&hasta=2024
+        desde = self.get_anio(request, 'desde')
+        hasta = self.get_anio(request, 'hasta')
+        # Las facturas archivadas solo se suman con ?archivo=1
+        metricas = obtener_metricas(desde, hasta, obtener_booleano(request.query_params, 'archivo'))
+        if 'formato' in request.query_params:
+            # Exporta el flujo mensual: ?formato=csv|ndjson
+            filas = ((entry['anio'], entry['mes'], entry['total']) for entry in metricas['flujoPorMes'])
+            return respuesta_exportacion(obtener_formato(request), 'flujo_mensual', ['anio', 'mes', 'total'], filas)
+        return Response(metricas)
 
-        # Total por pagar
-        total_por_pagar = Factura.objects.filter(tipo="Pagar").aggregate(total=Sum('monto_total'))['total'] or 0
+    def get_anio(self, request, parametro):
+        valor = request.query_params.get(parametro)
+        if valor in (None, ''):
+            return None
+        try:
+            return int(valor)
+        except ValueError:
+            raise ValidationError({parametro: "Debe ser un año válido."})
 
-        # Facturas vencidas
-        facturas_vencidas = Factura.objects.filter(estado="Vencida").count()
 
-        # Flujo mensual
-        flujo_por_mes = (
-            Factura.objects
-            .values('fecha_emision__month')
-            .annotate(total=Sum('monto_total'))
-            .order_by('fecha_emision__month')
-        )
-        flujo_por_mes_formateado = [
-            {"mes": self.get_month_name(entry['fecha_emision__month']), "total": entry['total']}
-            for entry in flujo_por_mes
-        ]
+# Antigüedad de saldos por cliente (?tipo=Cobrar) o proveedor (?tipo=Pagar)
+class AntiguedadSaldosView(APIView):
+    def get(self, request):
+        tipo = request.query_params.get('tipo', 'Cobrar')
+        if tipo not in CONTRAPARTES:
+            raise ValidationError({'tipo': "Debe ser Cobrar o Pagar."})
 
-        data = {
-            "totalPorCobrar": total_por_cobrar,
-            "totalPorPagar": total_por_pagar,
-            "facturasVencidas": facturas_vencidas,
-            "flujoPorMes": flujo_por_mes_formateado,
-        }
-        return Response(data)
+        if request.query_params.get('snapshot') in ('1', 'true'):
+            # Última foto generada con el comando generar_antiguedad
+            corte, saldos = antiguedad_guardada(tipo)
+        else:
+            corte = obtener_fecha(request.query_params, 'fecha') or timezone.localdate()
+            saldos = antiguedad_por_contraparte(tipo, corte)
 
-    def get_month_name(self, month_number):
-        import calendar
-        return calendar.month_name[month_number]
+        paginador = PaginaPaginacion()
+        pagina = paginador.paginate_queryset(saldos, request, view=self)
+        response = paginador.get_paginated_response(pagina)
+        response.data['fecha_corte'] = corte
+        return response
 
 
-# Personalización del login para incluir el rol del usuario en el token
-class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
-    @classmethod
-    def get_token(cls, user):
-        token = super().get_token(user)
+# Proyección del flujo de caja: ?granularidad=dia|semana|mes&dias=90
+class FlujoCajaView(LecturaReplicaMixin, APIView):
+    def get(self, request):
+        granularidad = request.query_params.get('granularidad', 'dia')
+        if granularidad not in GRANULARIDADES:
+            raise ValidationError({'granularidad': "Debe ser dia, semana o mes."})
+        dias = obtener_entero(request.query_params, 'dias')
+        if dias is None:
+            dias = 90
+        if not 1 <= dias <= HORIZONTE_MAXIMO:
+            raise ValidationError({'dias': f"Debe estar entre 1 y {HORIZONTE_MAXIMO}."})
+        return Response(proyectar_flujo(granularidad, dias))
 
-        # Agregar el rol del usuario al token
-        token['rol'] = user.rol
-        return token
 
-class CustomTokenObtainPairView(TokenObtainPairView):
-    serializer_class = CustomTokenObtainPairSerializer
+# Búsqueda por nombre, email o número de factura: ?q=texto&tipo=clientes,facturas&page=1&page_size=20
+class BusquedaView(APIView):
+    def get(self, request):
+        texto = request.query_params.get('q', '').strip()
+        if len(texto) < LONGITUD_MINIMA:
+            raise ValidationError({'q': f"Debe tener al menos {LONGITUD_MINIMA} caracteres."})
+        tipos = parametro_lista(request, 'tipo') or set(TIPOS)
+        if tipos - set(TIPOS):
+            raise ValidationError({'tipo': "Debe ser clientes, proveedores o facturas."})
+        pagina = max(obtener_entero(request.query_params, 'page') or 1, 1)
+        tamano = max(min(obtener_entero(request.query_params, 'page_size') or 20, 100), 1)
 
-# Permiso personalizado para administrador
-class IsAdmin(BasePermission):
-    def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            logger.warning("Intento de acceso no autenticado al endpoint de registro.")
-            raise PermissionDenied(detail="Usuario no autenticado.")
-        if request.user.rol != 'Administrador':
-            logger.warning(f"Acceso denegado para el usuario {request.user.username}. Rol: {request.user.rol}")
-            raise PermissionDenied(detail="Acceso denegado. Solo los administradores pueden registrar usuarios.")
-        return True
-
-# Vista para registrar usuarios
-class RegistroUsuarioView(APIView):
-    permission_classes = [IsAdmin]
-
-    def post(self, request):
-        serializer = RegistroUsuarioSerializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            return Response({'message': 'Usuario creado con éxito'}, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        # Sin COUNT(*): se pide una fila extra para saber si hay otra página
+        data = {'pagina': pagina}
+        for tipo in TIPOS:
+            if tipo in tipos:
+                filas = list(buscar(tipo, texto)[(pagina - 1) * tamano:pagina * tamano + 1])
+                data[tipo] = {'resultados': filas[:tamano], 'hay_mas': len(filas) > tamano}
+        return Response(data)
@@ -0,0 +1,58 @@
+# cuentas/vistas_acceso.py
+#
+# Login (tokens JWT) y registro de usuarios. Se usan poco comparadas con el
+# resto de la API, así que cuentas/urls.py las importa en su primera solicitud
+# y un worker no carga las vistas y serializers de simplejwt al arrancar.
+
+import logging
+from rest_framework import status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView
+from .serializers import RegistroUsuarioSerializer
+
+logger = logging.getLogger(__name__)
+
+
+# Personalización del login para incluir el rol del usuario en el token
+class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+
+        # Agregar el rol del usuario al token
+        token['rol'] = user.rol
+        # Datos para autenticar sin consultar la BD (JWTSinEstadoAuthentication)
+        token['username'] = user.username
+        token['email'] = user.email
+        token['permisos'] = user.permisos
+        token['version'] = user.version_token
+        return token
+
+class CustomTokenObtainPairView(TokenObtainPairView):
+    serializer_class = CustomTokenObtainPairSerializer
+
+# Permiso personalizado para administrador
+class IsAdmin(BasePermission):
+    def has_permission(self, request, view):
+        if not request.user.is_authenticated:
+            logger.warning("Intento de acceso no autenticado al endpoint de registro.")
+            raise PermissionDenied(detail="Usuario no autenticado.")
+        if request.user.rol != 'Administrador':
+            logger.warning(f"Acceso denegado para el usuario {request.user.username}. Rol: {request.user.rol}")
+            raise PermissionDenied(detail="Acceso denegado. Solo los administradores pueden registrar usuarios.")
+        return True
+
+# Vista para registrar usuarios
+class RegistroUsuarioView(APIView):
+    permission_classes = [IsAdmin]
+
+    def post(self, request):
+        serializer = RegistroUsuarioSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response({'message': 'Usuario creado con éxito'}, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,130 @@
+# cuentas/vistas_async.py
+#
+# Versiones asíncronas (ASGI) de los endpoints de lectura. Usan el ORM
+# asíncrono y no pasan por DRF, cuyas vistas son síncronas; la serialización
+# reutiliza los serializers sobre objetos ya cargados, sin consultas extra.
+
+from functools import wraps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.request import Request
+from rest_framework_simplejwt.exceptions import InvalidToken
+from .autenticacion import JWTSinEstadoAuthentication
+from .cambios import LECTURAS, eventos
+from .filtros import filtrar_facturas, filtrar_notificaciones, obtener_booleano, obtener_entero
+from .models import Factura, Notificacion
+from .resumen import aobtener_metricas
+from .serializers import FacturaSerializer, NotificacionSerializer, parametro_lista
+
+TAMANO_PAGINA = 100
+TAMANO_PAGINA_MAXIMO = 1000
+
+
+def respuesta(data, status=200):
+    return JsonResponse(data, status=status, encoder=DjangoJSONEncoder, safe=False)
+
+
+def requiere_autenticacion(vista):
+    # Autenticación JWT sin estado, equivalente a IsAuthenticated en las vistas DRF
+    @wraps(vista)
+    async def envoltura(request, *args, **kwargs):
+        drf_request = Request(request)
+        try:
+            resultado = await JWTSinEstadoAuthentication().aauthenticate(drf_request)
+        except (AuthenticationFailed, InvalidToken) as error:
+            return respuesta({'detail': str(error.detail)}, status=401)
+        if resultado is None:
+            return respuesta({'detail': "Las credenciales de autenticación no se proveyeron."}, status=401)
+        request.user, request.auth = resultado
+        try:
+            return await vista(drf_request, *args, **kwargs)
+        except ValidationError as error:
+            return respuesta(error.detail, status=400)
+    return envoltura
+
+
+async def _pagina(request, queryset):
+    # Paginación por clave (keyset): ?antes_de=<id> devuelve los siguientes por id descendente
+    tamano = min(obtener_entero(request.query_params, 'page_size') or TAMANO_PAGINA, TAMANO_PAGINA_MAXIMO)
+    antes_de = obtener_entero(request.query_params, 'antes_de')
+    if antes_de is not None:
+        queryset = queryset.filter(id__lt=antes_de)
+    objetos = [objeto async for objeto in queryset.order_by('-id')[:tamano + 1]]
+
+    siguiente = None
+    if len(objetos) > tamano:
+        objetos = objetos[:tamano]
+        parametros = request.query_params.copy()
+        parametros['antes_de'] = objetos[-1].id
+        siguiente = request.build_absolute_uri(f'{request.path}?{parametros.urlencode()}')
+    return objetos, siguiente
+
+
+@requiere_autenticacion
+async def facturas_list(request):
+    queryset = Factura.objects.all()
+    expandidas = FacturaSerializer.expansiones(request)
+    if expandidas:
+        queryset = queryset.select_related(*expandidas)
+    queryset = filtrar_facturas(queryset, request.query_params)
+    facturas, siguiente = await _pagina(request, queryset)
+    data = FacturaSerializer(facturas, many=True, context={'request': request}).data
+    return respuesta({'next': siguiente, 'results': data})
+
+
+@requiere_autenticacion
+async def factura_detail(request, pk):
+    queryset = Factura.objects.all()
+    expandidas = FacturaSerializer.expansiones(request)
+    if expandidas:
+        queryset = queryset.select_related(*expandidas)
+    try:
+        factura = await queryset.aget(pk=pk)
+    except Factura.DoesNotExist:
+        return respuesta({'detail': "No encontrado."}, status=404)
+    return respuesta(FacturaSerializer(factura, context={'request': request}).data)
+
+
+@requiere_autenticacion
+async def notificaciones_list(request):
+    queryset = filtrar_notificaciones(
+        Notificacion.objects.select_related('factura').only(
+            'id', 'factura_id', 'factura__numero_factura', 'tipo', 'mensaje', 'fecha_envio', 'enviada'
+        ),
+        request.query_params,
+    )
+    notificaciones, siguiente = await _pagina(request, queryset)
+    data = NotificacionSerializer(notificaciones, many=True, context={'request': request}).data
+    return respuesta({'next': siguiente, 'results': data})
+
+
+@requiere_autenticacion
+async def dashboard_metrics(request):
+    # Las métricas salen de una sola consulta agrupada sobre el resumen mensual
+    # (cacheada), así que no quedan agregados independientes que paralelizar
+    desde = obtener_entero(request.query_params, 'desde')
+    hasta = obtener_entero(request.query_params, 'hasta')
+    incluir_archivo = obtener_booleano(request.query_params, 'archivo')
+    return respuesta(await aobtener_metricas(desde, hasta, incluir_archivo))
+
+
+@requiere_autenticacion
+async def cambios_stream(request):
+    """
+    Server-sent events con los cambios de facturas y notificaciones posteriores
+    a ?desde=<id> (o al encabezado Last-Event-ID al reconectar). Filtros:
+    ?modelos=factura,notificacion. Con ?seguir=0 envía los pendientes y cierra.
+    """
+    desde = obtener_entero(request.query_params, 'desde')
+    if desde is None:
+        desde = obtener_entero(request.headers, 'Last-Event-ID')
+    modelos = parametro_lista(request, 'modelos')
+    if modelos - set(LECTURAS):
+        raise ValidationError({'modelos': f"Debe ser uno o más de: {', '.join(LECTURAS)}."})
+    seguir = request.query_params.get('seguir') not in ('0', 'false')
+    response = StreamingHttpResponse(eventos(desde, modelos, seguir), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evita que nginx acumule el stream antes de enviarlo
+    response['X-Accel-Buffering'] = 'no'
+    return response
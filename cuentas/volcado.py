@@ -0,0 +1,235 @@
+# cuentas/volcado.py
+#
+# Carga y volcado de fixtures en streaming: no cargan el archivo completo en
+# memoria y escriben por lotes con bulk_create (o COPY en PostgreSQL) en lugar
+# de llamar a save() por objeto como loaddata.
+
+import codecs
+import csv
+import io
+import json
+from collections import defaultdict
+from django.apps import apps
+from django.core import serializers
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import JSONField
+
+TAMANO_LOTE = 2000
+TAMANO_LECTURA = 1 << 16
+
+
+def abrir_texto(ruta):
+    # Detecta UTF-16 (como datos.json, generado en Windows) o UTF-8 por el BOM
+    with open(ruta, 'rb') as archivo:
+        inicio = archivo.read(4)
+    if inicio.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        codificacion = 'utf-16'
+    else:
+        codificacion = 'utf-8-sig'
+    return open(ruta, encoding=codificacion)
+
+
+def leer_objetos(archivo):
+    """
+    Devuelve los objetos de un fixture JSON (arreglo de dumpdata) o NDJSON
+    (un objeto por línea), decodificándolos a medida que se lee el archivo.
+    """
+    decoder = json.JSONDecoder()
+    buffer = archivo.read(TAMANO_LECTURA)
+    posicion = 0
+    fin = False
+    while True:
+        # Salta espacios y separadores del arreglo
+        while posicion < len(buffer) and buffer[posicion] in ' \t\r\n,[]':
+            posicion += 1
+        if posicion >= len(buffer):
+            if fin:
+                return
+            buffer = archivo.read(TAMANO_LECTURA)
+            posicion = 0
+            fin = not buffer
+            continue
+        try:
+            objeto, final = decoder.raw_decode(buffer, posicion)
+        except json.JSONDecodeError:
+            if fin:
+                raise
+            # Objeto incompleto: se lee otro bloque y se reintenta
+            siguiente = archivo.read(TAMANO_LECTURA)
+            fin = not siguiente
+            buffer = buffer[posicion:] + siguiente
+            posicion = 0
+            continue
+        yield objeto
+        posicion = final
+
+
+class CargaFixture:
+    """
+    Inserta los objetos agrupados por modelo en lotes. Las restricciones de
+    clave foránea se verifican al final (como hace loaddata), así que el orden
+    de los objetos en el archivo no importa. Los pks existentes se actualizan.
+    """
+    def __init__(self, using=DEFAULT_DB_ALIAS, usar_copy=False):
+        self.using = using
+        self.connection = connections[using]
+        self.usar_copy = usar_copy and self.connection.vendor == 'postgresql'
+        self.pendientes = defaultdict(list)
+        self.m2m = defaultdict(list)
+        self.contadores = defaultdict(int)
+
+    def ejecutar(self, objetos):
+        with transaction.atomic(using=self.using):
+            with self.connection.constraint_checks_disabled():
+                for deserializado in PythonDeserializer(objetos, using=self.using, ignorenonexistent=True):
+                    modelo = type(deserializado.object)
+                    self.pendientes[modelo].append(deserializado.object)
+                    for nombre, valores in (deserializado.m2m_data or {}).items():
+                        self.m2m[(modelo, nombre)].append((deserializado.object.pk, valores))
+                    if len(self.pendientes[modelo]) >= TAMANO_LOTE:
+                        self._insertar(modelo)
+                for modelo in self._modelos_en_orden():
+                    self._insertar(modelo)
+                self._insertar_m2m()
+            tablas = [modelo._meta.db_table for modelo in self.contadores]
+            self.connection.check_constraints(table_names=tablas)
+            self._reiniciar_secuencias()
+        return dict((modelo._meta.label, cantidad) for modelo, cantidad in self.contadores.items())
+
+    def _modelos_en_orden(self):
+        por_app = defaultdict(list)
+        for modelo in self.pendientes:
+            por_app[modelo._meta.app_config].append(modelo)
+        return serializers.sort_dependencies(list(por_app.items()), allow_cycles=True)
+
+    def _insertar(self, modelo):
+        objetos = self.pendientes.pop(modelo, [])
+        if not objetos:
+            return
+        # Valores que el modelo calcula al insertar (p. ej. el saldo de facturas de volcados anteriores)
+        preparar = getattr(modelo, 'preparar_insercion', None)
+        if preparar:
+            preparar(objetos)
+        if self.usar_copy:
+            self._copy(modelo, objetos)
+        else:
+            campos = [
+                campo.name for campo in modelo._meta.concrete_fields if not campo.primary_key
+            ]
+            modelo._base_manager.using(self.using).bulk_create(
+                objetos, update_conflicts=bool(campos), update_fields=campos or None,
+                unique_fields=[modelo._meta.pk.name] if campos else None,
+            )
+        self.contadores[modelo] += len(objetos)
+
+    def _copy(self, modelo, objetos):
+        # COPY ... FROM STDIN en formato CSV; solo inserta (la tabla no debe tener esos pks)
+        campos = modelo._meta.concrete_fields
+        contenido = self._csv_copy(campos, objetos)
+        columnas = ', '.join(self.connection.ops.quote_name(campo.column) for campo in campos)
+        tabla = self.connection.ops.quote_name(modelo._meta.db_table)
+        with self.connection.cursor() as cursor:
+            cursor.cursor.copy_expert(f"COPY {tabla} ({columnas}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", contenido)
+
+    def _csv_copy(self, campos, objetos):
+        contenido = io.StringIO()
+        escritor = csv.writer(contenido)
+        for objeto in objetos:
+            fila = []
+            for campo in campos:
+                valor = getattr(objeto, campo.attname)
+                if isinstance(campo, JSONField) and valor is not None:
+                    # get_db_prep_save devuelve el adaptador Json de psycopg2, cuyo str() es un literal SQL
+                    valor = json.dumps(valor, cls=campo.encoder)
+                else:
+                    valor = campo.get_db_prep_save(valor, connection=self.connection)
+                if valor is None:
+                    fila.append('\\N')
+                elif isinstance(valor, bool):
+                    fila.append('t' if valor else 'f')
+                else:
+                    fila.append(valor)
+            escritor.writerow(fila)
+        contenido.seek(0)
+        return contenido
+
+    def _insertar_m2m(self):
+        for (modelo, nombre), filas in self.m2m.items():
+            campo = modelo._meta.get_field(nombre)
+            through = campo.remote_field.through
+            origen = campo.m2m_field_name()
+            destino = campo.m2m_reverse_field_name()
+            relaciones = [
+                through(**{f'{origen}_id': pk, f'{destino}_id': valor})
+                for pk, valores in filas for valor in valores
+            ]
+            through._base_manager.using(self.using).bulk_create(
+                relaciones, batch_size=TAMANO_LOTE, ignore_conflicts=True,
+            )
+
+    def _reiniciar_secuencias(self):
+        sentencias = self.connection.ops.sequence_reset_sql(no_style(), list(self.contadores))
+        if sentencias:
+            with self.connection.cursor() as cursor:
+                for sentencia in sentencias:
+                    cursor.execute(sentencia)
+
+
+def modelos_a_volcar(etiquetas=None, excluir=()):
+    # Modelos de las apps o app.Modelo indicados (todos si no se indica ninguno), en orden de dependencias
+    excluidos = {etiqueta.lower() for etiqueta in excluir}
+    por_app = defaultdict(list)
+    configuraciones = [apps.get_app_config(etiqueta) for etiqueta in (etiquetas or []) if '.' not in etiqueta]
+    modelos = [apps.get_model(etiqueta) for etiqueta in (etiquetas or []) if '.' in etiqueta]
+    if not etiquetas:
+        configuraciones = list(apps.get_app_configs())
+    for configuracion in configuraciones:
+        modelos.extend(configuracion.get_models())
+    for modelo in modelos:
+        meta = modelo._meta
+        if meta.proxy or not meta.managed or meta.label_lower in excluidos or meta.app_label in excluidos:
+            continue
+        if modelo not in por_app[meta.app_config]:
+            por_app[meta.app_config].append(modelo)
+    return serializers.sort_dependencies(list(por_app.items()), allow_cycles=True)
+
+
+def volcar(salida, modelos, formato='json', using=DEFAULT_DB_ALIAS):
+    """
+    Escribe los objetos de los modelos en `salida` por lotes (iterator), como
+    arreglo JSON compatible con loaddata o como NDJSON. Devuelve el total.
+    """
+    serializador = serializers.get_serializer('python')()
+    total = 0
+    primero = True
+    if formato == 'json':
+        salida.write('[')
+    for modelo in modelos:
+        queryset = modelo._base_manager.using(using).order_by(modelo._meta.pk.name)
+        lote = []
+        for objeto in queryset.iterator(chunk_size=TAMANO_LOTE):
+            lote.append(objeto)
+            if len(lote) == TAMANO_LOTE:
+                primero = _escribir_lote(salida, serializador, lote, formato, primero)
+                total += len(lote)
+                lote = []
+        if lote:
+            primero = _escribir_lote(salida, serializador, lote, formato, primero)
+            total += len(lote)
+    if formato == 'json':
+        salida.write('\n]\n')
+    return total
+
+
+def _escribir_lote(salida, serializador, objetos, formato, primero):
+    for dato in serializador.serialize(objetos):
+        texto = json.dumps(dato, cls=DjangoJSONEncoder, ensure_ascii=False)
+        if formato == 'json':
+            salida.write(('\n' if primero else ',\n') + texto)
+        else:
+            salida.write(texto + '\n')
+        primero = False
+    return primero